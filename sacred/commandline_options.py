@@ -274,6 +274,11 @@ def enforce_clean_option(args, run):
         )
     else:
         for repo in repos:
+            if repo["dirty"] is None:
+                raise RuntimeError(
+                    "EnforceClean: Could not determine whether "
+                    'the "{}" repository is clean.'.format(repo)
+                )
             if repo["dirty"]:
                 raise RuntimeError(
                     "EnforceClean: Uncommited changes in "
@@ -306,6 +311,6 @@ def capture_option(args, run):
     """
     Control the way stdout and stderr are captured.
 
-    The argument value must be one of [no, sys, fd]
+    The argument value must be one of [no, sys, fd, pipe]
     """
     run.capture_mode = args
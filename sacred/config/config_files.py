@@ -34,7 +34,10 @@ if opt.has_yaml:
     def load_yaml(filename):
         return opt.yaml.load(filename, Loader=opt.yaml.FullLoader)
 
-    yaml_handler = Handler(load_yaml, opt.yaml.dump, "")
+    def dump_yaml(obj, fp):
+        return opt.yaml.dump(obj, fp)
+
+    yaml_handler = Handler(load_yaml, dump_yaml, "")
 
     for extension in yaml_extensions:
         HANDLER_BY_EXT[extension] = yaml_handler
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # coding=utf-8
 import copy
+import sys
 
 import sacred.optional as opt
 from sacred.utils import join_paths, SacredError
@@ -224,6 +225,8 @@ def make_read_only(o):
     a nested structure of `list`s, `dict`s and `tuple`s. Does not modify `o`
     but returns the converted structure.
     """
+    if opt.has_yaml and not _yaml_representers_added:
+        add_yaml_representers()
     if type(o) == dict:
         return ReadOnlyDict({k: make_read_only(v) for k, v in o.items()})
     elif type(o) == list:
@@ -234,20 +237,31 @@ def make_read_only(o):
         return o
 
 
-if opt.has_yaml:
-    # Register read-only containers for yaml
-    def read_only_dict_representer(dumper, data):
-        """Saves `ReadOnlyDict` as `dict`."""
-        return dumper.represent_dict(data)
+def read_only_dict_representer(dumper, data):
+    """Saves `ReadOnlyDict` as `dict`."""
+    return dumper.represent_dict(data)
 
-    def read_only_list_representer(dumper, data):
-        """Saves `ReadOnlyList` as `list`."""
-        return dumper.represent_list(data)
 
+def read_only_list_representer(dumper, data):
+    """Saves `ReadOnlyList` as `list`."""
+    return dumper.represent_list(data)
+
+
+_yaml_representers_added = False
+
+
+def add_yaml_representers():
+    """Register read-only containers for yaml.
+
+    This is done when the first read-only container is created, to avoid
+    importing yaml when sacred is imported.
+    """
+    global _yaml_representers_added
     opt.yaml.add_representer(ReadOnlyDict, read_only_dict_representer)
     opt.yaml.add_representer(ReadOnlyList, read_only_list_representer)
     opt.yaml.SafeDumper.add_representer(ReadOnlyDict, read_only_dict_representer)
     opt.yaml.SafeDumper.add_representer(ReadOnlyList, read_only_list_representer)
+    _yaml_representers_added = True
 
 
 SIMPLIFY_TYPE = {
@@ -263,35 +277,45 @@ SIMPLIFY_TYPE = {
     DogmaticList: list,
 }
 
-# if numpy is available we also want to ignore typechanges from numpy
-# datatypes to the corresponding python datatype
-if opt.has_numpy:
-    from sacred.optional import np
+NP_FLOATS = ["float16", "float32", "float64", "float128"]
+NP_INTS = [
+    "int8",
+    "int16",
+    "int32",
+    "int64",
+    "uint",
+    "uint8",
+    "uint16",
+    "uint32",
+    "uint64",
+]
+
+_numpy_types_added = False
+
 
-    NP_FLOATS = ["float16", "float32", "float64", "float128"]
+def add_numpy_types():
+    """Ignore typechanges from numpy datatypes to the corresponding python type.
+
+    This is done once numpy has been imported, because before that there can't
+    be any values with numpy datatypes.
+    """
+    global _numpy_types_added
+    np = opt.np
     for npf in NP_FLOATS:
         if hasattr(np, npf):
             SIMPLIFY_TYPE[getattr(np, npf)] = float
 
-    NP_INTS = [
-        "int8",
-        "int16",
-        "int32",
-        "int64",
-        "uint",
-        "uint8",
-        "uint16",
-        "uint32",
-        "uint64",
-    ]
     for npi in NP_INTS:
         if hasattr(np, npi):
             SIMPLIFY_TYPE[getattr(np, npi)] = int
 
     SIMPLIFY_TYPE[np.bool_] = bool
+    _numpy_types_added = True
 
 
 def type_changed(old_value, new_value):
+    if not _numpy_types_added and "numpy" in sys.modules:
+        add_numpy_types()
     sot = SIMPLIFY_TYPE.get(type(old_value), type(old_value))
     snt = SIMPLIFY_TYPE.get(type(new_value), type(new_value))
     return sot != snt and old_value is not None  # ignore typechanges from None
@@ -1,8 +1,6 @@
 #!/usr/bin/env python
 # coding=utf-8
 
-import jsonpickle.tags
-
 from sacred import SETTINGS
 import sacred.optional as opt
 from sacred.config.custom_containers import DogmaticDict, DogmaticList
@@ -44,6 +42,8 @@ def assert_is_valid_key(key):
             'contain "." or start with "$"'.format(key)
         )
 
+    import jsonpickle.tags
+
     if (
         SETTINGS.CONFIG.ENFORCE_KEYS_JSONPICKLE_COMPATIBLE
         and isinstance(key, str)
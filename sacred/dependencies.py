@@ -1,18 +1,22 @@
 #!/usr/bin/env python
 # coding=utf-8
 
+import atexit
 import functools
 import hashlib
+import json
 import os.path
 import re
+import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import pkg_resources
-
 import sacred.optional as opt
 from sacred import SETTINGS
-from sacred.utils import iter_prefixes
+from sacred.utils import iter_prefixes, write_json_atomically
 
 MB = 1048576
 MODULE_BLACKLIST = set(sys.builtin_module_names)
@@ -386,8 +390,42 @@ def get_py_file_if_possible(pyc_name):
     return pyc_name
 
 
+# real path -> ((size, mtime_ns, inode), digest)
+_digest_cache = {}
+_digest_cache_lock = threading.Lock()
+_digest_cache_file = None
+_digest_cache_changed = False
+# files that were modified more recently could change again without changing
+# their size or modification time, so their digests are not cached
+_DIGEST_CACHE_MIN_AGE_NS = 2 * 10**9
+
+
 def get_digest(filename):
-    """Compute the MD5 hash for a given file."""
+    """Compute the MD5 hash for a given file.
+
+    Digests are cached for the process by the real path, size, modification
+    time and inode of the file, and persisted in SETTINGS.DIGEST_CACHE_FILE
+    if that is set.
+    """
+    path = os.path.realpath(filename)
+    stat = os.stat(path)
+    key = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    with _digest_cache_lock:
+        _load_digest_cache()
+        cached = _digest_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    digest = _compute_digest(path)
+    if time.time_ns() - stat.st_mtime_ns > _DIGEST_CACHE_MIN_AGE_NS:
+        global _digest_cache_changed
+        with _digest_cache_lock:
+            _digest_cache[path] = (key, digest)
+            _digest_cache_changed = True
+    return digest
+
+
+def _compute_digest(filename):
     h = hashlib.md5()
     with open(filename, "rb") as f:
         data = f.read(1 * MB)
@@ -397,6 +435,42 @@ def get_digest(filename):
         return h.hexdigest()
 
 
+def _read_digest_cache(cache_file):
+    try:
+        with open(cache_file) as f:
+            entries = json.load(f)
+        return {path: (tuple(key), digest) for path, (key, digest) in entries.items()}
+    except (OSError, ValueError, TypeError):
+        return {}
+
+
+def _load_digest_cache():
+    global _digest_cache_file
+    cache_file = SETTINGS.DIGEST_CACHE_FILE
+    if cache_file is None or cache_file == _digest_cache_file:
+        return
+    cache_file = os.path.expanduser(cache_file)
+    for path, entry in _read_digest_cache(cache_file).items():
+        _digest_cache.setdefault(path, entry)
+    if _digest_cache_file is None:
+        atexit.register(_save_digest_cache)
+    _digest_cache_file = SETTINGS.DIGEST_CACHE_FILE
+
+
+def _save_digest_cache():
+    """Merge the cached digests into SETTINGS.DIGEST_CACHE_FILE."""
+    global _digest_cache_changed
+    with _digest_cache_lock:
+        if _digest_cache_file is None or not _digest_cache_changed:
+            return
+        cache_file = os.path.expanduser(_digest_cache_file)
+        # other processes might have added digests in the meantime
+        entries = _read_digest_cache(cache_file)
+        entries.update(_digest_cache)
+        if write_json_atomically(cache_file, entries):
+            _digest_cache_changed = False
+
+
 def get_commit_if_possible(filename, save_git_info):
     """Try to retrieve VCS information for a given file.
 
@@ -413,11 +487,21 @@ def get_commit_if_possible(filename, save_git_info):
         commit: str
             The commit hash
         is_dirty: bool
-            True if there are uncommitted changes in the repository
+            True if there are uncommitted changes in the repository, or None
+            if that was not checked (see SETTINGS.GIT.DIRTY_CHECK)
+
+    The information is only queried once per repository and then cached for
+    the lifetime of the process.
     """
     if save_git_info is False:
         return None, None, None
 
+    if SETTINGS.GIT.DIRTY_CHECK not in dirty_checks:
+        raise ValueError(
+            "SETTINGS.GIT.DIRTY_CHECK must be one of 'full', 'fast', 'none', "
+            "but was {!r}".format(SETTINGS.GIT.DIRTY_CHECK)
+        )
+
     try:
         from git import Repo, InvalidGitRepositoryError
     except ImportError as e:
@@ -428,20 +512,91 @@ def get_commit_if_possible(filename, save_git_info):
             "    sacred.Experiment(..., save_git_info=False)"
         ) from e
 
-    directory = os.path.dirname(filename)
-    try:
-        repo = Repo(directory, search_parent_directories=True)
-    except InvalidGitRepositoryError:
-        return None, None, None
+    root = _find_git_root(os.path.dirname(filename))
+    with _git_cache_lock:
+        if root not in _git_info_cache:
+            try:
+                repo = Repo(root, search_parent_directories=True)
+            except InvalidGitRepositoryError:
+                _git_info_cache[root] = None, None, None
+            else:
+                _git_info_cache[root] = _get_git_info(repo)
+        return _git_info_cache[root]
+
+
+# directory -> root of the git repository that contains it
+_git_root_cache = {}
+# root of a git repository -> (url, commit, is_dirty)
+_git_info_cache = {}
+_git_cache_lock = threading.Lock()
+
+
+def _find_git_root(directory):
+    """Find the working directory of the git repository containing directory.
+
+    The result is cached for all the directories that are traversed, so the
+    sources of an experiment only need a few stat calls in total.
+    """
+    directory = os.path.realpath(directory)
+    traversed = []
+    with _git_cache_lock:
+        while True:
+            if directory in _git_root_cache:
+                root = _git_root_cache[directory]
+                break
+            traversed.append(directory)
+            # .git is a file for worktrees and submodules
+            if os.path.exists(os.path.join(directory, ".git")):
+                root = directory
+                break
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                # not in a working directory, but GitPython might still find
+                # the repository, e.g. from the GIT_DIR environment variable
+                root = traversed[0]
+                break
+            directory = parent
+        for d in traversed:
+            _git_root_cache[d] = root
+    return root
+
+
+def _get_git_info(repo):
     try:
         path = repo.remote().url
     except ValueError:
         path = "git:/" + repo.working_dir
-    is_dirty = repo.is_dirty()
     commit = repo.head.commit.hexsha
+    is_dirty = dirty_checks[SETTINGS.GIT.DIRTY_CHECK](repo)
     return path, commit, is_dirty
 
 
+def _is_dirty_fast(repo):
+    """Check for changes of tracked files with a single git process.
+
+    ``git diff --quiet`` stops at the first difference. Returns None if git
+    failed or did not finish within SETTINGS.GIT.DIRTY_CHECK_TIMEOUT seconds.
+    """
+    try:
+        returncode = subprocess.run(
+            ["git", "diff", "--quiet", "--no-ext-diff", "HEAD", "--"],
+            cwd=repo.working_dir,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=SETTINGS.GIT.DIRTY_CHECK_TIMEOUT,
+        ).returncode
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return {0: False, 1: True}.get(returncode)
+
+
+dirty_checks = {
+    "full": lambda repo: repo.is_dirty(),
+    "fast": _is_dirty_fast,
+    "none": lambda repo: None,
+}
+
+
 @functools.total_ordering
 class Source:
     def __init__(self, filename, digest, repo, commit, isdirty):
@@ -498,8 +653,8 @@ class PackageDependency:
     def fill_missing_version(self):
         if self.version is not None:
             return
-        dist = pkg_resources.working_set.by_key.get(self.name)
-        self.version = dist.version if dist else None
+        dist = get_package_index()["distributions"].get(_normalize_name(self.name))
+        self.version = dist[1] if dist else None
 
     def to_json(self):
         return "{}=={}".format(self.name, self.version or "<unknown>")
@@ -524,19 +679,104 @@ class PackageDependency:
         if not cls.modname_to_dist:
             # some packagenames don't match the module names (e.g. PyYAML)
             # so we set up a dict to map from module name to package name
-            for dist in pkg_resources.working_set:
-                try:
-                    toplevel_names = dist._get_metadata("top_level.txt")
-                    for tln in toplevel_names:
-                        cls.modname_to_dist[tln] = dist.project_name, dist.version
-                except Exception:
-                    pass
+            cls.modname_to_dist.update(get_package_index()["modules"])
 
         name, version = cls.modname_to_dist.get(mod.__name__, (mod.__name__, None))
 
         return PackageDependency(name, version)
 
 
+_package_index = None
+_package_index_lock = threading.Lock()
+
+
+def get_package_index():
+    """Return the installed distributions and the modules they provide.
+
+    The result is a dictionary with two entries:
+    ``"distributions"`` maps the normalized name of each distribution to its
+    name and version, and ``"modules"`` maps top-level module names to the
+    name and version of the distribution that provides them.
+
+    Scanning the metadata of all distributions is slow in large environments,
+    so the index is computed only once per process. It is also cached in
+    SETTINGS.CACHE_DIR, keyed by the entries of sys.path and their
+    modification times, which change whenever a package is (un)installed.
+    """
+    global _package_index
+    with _package_index_lock:
+        if _package_index is None:
+            _package_index = _load_package_index()
+        return _package_index
+
+
+def _load_package_index():
+    cache_dir = SETTINGS.CACHE_DIR
+    if cache_dir is None:
+        return _scan_package_index()
+    key = [sys.version]
+    for entry in sys.path:
+        try:
+            key.append([entry, os.stat(entry or ".").st_mtime_ns])
+        except OSError:
+            key.append([entry, None])
+    # one cache file per environment
+    env_hash = hashlib.md5("\0".join([sys.executable, sys.prefix]).encode()).hexdigest()
+    cache_file = os.path.join(
+        os.path.expanduser(cache_dir), "packages-{}.json".format(env_hash)
+    )
+    try:
+        with open(cache_file) as f:
+            cached = json.load(f)
+        if cached["key"] == key:
+            return {
+                name: {k: tuple(v) for k, v in cached[name].items()}
+                for name in ["distributions", "modules"]
+            }
+    except (OSError, ValueError, KeyError, AttributeError, TypeError):
+        pass
+    index = _scan_package_index()
+    write_json_atomically(cache_file, dict(index, key=key))
+    return index
+
+
+def _scan_package_index():
+    from importlib import metadata
+
+    distributions = {}
+    for dist in metadata.distributions():
+        name = dist.metadata["Name"]
+        if name:
+            # distributions earlier on sys.path shadow later ones
+            distributions.setdefault(_normalize_name(name), (name, dist.version))
+
+    modules = {}
+    for module, dist_names in _packages_distributions().items():
+        for dist_name in dist_names:
+            dist = distributions.get(_normalize_name(dist_name))
+            if dist is not None:
+                modules.setdefault(module, dist)
+    return {"distributions": distributions, "modules": modules}
+
+
+def _packages_distributions():
+    from importlib import metadata
+
+    if hasattr(metadata, "packages_distributions"):
+        return metadata.packages_distributions()
+    # Python < 3.10 only supports distributions with a top_level.txt
+    modules = {}
+    for dist in metadata.distributions():
+        for module in (dist.read_text("top_level.txt") or "").split():
+            modules.setdefault(module, []).append(dist.metadata["Name"])
+    return modules
+
+
+def _normalize_name(name):
+    """Normalize the name of a distribution as described in PEP 503."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
 def convert_path_to_module_parts(path):
     """Convert path to a python file into list of module names."""
     module_parts = list(path.parts)
@@ -623,14 +863,141 @@ def iterate_imported_modules(globs):
                 yield modname, mod
 
 
+class IgnoreRule:
+    """A single pattern of a .gitignore file.
+
+    Supports the gitignore syntax: ``*``, ``?``, ``[...]`` and ``**``
+    wildcards, negation with a leading ``!``, patterns that only match
+    directories with a trailing ``/``, and patterns that are anchored to the
+    directory of the .gitignore file if they contain a ``/``.
+    """
+
+    def __init__(self, pattern, base_dir):
+        self.base_dir = base_dir
+        self.negate = pattern.startswith("!")
+        if self.negate:
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        self.anchored = "/" in pattern
+        self.regex = re.compile(_translate_glob(pattern.lstrip("/")))
+
+    @classmethod
+    def parse(cls, lines, base_dir):
+        rules = []
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if line.startswith("\\"):
+                line = line[1:]
+            elif not line or line.startswith("#"):
+                continue
+            rules.append(cls(line, base_dir))
+        return rules
+
+    def matches(self, path, is_dir):
+        if self.dir_only and not is_dir:
+            return False
+        rel_path = os.path.relpath(path, self.base_dir).replace(os.sep, "/")
+        if rel_path.startswith("../"):
+            return False
+        if not self.anchored:
+            rel_path = rel_path.rsplit("/", 1)[-1]
+        return self.regex.fullmatch(rel_path) is not None
+
+
+def _translate_glob(pattern):
+    """Translate a gitignore glob to a regular expression."""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            content = pattern[i + 1 : end]
+            if content.startswith("!"):
+                content = "^" + content[1:]
+            parts.append("[" + content.replace("\\", "\\\\") + "]")
+            i = end + 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(parts)
+
+
+def is_ignored(path, is_dir, rules):
+    """Check if path is ignored by rules. The last matching rule decides."""
+    ignored = False
+    for rule in rules:
+        if rule.negate == ignored and rule.matches(path, is_dir):
+            ignored = not rule.negate
+    return ignored
+
+
+def _read_gitignore(directory):
+    try:
+        with open(os.path.join(directory, ".gitignore")) as f:
+            return IgnoreRule.parse(f, directory)
+    except (OSError, UnicodeDecodeError):
+        return []
+
+
+def _get_parent_ignore_rules(base_path):
+    """Read the .gitignore files of the git repository above base_path."""
+    parents = []
+    directory = base_path
+    while not os.path.exists(os.path.join(directory, ".git")):
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return []  # base_path is not inside of a git repository
+        directory = parent
+        parents.append(directory)
+    rules = []
+    for directory in reversed(parents):
+        rules += _read_gitignore(directory)
+    return rules
+
+
 def iterate_all_python_files(base_path):
-    # TODO support ignored directories/files
+    """Iterate over all python files in base_path and its subdirectories.
+
+    Files and directories are skipped if they are ignored by a .gitignore
+    file or by one of the patterns in SETTINGS.DISCOVER_SOURCES_IGNORE, which
+    use the same syntax. Ignored directories and virtual environments are not
+    traversed at all.
+    """
+    base_path = os.path.abspath(base_path)
+    rules_by_dir = {
+        base_path: IgnoreRule.parse(SETTINGS.DISCOVER_SOURCES_IGNORE, base_path)
+        + _get_parent_ignore_rules(base_path)
+        + _read_gitignore(base_path)
+    }
     for dirname, subdirlist, filelist in os.walk(base_path):
-        if "__pycache__" in dirname:
-            continue
+        rules = rules_by_dir.pop(dirname)
+        # prune the ignored directories in place, so os.walk skips them
+        subdirlist[:] = [
+            d
+            for d in subdirlist
+            if not is_ignored(os.path.join(dirname, d), True, rules)
+            and not os.path.exists(os.path.join(dirname, d, "pyvenv.cfg"))
+        ]
+        for d in subdirlist:
+            subdir = os.path.join(dirname, d)
+            rules_by_dir[subdir] = rules + _read_gitignore(subdir)
         for filename in filelist:
-            if filename.endswith(".py"):
-                yield os.path.join(base_path, dirname, filename)
+            path = os.path.join(dirname, filename)
+            if filename.endswith(".py") and not is_ignored(path, False, rules):
+                yield path
 
 
 def iterate_sys_modules():
@@ -685,10 +1052,14 @@ def get_sources_from_imported_modules(globs, base_path, save_git_info):
 
 
 def get_sources_from_local_dir(globs, base_path, save_git_info):
-    return {
-        Source.create(filename, save_git_info)
-        for filename in iterate_all_python_files(base_path)
-    }
+    # hashing the files is mostly waiting for IO, so threads speed it up
+    with ThreadPoolExecutor() as executor:
+        return set(
+            executor.map(
+                functools.partial(Source.create, save_git_info=save_git_info),
+                iterate_all_python_files(base_path),
+            )
+        )
 
 
 def get_dependencies_from_sys_modules(globs, base_path):
@@ -700,12 +1071,10 @@ def get_dependencies_from_imported_modules(globs, base_path):
 
 
 def get_dependencies_from_pkg(globs, base_path):
-    dependencies = set()
-    for dist in pkg_resources.working_set:
-        if dist.version == "0.0.0":
-            continue  # ugly hack to deal with pkg-resource version bug
-        dependencies.add(PackageDependency(dist.project_name, dist.version))
-    return dependencies
+    return {
+        PackageDependency(name, version)
+        for name, version in get_package_index()["distributions"].values()
+    }
 
 
 source_discovery_strategies = {
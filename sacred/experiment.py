@@ -5,10 +5,9 @@ import os.path
 import sys
 import warnings
 from collections import OrderedDict
+from concurrent.futures import Future
 from typing import Sequence, Optional, List
 
-from docopt import docopt
-
 from sacred import SETTINGS
 from sacred.arg_parser import get_config_updates, format_usage, printable_usage
 from sacred import commandline_options
@@ -28,7 +27,11 @@ from sacred.initialize import create_run
 from sacred.observers.sql import sql_option
 from sacred.observers.tinydb_hashfs import tiny_db_option
 from sacred.run import Run
-from sacred.host_info import check_additional_host_info, HostInfoGetter
+from sacred.host_info import (
+    check_additional_host_info,
+    HostInfoGetter,
+    prefetch_host_info,
+)
 from sacred.utils import (
     print_filtered_stacktrace,
     ensure_wellformed_argv,
@@ -97,6 +100,7 @@ class Experiment(Ingredient):
         """
         self.additional_host_info = additional_host_info or []
         check_additional_host_info(self.additional_host_info)
+        prefetch_host_info()
         self.additional_cli_options = additional_cli_options or []
         self.all_cli_options = (
             gather_command_line_options() + self.additional_cli_options
@@ -134,6 +138,10 @@ class Experiment(Ingredient):
         self.current_run = None
         self.captured_out_filter = None
         """Filter function to be applied to captured output of a run"""
+        self.metric_policies = {}
+        """Maps metric names or prefixes to a policy that reduces the logged
+        metrics before they are sent to the observers
+        (see :class:`sacred.metrics_logger.MetricPolicy`)"""
         self.option_hooks = []
 
     # =========================== Decorators ==================================
@@ -295,6 +303,8 @@ class Experiment(Ingredient):
         """
         argv = ensure_wellformed_argv(argv)
         short_usage, usage, internal_usage = self.get_usage()
+        from docopt import docopt
+
         args = docopt(internal_usage, [str(a) for a in argv[1:]], default_help=False)
 
         cmd_name = args.get("COMMAND") or self.default_command
@@ -376,7 +386,7 @@ class Experiment(Ingredient):
         assert self.current_run is not None, "Can only be called during a run."
         return self.current_run.open_resource(filename, mode)
 
-    def add_resource(self, filename: PathType) -> None:
+    def add_resource(self, filename: PathType) -> Future:
         """Add a file as a resource.
 
         In Sacred terminology a resource is a file that the experiment needed
@@ -391,9 +401,14 @@ class Experiment(Ingredient):
         ----------
         filename
             name of the file to be stored as a resource
+
+        Returns
+        -------
+        A concurrent.futures.Future that is done once all observers processed
+        the resource.
         """
         assert self.current_run is not None, "Can only be called during a run."
-        self.current_run.add_resource(filename)
+        return self.current_run.add_resource(filename)
 
     def add_artifact(
         self,
@@ -401,7 +416,7 @@ class Experiment(Ingredient):
         name: Optional[str] = None,
         metadata: Optional[dict] = None,
         content_type: Optional[str] = None,
-    ) -> None:
+    ) -> Future:
         """Add a file as an artifact.
 
         In Sacred terminology an artifact is a file produced by the experiment
@@ -424,9 +439,17 @@ class Experiment(Ingredient):
         content_type
             optionally attach a content-type to the artifact.
             This only has an effect when using the MongoObserver.
+
+        Returns
+        -------
+        A concurrent.futures.Future, which is only needed to wait until all
+        observers stored the artifact. If ``SETTINGS.OBSERVERS.DISPATCH`` is
+        'parallel' only the upload happens in the background, after the file
+        was copied to a temporary directory. So the file may be changed as
+        soon as this function returns.
         """
         assert self.current_run is not None, "Can only be called during a run."
-        self.current_run.add_artifact(filename, name, metadata, content_type)
+        return self.current_run.add_artifact(filename, name, metadata, content_type)
 
     @property
     def info(self) -> dict:
@@ -469,6 +492,47 @@ class Experiment(Ingredient):
         # The same as Run.log_scalar
         self.current_run.log_scalar(name, value, step)
 
+    def log_scalars(self, metrics: dict, step: Optional[int] = None) -> None:
+        """
+        Add new measurements of several metrics at once.
+
+        All measurements share the same step and timestamp.
+
+        Parameters
+        ----------
+        metrics
+            A dictionary mapping metric names to measured values,
+            e.g. {"training.loss": 0.3, "training.accuracy": 0.9}
+        step
+            The step number (integer), e.g. the iteration number
+            If not specified, an internal counter for each metric
+            is used, incremented by one.
+        """
+        # The same as Run.log_scalars
+        self.current_run.log_scalars(metrics, step)
+
+    def log_scalar_array(
+        self, name: str, values: Sequence[float], steps: Optional[Sequence[int]] = None
+    ) -> None:
+        """
+        Add a whole series of measurements of a single metric at once.
+
+        NumPy arrays are added in bulk, without converting each element.
+
+        Parameters
+        ----------
+        name
+            The name of the metric, e.g. training.loss
+        values
+            A one-dimensional array or list of measured values
+        steps
+            A one-dimensional array or list of step numbers with the same
+            length as values. If not specified, an internal counter is used,
+            incremented by one for each value.
+        """
+        # The same as Run.log_scalar_array
+        self.current_run.log_scalar_array(name, values, steps)
+
     def post_process_name(self, name, ingredient):
         if ingredient == self:
             # Removes the experiment's path (prefix) from the names
@@ -1,16 +1,19 @@
 """Helps to collect information about the host of an experiment."""
 
+import concurrent.futures
+import json
 import os
 import platform
 import re
 import subprocess
+import threading
+import time
+from concurrent.futures import Future
 from xml.etree import ElementTree
 import warnings
 from typing import List
 
-import cpuinfo
-
-from sacred.utils import optional_kwargs_decorator
+from sacred.utils import optional_kwargs_decorator, write_json_atomically
 from sacred.settings import SETTINGS
 
 __all__ = ("host_info_gatherers", "get_host_info", "host_info_getter")
@@ -58,6 +61,9 @@ def check_additional_host_info(additional_host_info: List[HostInfoGetter]):
 def get_host_info(additional_host_info: List[HostInfoGetter] = None):
     """Collect some information about the machine this experiment runs on.
 
+    All gatherers run concurrently. Gatherers that don't finish within
+    SETTINGS.HOST_INFO.TIMEOUT seconds are left out with a warning.
+
     Returns
     -------
     dict
@@ -71,15 +77,52 @@ def get_host_info(additional_host_info: List[HostInfoGetter] = None):
     all_host_info_gatherers = host_info_gatherers.copy()
     for getter in additional_host_info:
         all_host_info_gatherers[getter.name] = getter
+    futures = {k: _run_in_background(v) for k, v in all_host_info_gatherers.items()}
+    timeout = SETTINGS.HOST_INFO.TIMEOUT
+    deadline = None if timeout is None else time.monotonic() + timeout
     host_info = {}
-    for k, v in all_host_info_gatherers.items():
+    for k, future in futures.items():
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
         try:
-            host_info[k] = v()
+            host_info[k] = future.result(remaining)
         except IgnoreHostInfo:
             pass
+        except concurrent.futures.TimeoutError:
+            warnings.warn(
+                "Gathering the host info {!r} took longer than {} seconds, "
+                "so it is left out.".format(k, timeout)
+            )
     return host_info
 
 
+def prefetch_host_info():
+    """Start gathering the static host info in the background.
+
+    This is called when an experiment is created, such that the CPU, GPU and
+    OS information is usually available once the first run starts.
+    """
+    for getter in _static_host_info_gatherers:
+        _run_in_background(getter)
+
+
+def _run_in_background(func):
+    """Call func in a new thread and return a Future for its result.
+
+    Daemon threads are used, such that a gatherer that hangs does not keep the
+    process from exiting.
+    """
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(func())
+        except Exception as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="host-info", daemon=True).start()
+    return future
+
+
 @optional_kwargs_decorator
 def host_info_getter(func, name=None):
     """
@@ -125,7 +168,7 @@ def _hostname():
 
 @host_info_gatherer(name="os")
 def _os():
-    return [platform.system(), platform.platform()]
+    return _get_static_info("os", lambda: [platform.system(), platform.platform()])
 
 
 @host_info_gatherer(name="python_version")
@@ -137,7 +180,126 @@ def _python_version():
 def _cpu():
     if not SETTINGS.HOST_INFO.INCLUDE_CPU_INFO:
         return
+    return _get_static_info("cpu", _get_cpu)
+
+
+@host_info_gatherer(name="gpus")
+def _gpus():
+    if not SETTINGS.HOST_INFO.INCLUDE_GPU_INFO:
+        return
+    return _get_static_info("gpus", _get_gpus)
+
+
+@host_info_gatherer(name="ENV")
+def _environment():
+    keys_to_capture = SETTINGS.HOST_INFO.CAPTURED_ENV
+    return {k: os.environ[k] for k in keys_to_capture if k in os.environ}
+
+
+_host_info_gatherers_list = [_hostname, _os, _python_version, _cpu, _gpus, _environment]
+_static_host_info_gatherers = [_os, _cpu, _gpus]
+
+# ################### Cache of Static Host Information ########################
+
+# name -> {"value": value} or {"ignored": True}
+_static_host_info = None
+# name -> Future of a gatherer that is currently running
+_static_host_info_pending = {}
+_static_host_info_lock = threading.Lock()
+
+
+def _get_static_info(name, gather):
+    """Return the result of gather, which is cached for the current boot.
+
+    The CPU, the GPUs and the OS don't change until the next reboot, so they
+    are only gathered once per process and stored in a file in
+    SETTINGS.CACHE_DIR that is specific to the current boot of the machine.
+    Concurrent calls for the same name wait for the same gatherer.
+    """
+    with _static_host_info_lock:
+        future = _static_host_info_pending.get(name)
+        is_owner = future is None
+        if is_owner:
+            future = _static_host_info_pending[name] = Future()
+    if is_owner:
+        try:
+            future.set_result(_gather_static_info(name, gather))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with _static_host_info_lock:
+                del _static_host_info_pending[name]
+    entry = future.result()
+    if "value" not in entry:
+        raise IgnoreHostInfo()
+    return entry["value"]
+
+
+def _reset_static_host_info_lock():
+    # the threads running the gatherers do not survive a fork
+    global _static_host_info_pending, _static_host_info_lock
+    _static_host_info_pending = {}
+    _static_host_info_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_static_host_info_lock)
+
+
+def _gather_static_info(name, gather):
+    cache = _load_static_host_info()
+    if name in cache:
+        return cache[name]
+    try:
+        entry = {"value": gather()}
+    except IgnoreHostInfo as e:
+        if isinstance(e.__cause__, subprocess.TimeoutExpired):
+            raise  # might work the next time
+        entry = {"ignored": True}
+    with _static_host_info_lock:
+        cache[name] = entry
+        cache_file = _get_static_host_info_file()
+        if cache_file is not None:
+            # other processes might have added entries in the meantime
+            write_json_atomically(cache_file, dict(_read_json(cache_file), **cache))
+    return entry
+
+
+def _load_static_host_info():
+    global _static_host_info
+    with _static_host_info_lock:
+        if _static_host_info is None:
+            cache_file = _get_static_host_info_file()
+            _static_host_info = _read_json(cache_file) if cache_file else {}
+        return _static_host_info
+
+
+def _get_static_host_info_file():
+    if SETTINGS.CACHE_DIR is None:
+        return None
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            boot_id = f.read().strip()
+    except OSError:
+        return None  # only supported on Linux
+    return os.path.join(
+        os.path.expanduser(SETTINGS.CACHE_DIR), "host-info-{}.json".format(boot_id)
+    )
+
+
+def _read_json(filename):
+    try:
+        with open(filename) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+# ################### Get CPU Information ###############################
+
 
+def _get_cpu():
     if platform.system() == "Windows":
         return _get_cpu_by_pycpuinfo()
     try:
@@ -150,16 +312,41 @@ def _cpu():
         return _get_cpu_by_pycpuinfo()
 
 
-@host_info_gatherer(name="gpus")
-def _gpus():
-    if not SETTINGS.HOST_INFO.INCLUDE_GPU_INFO:
-        return
+def _get_cpu_by_sysctl():
+    os.environ["PATH"] += ":/usr/sbin"
+    command = ["sysctl", "-n", "machdep.cpu.brand_string"]
+    return subprocess.check_output(command).decode().strip()
+
+
+def _get_cpu_by_proc_cpuinfo():
+    with open("/proc/cpuinfo") as f:
+        all_info = f.read()
+    model_pattern = re.compile(r"^\s*model name\s*:")
+    for line in all_info.split("\n"):
+        if model_pattern.match(line):
+            return model_pattern.sub("", line, 1).strip()
+
+
+def _get_cpu_by_pycpuinfo():
+    import cpuinfo
+
+    return cpuinfo.get_cpu_info().get("brand_raw", "Unknown")
 
+
+# ################### Get GPU Information ###############################
+
+
+def _get_gpus():
     try:
-        xml = subprocess.check_output(["nvidia-smi", "-q", "-x"]).decode(
-            "utf-8", "replace"
-        )
-    except (FileNotFoundError, OSError, subprocess.CalledProcessError) as e:
+        xml = subprocess.check_output(
+            ["nvidia-smi", "-q", "-x"], timeout=SETTINGS.HOST_INFO.TIMEOUT
+        ).decode("utf-8", "replace")
+    except (
+        FileNotFoundError,
+        OSError,
+        subprocess.CalledProcessError,
+        subprocess.TimeoutExpired,
+    ) as e:
         raise IgnoreHostInfo() from e
 
     gpu_info = {"gpus": []}
@@ -181,33 +368,3 @@ def _gpus():
         gpu_info["gpus"].append(gpu)
 
     return gpu_info
-
-
-@host_info_gatherer(name="ENV")
-def _environment():
-    keys_to_capture = SETTINGS.HOST_INFO.CAPTURED_ENV
-    return {k: os.environ[k] for k in keys_to_capture if k in os.environ}
-
-
-_host_info_gatherers_list = [_hostname, _os, _python_version, _cpu, _gpus, _environment]
-
-# ################### Get CPU Information ###############################
-
-
-def _get_cpu_by_sysctl():
-    os.environ["PATH"] += ":/usr/sbin"
-    command = ["sysctl", "-n", "machdep.cpu.brand_string"]
-    return subprocess.check_output(command).decode().strip()
-
-
-def _get_cpu_by_proc_cpuinfo():
-    command = ["cat", "/proc/cpuinfo"]
-    all_info = subprocess.check_output(command).decode()
-    model_pattern = re.compile(r"^\s*model name\s*:")
-    for line in all_info.split("\n"):
-        if model_pattern.match(line):
-            return model_pattern.sub("", line, 1).strip()
-
-
-def _get_cpu_by_pycpuinfo():
-    return cpuinfo.get_cpu_info().get("brand_raw", "Unknown")
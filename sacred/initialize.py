@@ -468,6 +468,7 @@ def create_run(
         pre_runs,
         post_runs,
         experiment.captured_out_filter,
+        experiment.metric_policies,
     )
 
     if hasattr(main_function, "unobserved"):
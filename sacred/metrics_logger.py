@@ -1,9 +1,19 @@
 #!/usr/bin/env python
 # coding=utf-8
+import copy
 import datetime
+import numbers
+import sys
+import threading
+import time
+from array import array
+
 import sacred.optional as opt
+from sacred.utils import is_prefix
 
-from queue import Queue, Empty
+_EPOCH = datetime.datetime(1970, 1, 1)
+# approximate size of the step, value and timestamp of a buffered measurement
+_MEASUREMENT_BYTES = 24
 
 
 class MetricsLogger:
@@ -15,12 +25,61 @@ class MetricsLogger:
     _run.metrics.log_scalar_metric.
     """
 
-    def __init__(self):
-        # Create a message queue that remembers
-        # calls of the log_scalar_metric
-        self._logged_metrics = Queue()
+    def __init__(
+        self,
+        defer_conversion=False,
+        policies=None,
+        max_buffered=None,
+        max_buffered_bytes=None,
+    ):
+        # One columnar buffer per metric name. The whole dict is swapped out
+        # when the metrics are read, so logging only costs a single append.
+        self._logged_metrics = {}
+        self._lock = threading.Lock()
         self._metric_step_counter = {}
         """Remembers the last number of each metric."""
+        self.defer_conversion = defer_conversion
+        """If True, tensor-like values are only converted when read.
+
+        Values that provide ``item()`` or ``__array__`` (e.g. PyTorch tensors)
+        are stored as references and converted in one batch when the metrics
+        are read during the heartbeat, so that logging never forces a
+        host-device synchronization."""
+        # policies are copied, so that their state is not shared between runs
+        self.policies = copy.deepcopy(dict(policies or {}))
+        """Maps metric names or prefixes to a :class:`MetricPolicy`."""
+        self._policy_cache = {}
+        self.max_buffered = max_buffered
+        """Number of buffered measurements that triggers an early flush."""
+        self.max_buffered_bytes = max_buffered_bytes
+        """Approximate size in bytes of the buffer that triggers an early flush.
+
+        Deferred tensor-like values count with their ``nbytes``."""
+        self.on_max_buffered = None
+        """Called (once per read) when max_buffered measurements or
+        max_buffered_bytes are buffered."""
+        self._num_buffered = 0
+        self._buffered_bytes = 0
+        self._flush_requested = False
+
+    def _convert_value(self, value):
+        if opt.has_numpy and isinstance(value, opt.np.generic):
+            return value.item(), False
+        if self.defer_conversion and _is_tensor_like(value):
+            # don't keep the autograd graph alive until the next heartbeat and
+            # copy the value, so that in-place updates don't change it
+            if hasattr(value, "detach"):
+                return value.detach().clone(), True
+            if _is_ndarray(value):
+                return opt.np.array(value, copy=True), True
+            return value, True
+        return value, False
+
+    def _get_columns(self, metric_name):
+        columns = self._logged_metrics.get(metric_name)
+        if columns is None:
+            columns = self._logged_metrics[metric_name] = MetricColumns(metric_name)
+        return columns
 
     def log_scalar_metric(self, metric_name, value, step=None):
         """
@@ -36,32 +95,548 @@ class MetricsLogger:
                     If not specified, an internal counter for each metric
                     is used, incremented by one.
         """
-        if opt.has_numpy:
-            np = opt.np
-            if isinstance(value, np.generic):
-                value = value.item()
-            if isinstance(step, np.generic):
-                step = step.item()
+        if type(value) is int or type(value) is float:
+            deferred = False
+        else:
+            value, deferred = self._convert_value(value)
+        if self.policies:
+            self._check_values(metric_name, (value,))
+        if opt.has_numpy and isinstance(step, opt.np.generic):
+            step = step.item()
         if step is None:
             step = self._metric_step_counter.get(metric_name, -1) + 1
-        self._logged_metrics.put(
-            ScalarMetricLogEntry(metric_name, step, datetime.datetime.utcnow(), value)
-        )
+        with self._lock:
+            self._get_columns(metric_name).append(step, value, time.time(), deferred)
+            self._num_buffered += 1
+            self._buffered_bytes += _MEASUREMENT_BYTES
+            if deferred:
+                self._buffered_bytes += _nbytes(value)
         self._metric_step_counter[metric_name] = step
+        if self.max_buffered is not None or self.max_buffered_bytes is not None:
+            self._check_high_water_mark()
+
+    def log_scalar_metrics(self, metrics, step=None):
+        """
+        Add new measurements of several metrics taken at the same step.
+
+        :param metrics: A dictionary that maps metric names to measured values.
+        :param step: The step number (integer), shared by all the measurements.
+                    If not specified, the internal counter of each metric
+                    is used, incremented by one.
+        """
+        converted = [
+            (name, *self._convert_value(value)) for name, value in metrics.items()
+        ]
+        if self.policies:
+            for metric_name, value, _ in converted:
+                self._check_values(metric_name, (value,))
+        if opt.has_numpy and isinstance(step, opt.np.generic):
+            step = step.item()
+        timestamp = time.time()
+        with self._lock:
+            for metric_name, value, deferred in converted:
+                metric_step = step
+                if metric_step is None:
+                    metric_step = self._metric_step_counter.get(metric_name, -1) + 1
+                columns = self._get_columns(metric_name)
+                columns.append(metric_step, value, timestamp, deferred)
+                self._metric_step_counter[metric_name] = metric_step
+                if deferred:
+                    self._buffered_bytes += _nbytes(value)
+            self._num_buffered += len(converted)
+            self._buffered_bytes += _MEASUREMENT_BYTES * len(converted)
+        if self.max_buffered is not None or self.max_buffered_bytes is not None:
+            self._check_high_water_mark()
+
+    def log_scalar_metric_array(self, metric_name, values, steps=None):
+        """
+        Add a whole series of measurements of a single metric.
+
+        NumPy arrays are copied into the buffer of the metric in bulk, without
+        converting the individual elements.
+
+        :param metric_name: The name of the metric, e.g. training.loss.
+        :param values: A one-dimensional array or sequence of measured values.
+        :param steps: A one-dimensional array or sequence of step numbers of
+                    the same length as values. If not specified, the internal
+                    counter of the metric is used, incremented by one for
+                    each value.
+        """
+        if not _is_ndarray(values) and hasattr(values, "tolist"):
+            # other array types (e.g. tensors) are converted in one call
+            values = values.tolist()
+        if not _is_ndarray(steps) and hasattr(steps, "tolist"):
+            steps = steps.tolist()
+        if getattr(values, "ndim", 1) != 1 or getattr(steps, "ndim", 1) != 1:
+            raise ValueError("steps and values must be one-dimensional")
+        length = len(values)
+        if steps is not None and len(steps) != length:
+            raise ValueError(
+                "steps and values must have the same length, but have "
+                "lengths {} and {}".format(len(steps), length)
+            )
+        if length == 0:
+            return
+        if self.policies:
+            self._check_values(metric_name, values)
+        timestamp = time.time()
+        with self._lock:
+            if steps is None:
+                first_step = self._metric_step_counter.get(metric_name, -1) + 1
+                steps = range(first_step, first_step + length)
+            self._get_columns(metric_name).extend(steps, values, timestamp)
+            last_step = steps[-1]
+            if opt.has_numpy and isinstance(last_step, opt.np.generic):
+                last_step = last_step.item()
+            self._metric_step_counter[metric_name] = last_step
+            self._num_buffered += length
+            self._buffered_bytes += _MEASUREMENT_BYTES * length
+        if self.max_buffered is not None or self.max_buffered_bytes is not None:
+            self._check_high_water_mark()
+
+    def _check_values(self, metric_name, values):
+        # reject values that the policy cannot reduce while the caller can
+        # still handle the error, instead of failing during the heartbeat
+        policy = self.get_policy(metric_name)
+        if policy is not None:
+            policy.check_values(metric_name, values)
+
+    def _check_high_water_mark(self):
+        with self._lock:
+            if self._flush_requested or not (
+                _exceeds(self._num_buffered, self.max_buffered)
+                or _exceeds(self._buffered_bytes, self.max_buffered_bytes)
+            ):
+                return
+            self._flush_requested = True
+        if self.on_max_buffered is not None:
+            self.on_max_buffered()
+
+    def _swap_buffers(self):
+        with self._lock:
+            logged_metrics, self._logged_metrics = self._logged_metrics, {}
+            self._num_buffered = 0
+            self._buffered_bytes = 0
+            self._flush_requested = False
+        return logged_metrics
+
+    def get_last_metrics_by_name(self):
+        """Read all measurements since last read, grouped by metric name.
+
+        :return: Measured values grouped by the metric name in the same format
+                 as returned by :func:`linearize_metrics`.
+        """
+        metrics_by_name = {}
+        for name, columns in self._swap_buffers().items():
+            policy = self.get_policy(name)
+            if policy is None:
+                metrics_by_name[name] = columns.to_dict()
+                continue
+            reduced = policy.reduce(name, *columns.get_columns())
+            for reduced_name, steps, values, timestamps in reduced:
+                if len(values):
+                    metrics_by_name[reduced_name] = _make_metric(
+                        reduced_name, steps, values, timestamps
+                    )
+        return metrics_by_name
 
     def get_last_metrics(self):
         """Read all measurement events since last call of the method.
 
         :return List[ScalarMetricLogEntry]
         """
-        read_up_to = self._logged_metrics.qsize()
         messages = []
-        for i in range(read_up_to):
+        for metric in self.get_last_metrics_by_name().values():
+            messages.extend(
+                ScalarMetricLogEntry(metric["name"], step, timestamp, value)
+                for step, value, timestamp in zip(
+                    metric["steps"], metric["values"], metric["timestamps"]
+                )
+            )
+        messages.sort(key=lambda entry: entry.timestamp)
+        return messages
+
+    def get_policy(self, metric_name):
+        """Return the policy for the given metric, or None if there is none.
+
+        A policy registered for the exact metric name takes precedence,
+        otherwise the policy with the longest matching dotted prefix is used.
+        """
+        if metric_name not in self._policy_cache:
+            policy = self.policies.get(metric_name)
+            if policy is None:
+                prefixes = [p for p in self.policies if is_prefix(p, metric_name)]
+                if prefixes:
+                    policy = self.policies[max(prefixes, key=len)]
+            self._policy_cache[metric_name] = policy
+        return self._policy_cache[metric_name]
+
+
+class MetricColumns:
+    """Columnar buffer for the measurements of a single scalar metric.
+
+    Steps, values and timestamps are stored in typed arrays as long as all
+    logged values are ints or all are floats, and fall back to plain lists
+    otherwise, such that the values are never converted.
+    Timestamps are stored as POSIX timestamps and only converted to
+    datetime objects when the buffer is read.
+    """
+
+    __slots__ = ("name", "steps", "values", "timestamps", "has_deferred")
+
+    def __init__(self, name):
+        self.name = name
+        self.steps = None
+        self.values = None
+        self.timestamps = array("d")
+        self.has_deferred = False
+
+    def append(self, step, value, timestamp, deferred=False):
+        if self.values is None:
+            self.steps = _new_column(step)
+            self.values = [] if deferred else _new_column(value)
+        elif deferred and isinstance(self.values, array):
+            # typed arrays would convert the value right away
+            self.values = self.values.tolist()
+        self.has_deferred = self.has_deferred or deferred
+        self.steps = _append_to_column(self.steps, step)
+        self.values = _append_to_column(self.values, value)
+        self.timestamps.append(timestamp)
+
+    def extend(self, steps, values, timestamp):
+        self.steps = _extend_column(self.steps, steps)
+        self.values = _extend_column(self.values, values)
+        self.timestamps.extend(array("d", [timestamp]) * len(values))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def get_columns(self):
+        """Return the raw steps, values and timestamps columns."""
+        values = self.values
+        if self.has_deferred:
+            values = _convert_deferred_values(values)
+        return self.steps, values, self.timestamps
+
+    def to_dict(self):
+        return _make_metric(self.name, *self.get_columns())
+
+
+def _make_metric(name, steps, values, timestamps):
+    return {
+        "steps": _to_list(steps),
+        "values": _to_list(values),
+        "timestamps": [_EPOCH + datetime.timedelta(seconds=t) for t in timestamps],
+        "name": name,
+    }
+
+
+# the Python type and the NumPy dtype kinds that each typed column stores
+_COLUMN_TYPES = {"q": int, "d": float}
+_COLUMN_KINDS = {"q": "iu", "d": "f"}
+
+
+def _new_column(first_item):
+    if type(first_item) is int:
+        return array("q")
+    if type(first_item) is float:
+        return array("d")
+    return []
+
+
+def _append_to_column(column, item):
+    if isinstance(column, array):
+        # arrays would silently convert ints to floats and bools to ints
+        if type(item) is _COLUMN_TYPES[column.typecode]:
             try:
-                messages.append(self._logged_metrics.get_nowait())
-            except Empty:
+                column.append(item)
+                return column
+            except OverflowError:
                 pass
-        return messages
+        column = column.tolist()
+    column.append(item)
+    return column
+
+
+def _exceeds(size, limit):
+    return limit is not None and size >= limit
+
+
+def _nbytes(value):
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is None and hasattr(value, "element_size"):
+        # older PyTorch versions
+        nbytes = value.element_size() * value.nelement()
+    return nbytes or 0
+
+
+def _is_ndarray(items):
+    return opt.has_numpy and isinstance(items, opt.np.ndarray)
+
+
+def _is_tensor_like(value):
+    return not isinstance(value, (str, bytes)) and (
+        hasattr(value, "item") or hasattr(value, "__array__")
+    )
+
+
+def _to_scalar(value):
+    if hasattr(value, "item"):
+        return value.item()
+    return opt.np.asarray(value).item()
+
+
+def _convert_deferred_values(values):
+    """Convert all tensor-like values to Python scalars.
+
+    If the tensors come from a library with a ``stack`` function (like PyTorch
+    or NumPy) they are stacked and converted with a single call, such that
+    only one device synchronization is needed.
+    """
+    indices = [
+        i
+        for i, v in enumerate(values)
+        if type(v) is not int and type(v) is not float and _is_tensor_like(v)
+    ]
+    if not indices:
+        return values
+    tensors = [values[i] for i in indices]
+    converted = None
+    library = sys.modules.get(type(tensors[0]).__module__.partition(".")[0])
+    stack = getattr(library, "stack", None)
+    if stack is not None:
+        try:
+            converted = stack(tensors).reshape(-1).tolist()
+        except Exception:
+            converted = None
+    if converted is None or len(converted) != len(tensors):
+        converted = [_to_scalar(t) for t in tensors]
+    for i, value in zip(indices, converted):
+        values[i] = value
+    return values
+
+
+def _new_column_for(items):
+    if not _is_ndarray(items):
+        return _new_column(items[0])
+    dtype = items.dtype
+    if dtype.kind in "iu":
+        return array("q")
+    if dtype.kind == "f":
+        return array("d")
+    return []
+
+
+def _extend_column(column, items):
+    if column is None:
+        column = _new_column_for(items)
+    if isinstance(column, array):
+        typecode = column.typecode
+        if _is_ndarray(items):
+            np = opt.np
+            dtype = items.dtype
+            if dtype.kind in _COLUMN_KINDS[typecode] and np.can_cast(
+                dtype, typecode, "safe"
+            ):
+                items = np.ascontiguousarray(items, dtype=typecode)
+                column.frombytes(items.tobytes())
+                return column
+            items = items.tolist()
+        if all(type(item) is _COLUMN_TYPES[typecode] for item in items):
+            try:
+                # build the array first, such that a failure leaves column intact
+                column.extend(array(typecode, items))
+                return column
+            except OverflowError:
+                pass
+        column = column.tolist()
+    column.extend(items.tolist() if hasattr(items, "tolist") else items)
+    return column
+
+
+def _to_list(column):
+    if column is None:
+        return []
+    if isinstance(column, array):
+        return column.tolist()
+    return column
+
+
+class MetricPolicy:
+    """Reduces the measurements of a metric before they are sent to observers.
+
+    Policies are registered with the :class:`MetricsLogger` for a metric name
+    or a dotted prefix of metric names (e.g. ``"training"``) and are applied
+    to the measurements collected since the last heartbeat.
+    """
+
+    def reduce(self, name, steps, values, timestamps):
+        """Reduce the measurements of a metric.
+
+        :param name: The name of the metric.
+        :param steps: Sequence of steps.
+        :param values: Sequence of measured values.
+        :param timestamps: Sequence of POSIX timestamps.
+        :return: A list of (name, steps, values, timestamps) tuples, one for
+                 each metric that should be sent to the observers.
+        """
+        return [(name, steps, values, timestamps)]
+
+    def check_values(self, name, values):
+        """Raise an exception if the policy cannot reduce these values.
+
+        Called when the values are logged, before they are buffered.
+
+        :param name: The name of the metric.
+        :param values: Sequence of the logged values.
+        """
+
+
+class KeepEveryNth(MetricPolicy):
+    """Keep only every n-th measurement of a metric, counted over the run."""
+
+    def __init__(self, n):
+        if n < 1:
+            raise ValueError("n must be a positive integer, but was {}".format(n))
+        self.n = n
+        self._seen = {}
+
+    def reduce(self, name, steps, values, timestamps):
+        seen = self._seen.get(name, 0)
+        self._seen[name] = seen + len(values)
+        keep = slice((-seen) % self.n, None, self.n)
+        return [(name, steps[keep], values[keep], timestamps[keep])]
+
+
+class WindowAggregate(MetricPolicy):
+    """Replace all measurements of a heartbeat by summary statistics.
+
+    For each aggregation a separate metric named ``<name>.<aggregation>``
+    (e.g. ``training.loss.mean``) with a single value is reported, using the
+    step and timestamp of the last measurement in the window.
+    """
+
+    AGGREGATIONS = {
+        "min": min,
+        "max": max,
+        "mean": lambda values: sum(values) / len(values),
+        "sum": sum,
+        "count": len,
+        "first": lambda values: values[0],
+        "last": lambda values: values[-1],
+    }
+
+    def __init__(self, *aggregations):
+        aggregations = aggregations or ("min", "max", "mean")
+        unknown = set(aggregations) - set(self.AGGREGATIONS)
+        if unknown:
+            raise KeyError(
+                "Unknown aggregations {}. Available options are {}".format(
+                    sorted(unknown), sorted(self.AGGREGATIONS)
+                )
+            )
+        self.aggregations = aggregations
+
+    def check_values(self, name, values):
+        if not set(self.aggregations) <= {"count", "first", "last"}:
+            _check_numeric(name, values)
+
+    def reduce(self, name, steps, values, timestamps):
+        if not len(values):
+            return []
+        return [
+            (
+                "{}.{}".format(name, aggregation),
+                [steps[-1]],
+                [self.AGGREGATIONS[aggregation](values)],
+                [timestamps[-1]],
+            )
+            for aggregation in self.aggregations
+        ]
+
+
+class Downsample(MetricPolicy):
+    """Keep at most max_points measurements of a metric per heartbeat.
+
+    The points are selected with the Largest-Triangle-Three-Buckets
+    algorithm, which preserves the visual shape of the curve much better
+    than keeping every n-th point. The first and last points of each
+    heartbeat are always kept.
+    """
+
+    def __init__(self, max_points):
+        if max_points < 3:
+            raise ValueError(
+                "max_points must be at least 3, but was {}".format(max_points)
+            )
+        self.max_points = max_points
+
+    def check_values(self, name, values):
+        _check_numeric(name, values)
+
+    def reduce(self, name, steps, values, timestamps):
+        if len(values) <= self.max_points:
+            return [(name, steps, values, timestamps)]
+        indices = largest_triangle_three_buckets(steps, values, self.max_points)
+        return [
+            (
+                name,
+                [steps[i] for i in indices],
+                [values[i] for i in indices],
+                [timestamps[i] for i in indices],
+            )
+        ]
+
+
+def _check_numeric(name, values):
+    if _is_ndarray(values):
+        if values.dtype.kind in "biuf":
+            return
+        values = values.tolist()
+    for value in values:
+        if not isinstance(value, numbers.Real) and not _is_tensor_like(value):
+            raise TypeError(
+                "The policy of metric '{}' requires numeric values, but got "
+                "{!r}".format(name, value)
+            )
+
+
+def largest_triangle_three_buckets(xs, ys, threshold):
+    """Select the indices of threshold points that best represent a curve.
+
+    See Sveinn Steinarsson, "Downsampling Time Series for Visual
+    Representation" (2013).
+
+    :param xs: Sequence of x-coordinates (e.g. steps), in increasing order.
+    :param ys: Sequence of y-coordinates (e.g. values).
+    :param threshold: The number of points to select, at least 3.
+    :return: A list of indices into xs and ys.
+    """
+    length = len(xs)
+    if threshold >= length:
+        return list(range(length))
+    bucket_size = (length - 2) / (threshold - 2)
+    indices = [0]
+    a = 0
+    for i in range(threshold - 2):
+        # average point of the next bucket
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, length)
+        avg_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+        # point in the current bucket that forms the largest triangle
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        ax, ay = xs[a], ys[a]
+        max_area = -1
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                a = j
+        indices.append(a)
+    indices.append(length - 1)
+    return indices
 
 
 class ScalarMetricLogEntry:
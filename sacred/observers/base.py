@@ -8,6 +8,12 @@ class RunObserver:
     """Defines the interface for all run observers."""
 
     priority = 0
+    incremental_captured_out = False
+    # whether the final heartbeat_event receives the complete output, for
+    # incremental observers that can only replace the stored output
+    complete_captured_out_at_end = False
+    # minimum time between two heartbeats in seconds, None for every heartbeat
+    heartbeat_interval = None
 
     def queued_event(
         self, ex_info, command, host_info, queue_time, config, meta_info, _id
@@ -22,6 +28,27 @@ class RunObserver:
     def heartbeat_event(self, info, captured_out, beat_time, result):
         pass
 
+    def heartbeat_delta_event(
+        self,
+        info,
+        captured_out,
+        offset,
+        beat_time,
+        result,
+        info_changed=None,
+        result_changed=True,
+    ):
+        """Heartbeat that only receives the changes since the last heartbeat.
+
+        Called instead of heartbeat_event if incremental_captured_out is True.
+        captured_out replaces everything after the first offset characters
+        of the output received so far. info_changed lists the top-level keys
+        of info that were added, modified or removed (None means unknown) and
+        result_changed tells whether the result changed. Keys that are listed
+        but missing from info were removed.
+        """
+        pass
+
     def completed_event(self, stop_time, result):
         pass
 
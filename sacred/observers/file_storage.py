@@ -15,14 +15,17 @@ from sacred.dependencies import get_digest
 from sacred.observers.base import RunObserver
 from sacred import optional as opt
 from sacred.serializer import flatten
+from sacred.settings import SETTINGS
 from sacred.utils import PathType
 
 
 DEFAULT_FILE_STORAGE_PRIORITY = 20
+METRICS_FORMATS = ("json", "jsonl")
 
 
 class FileStorageObserver(RunObserver):
     VERSION = "FileStorageObserver-0.7.0"
+    incremental_captured_out = True
 
     @classmethod
     def create(cls, *args, **kwargs):
@@ -42,7 +45,38 @@ class FileStorageObserver(RunObserver):
         priority: int = DEFAULT_FILE_STORAGE_PRIORITY,
         copy_artifacts: bool = True,
         copy_sources: bool = True,
+        metrics_format: str = "json",
     ):
+        """Initializer for FileStorageObserver.
+
+        Parameters
+        ----------
+        basedir
+            Directory in which a sub-directory is created for each run.
+        resource_dir
+            Directory to store resources in. (default: basedir/_resources)
+        source_dir
+            Directory to store sources in. (default: basedir/_sources)
+        template
+            Template to render a report from when the run finishes.
+        priority
+            (default 20)
+        copy_artifacts
+            Copy resources that are located inside of basedir.
+        copy_sources
+            Store a copy of the source files.
+        metrics_format
+            Either "json", which keeps all metrics in a ``metrics.json`` file
+            that is rewritten on every heartbeat, or "jsonl", which appends
+            the new measurements of each heartbeat to ``metrics.jsonl``.
+            Use :func:`read_metrics` to read both formats.
+        """
+        if metrics_format not in METRICS_FORMATS:
+            raise ValueError(
+                "Unknown metrics format '{}'. Available options are {}".format(
+                    metrics_format, METRICS_FORMATS
+                )
+            )
         basedir = Path(basedir)
         resource_dir = resource_dir or basedir / "_resources"
         source_dir = source_dir or basedir / "_sources"
@@ -63,6 +97,7 @@ class FileStorageObserver(RunObserver):
             priority,
             copy_artifacts,
             copy_sources,
+            metrics_format,
         )
 
     def initialize(
@@ -74,6 +109,7 @@ class FileStorageObserver(RunObserver):
         priority=DEFAULT_FILE_STORAGE_PRIORITY,
         copy_artifacts=True,
         copy_sources=True,
+        metrics_format="json",
     ):
         self.basedir = str(basedir)
         self.resource_dir = resource_dir
@@ -82,12 +118,15 @@ class FileStorageObserver(RunObserver):
         self.priority = priority
         self.copy_artifacts = copy_artifacts
         self.copy_sources = copy_sources
+        self.metrics_format = metrics_format
         self.dir = None
         self.run_entry = None
         self.config = None
         self.info = None
         self.cout = ""
         self.cout_write_cursor = 0
+        self.cout_start = 0
+        self.cout_bytes = 0
 
     @classmethod
     def create_from(cls, *args, **kwargs):
@@ -189,6 +228,8 @@ class FileStorageObserver(RunObserver):
         self.info = {}
         self.cout = ""
         self.cout_write_cursor = 0
+        self.cout_start = 0
+        self.cout_bytes = 0
 
         self.save_json(self.run_entry, "run.json")
         self.save_json(self.config, "config.json")
@@ -222,7 +263,13 @@ class FileStorageObserver(RunObserver):
 
     def save_file(self, filename, target_name=None):
         target_name = target_name or os.path.basename(filename)
-        blacklist = ["run.json", "config.json", "cout.txt", "metrics.json"]
+        blacklist = [
+            "run.json",
+            "config.json",
+            "cout.txt",
+            "metrics.json",
+            "metrics.jsonl",
+        ]
         blacklist = [os.path.join(self.dir, x) for x in blacklist]
         dest_file = os.path.join(self.dir, target_name)
         if dest_file in blacklist:
@@ -238,19 +285,28 @@ class FileStorageObserver(RunObserver):
 
     def save_cout(self):
         with open(os.path.join(self.dir, "cout.txt"), "ab") as f:
-            f.write(self.cout[self.cout_write_cursor :].encode("utf-8"))
+            data = self.cout[self.cout_write_cursor :].encode("utf-8")
+            f.write(data)
+            self.cout_bytes += len(data)
             self.cout_write_cursor = len(self.cout)
 
+    def read_cout(self):
+        """Read the complete captured output from cout.txt."""
+        with open(os.path.join(self.dir, "cout.txt"), "rb") as f:
+            return f.read().decode("utf-8")
+
     def render_template(self):
         if opt.has_mako and self.template:
             from mako.template import Template
 
             template = Template(filename=self.template)
+            # self.cout might only contain the end of the captured output
+            cout = self.cout if self.cout_start == 0 else self.read_cout()
             report = template.render(
                 run=self.run_entry,
                 config=self.config,
                 info=self.info,
-                cout=self.cout,
+                cout=cout,
                 savedir=self.dir,
             )
             ext = self.template.suffix
@@ -267,6 +323,46 @@ class FileStorageObserver(RunObserver):
         if self.info:
             self.save_json(self.info, "info.json")
 
+    def heartbeat_delta_event(
+        self,
+        info,
+        captured_out,
+        offset,
+        beat_time,
+        result,
+        info_changed=None,
+        result_changed=True,
+    ):
+        # self.cout only contains the output from position cout_start on
+        if offset < self.cout_start:
+            self.cout = self.read_cout()
+            self.cout_write_cursor = len(self.cout)
+            self.cout_start = 0
+        offset -= self.cout_start
+        if offset < self.cout_write_cursor:
+            # output that was already written has changed, so cut it off
+            changed = self.cout[offset : self.cout_write_cursor].encode("utf-8")
+            self.cout_bytes -= len(changed)
+            with open(os.path.join(self.dir, "cout.txt"), "r+b") as f:
+                f.truncate(self.cout_bytes)
+            self.cout_write_cursor = offset
+        self.info = info
+        self.run_entry["heartbeat"] = beat_time.isoformat()
+        self.run_entry["result"] = result
+        self.cout = self.cout[:offset] + captured_out
+        if self.cout_write_cursor < len(self.cout):
+            self.save_cout()
+        self.save_json(self.run_entry, "run.json")
+        if self.info and info_changed != []:
+            self.save_json(self.info, "info.json")
+
+        max_memory = SETTINGS.CAPTURE_MAX_MEMORY
+        if max_memory is not None and len(self.cout) > max_memory:
+            drop = len(self.cout) - max_memory
+            self.cout = self.cout[drop:]
+            self.cout_write_cursor -= drop
+            self.cout_start += drop
+
     def completed_event(self, stop_time, result):
         self.run_entry["stop_time"] = stop_time.isoformat()
         self.run_entry["result"] = result
@@ -299,7 +395,10 @@ class FileStorageObserver(RunObserver):
         self.save_json(self.run_entry, "run.json")
 
     def log_metrics(self, metrics_by_name, info):
-        """Store new measurements into metrics.json."""
+        """Store new measurements into metrics.json or metrics.jsonl."""
+        if self.metrics_format == "jsonl":
+            self.append_metrics(metrics_by_name)
+            return
         try:
             metrics_path = os.path.join(self.dir, "metrics.json")
             with open(metrics_path, "r") as f:
@@ -327,12 +426,65 @@ class FileStorageObserver(RunObserver):
 
         self.save_json(saved_metrics, "metrics.json")
 
+    def append_metrics(self, metrics_by_name):
+        """Append one line per metric with the new measurements to metrics.jsonl."""
+        lines = []
+        for metric_name, metric_ptr in metrics_by_name.items():
+            record = {
+                "name": metric_name,
+                "steps": metric_ptr["steps"],
+                "values": metric_ptr["values"],
+                "timestamps": [ts.isoformat() for ts in metric_ptr["timestamps"]],
+            }
+            lines.append(json.dumps(flatten(record)) + "\n")
+        if lines:
+            with open(os.path.join(self.dir, "metrics.jsonl"), "a") as f:
+                f.writelines(lines)
+
     def __eq__(self, other):
         if isinstance(other, FileStorageObserver):
             return self.basedir == other.basedir
         return False
 
 
+def read_metrics(run_dir):
+    """Read the metrics stored by a FileStorageObserver for a single run.
+
+    Works for both metric formats and always returns the structure of
+    ``metrics.json``: a dictionary that maps each metric name to a dictionary
+    with the lists of ``steps``, ``values`` and ``timestamps``.
+
+    Parameters
+    ----------
+    run_dir
+        The directory of the run.
+    """
+    jsonl_path = os.path.join(run_dir, "metrics.jsonl")
+    if not os.path.exists(jsonl_path):
+        try:
+            with open(os.path.join(run_dir, "metrics.json"), "r") as f:
+                return json.load(f)
+        except IOError:
+            return {}
+
+    metrics = {}
+    with open(jsonl_path, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # the last line may be incomplete if the run crashed while
+                # writing it
+                continue
+            metric = metrics.setdefault(
+                record["name"], {"values": [], "steps": [], "timestamps": []}
+            )
+            metric["values"] += record["values"]
+            metric["steps"] += record["steps"]
+            metric["timestamps"] += record["timestamps"]
+    return metrics
+
+
 @cli_option("-F", "--file_storage")
 def file_storage_option(args, run):
     """Add a file-storage observer to the experiment.
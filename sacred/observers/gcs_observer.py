@@ -46,6 +46,8 @@ def gcs_join(*args):
 
 class GoogleCloudStorageObserver(RunObserver):
     VERSION = "GoogleCloudStorageObserver-0.1.0"
+    incremental_captured_out = True
+    complete_captured_out_at_end = True
 
     def __init__(
         self,
@@ -270,11 +272,35 @@ class GoogleCloudStorageObserver(RunObserver):
         self.run_entry["heartbeat"] = beat_time.isoformat()
         self.run_entry["result"] = result
         self.cout = captured_out
+        self.cout_write_cursor = 0
         self.save_cout()
         self.save_json(self.run_entry, "run.json")
         if self.info:
             self.save_json(self.info, "info.json")
 
+    def heartbeat_delta_event(
+        self,
+        info,
+        captured_out,
+        offset,
+        beat_time,
+        result,
+        info_changed=None,
+        result_changed=True,
+    ):
+        self.info = info
+        self.run_entry["heartbeat"] = beat_time.isoformat()
+        self.run_entry["result"] = result
+        # uploading replaces cout.txt, so it only holds the new output until
+        # the complete output is received with the final heartbeat_event
+        self.cout = captured_out
+        self.cout_write_cursor = 0
+        if captured_out:
+            self.save_cout()
+        self.save_json(self.run_entry, "run.json")
+        if self.info and info_changed != []:
+            self.save_json(self.info, "info.json")
+
     def completed_event(self, stop_time, result):
         self.run_entry["stop_time"] = stop_time.isoformat()
         self.run_entry["result"] = result
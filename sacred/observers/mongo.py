@@ -12,17 +12,40 @@ import sacred.optional as opt
 from sacred.commandline_options import cli_option
 from sacred.dependencies import get_digest
 from sacred.observers.base import RunObserver
-from sacred.observers.queue import QueueObserver
+from sacred.observers.queue import QueueObserver, WrappedEvent
 from sacred.serializer import flatten
 from sacred.utils import ObserverError, PathType
-import pkg_resources
 
 DEFAULT_MONGO_PRIORITY = 30
+DEFAULT_METRICS_BUCKET_SIZE = 1000
+METRICS_LAYOUTS = ("document", "bucketed")
 
-# This ensures consistent mimetype detection across platforms.
-mimetype_detector = mimetypes.MimeTypes(
-    filenames=[pkg_resources.resource_filename("sacred", "data/mime.types")]
-)
+_mimetype_detector = None
+
+
+def get_mimetype_detector():
+    """Return a MimeTypes table that is read from sacred/data/mime.types.
+
+    This ensures consistent mimetype detection across platforms. The table is
+    only loaded when it is first needed.
+    """
+    global _mimetype_detector
+    if _mimetype_detector is None:
+        _mimetype_detector = mimetypes.MimeTypes(
+            filenames=[
+                os.path.join(
+                    os.path.dirname(os.path.dirname(__file__)), "data", "mime.types"
+                )
+            ]
+        )
+    return _mimetype_detector
+
+
+def __getattr__(name):
+    # mimetype_detector used to be created on import
+    if name == "mimetype_detector":
+        return get_mimetype_detector()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
 
 def force_valid_bson_key(key):
@@ -66,6 +89,7 @@ class MongoObserver(RunObserver):
         "search_spaces",
     }
     VERSION = "MongoObserver-0.7.0"
+    incremental_captured_out = True
 
     @classmethod
     def create(cls, *args, **kwargs):
@@ -86,6 +110,8 @@ class MongoObserver(RunObserver):
         priority: int = DEFAULT_MONGO_PRIORITY,
         client: Optional["pymongo.MongoClient"] = None,
         failure_dir: Optional[PathType] = None,
+        metrics_layout: str = "document",
+        metrics_bucket_size: int = DEFAULT_METRICS_BUCKET_SIZE,
         **kwargs,
     ):
         """Initializer for MongoObserver.
@@ -111,6 +137,14 @@ class MongoObserver(RunObserver):
             Client to connect to. Do not use client and URL together.
         failure_dir
             Directory to save the run of a failed observer to.
+        metrics_layout
+            How metrics are stored in the metrics collection.
+            "document" (default) stores one ever-growing document per metric.
+            "bucketed" stores the measurements in chunk documents of at most
+            metrics_bucket_size points, keyed by (run_id, name, bucket) and
+            annotated with count, min and max of each bucket.
+        metrics_bucket_size
+            Maximum number of measurements per bucket for the bucketed layout.
         """
         import pymongo
         import gridfs
@@ -170,6 +204,8 @@ class MongoObserver(RunObserver):
             metrics_collection=metrics_collection,
             failure_dir=failure_dir,
             priority=priority,
+            metrics_layout=metrics_layout,
+            metrics_bucket_size=metrics_bucket_size,
         )
 
     def initialize(
@@ -180,9 +216,33 @@ class MongoObserver(RunObserver):
         metrics_collection=None,
         failure_dir=None,
         priority=DEFAULT_MONGO_PRIORITY,
+        metrics_layout="document",
+        metrics_bucket_size=DEFAULT_METRICS_BUCKET_SIZE,
     ):
+        if metrics_layout not in METRICS_LAYOUTS:
+            raise ValueError(
+                "Unknown metrics layout '{}'. Available options are {}".format(
+                    metrics_layout, METRICS_LAYOUTS
+                )
+            )
         self.runs = runs_collection
         self.metrics = metrics_collection
+        self.metrics_layout = metrics_layout
+        self.metrics_bucket_size = metrics_bucket_size
+        # name -> (last bucket, number of measurements in it)
+        self._metric_buckets = {}
+        self._metric_buckets_loaded = True
+        # length of captured_out in the database (None if unknown) and the
+        # number of its leading characters that did not change since then
+        self._saved_captured_out = None
+        self._unchanged_captured_out = 0
+        # whether the server supports updates with an aggregation pipeline
+        self._pipeline_updates = True
+        self._info_metrics_changed = False
+        if metrics_layout == "bucketed" and metrics_collection is not None:
+            metrics_collection.create_index(
+                [("run_id", 1), ("name", 1), ("bucket", 1)], unique=True
+            )
         self.fs = fs
         if overwrite is not None:
             overwrite = int(overwrite)
@@ -257,15 +317,58 @@ class MongoObserver(RunObserver):
         # save sources
         self.run_entry["experiment"]["sources"] = self.save_sources(ex_info)
         self.insert()
+        self._metric_buckets = {}
+        # only an overwritten run can already have buckets
+        self._metric_buckets_loaded = self.overwrite is None
+        self._info_metrics_changed = False
         return self.run_entry["_id"]
 
     def heartbeat_event(self, info, captured_out, beat_time, result):
         self.run_entry["info"] = flatten(info)
         self.run_entry["captured_out"] = captured_out
+        self._unchanged_captured_out = 0
         self.run_entry["heartbeat"] = beat_time
         self.run_entry["result"] = flatten(result)
         self.save()
 
+    def heartbeat_delta_event(
+        self,
+        info,
+        captured_out,
+        offset,
+        beat_time,
+        result,
+        info_changed=None,
+        result_changed=True,
+    ):
+        self.run_entry["captured_out"] = (
+            self.run_entry["captured_out"][:offset] + captured_out
+        )
+        self._unchanged_captured_out = min(self._unchanged_captured_out, offset)
+        self.run_entry["heartbeat"] = beat_time
+        # only the fields that changed are written to the database
+        fields = {"heartbeat": beat_time}
+        removed = []
+        if info_changed is None or not all(map(_is_plain_key, info_changed)):
+            self.run_entry["info"] = flatten(info)
+            fields["info"] = self.run_entry["info"]
+        else:
+            if self._info_metrics_changed and "metrics" in info:
+                info_changed = set(info_changed) | {"metrics"}
+            for key in info_changed:
+                if key in info:
+                    value = flatten(info[key])
+                    self.run_entry["info"][key] = value
+                    fields["info." + key] = value
+                else:
+                    self.run_entry["info"].pop(key, None)
+                    removed.append("info." + key)
+        self._info_metrics_changed = False
+        if result_changed:
+            self.run_entry["result"] = flatten(result)
+            fields["result"] = self.run_entry["result"]
+        self.save(fields, removed)
+
     def completed_event(self, stop_time, result):
         self.run_entry["stop_time"] = stop_time
         self.run_entry["result"] = flatten(result)
@@ -314,7 +417,7 @@ class MongoObserver(RunObserver):
 
     @staticmethod
     def _try_to_detect_content_type(filename):
-        mime_type, _ = mimetype_detector.guess_type(filename)
+        mime_type, _ = get_mimetype_detector().guess_type(filename)
         if mime_type is not None:
             print(
                 "Added {} as content-type of artifact {}.".format(mime_type, filename)
@@ -334,24 +437,87 @@ class MongoObserver(RunObserver):
         Additionally, reference the metrics
         in the info["metrics"] dictionary.
         """
+        self.save_metrics(metrics_by_name, info)
+
+    def save_metrics(self, metrics_by_name, info):
+        """Store the new measurements of all metrics in one bulk write."""
+        from pymongo import UpdateOne
+
         if self.metrics is None:
             # If, for whatever reason, the metrics collection has not been set
             # do not try to save anything there.
             return
-        for key in metrics_by_name:
-            query = {"run_id": self.run_entry["_id"], "name": key}
-            push = {
-                "steps": {"$each": metrics_by_name[key]["steps"]},
-                "values": {"$each": metrics_by_name[key]["values"]},
-                "timestamps": {"$each": metrics_by_name[key]["timestamps"]},
-            }
-            update = {"$push": push}
-            result = self.metrics.update_one(query, update, upsert=True)
-            if result.upserted_id is not None:
+        requests = []
+        # the metric name for requests that may create the first document
+        first_writes = {}
+        buckets = {}
+        for name, metric in metrics_by_name.items():
+            if self.metrics_layout == "bucketed":
+                updates, buckets[name] = self._bucket_updates(name, metric)
+            else:
+                query = {"run_id": self.run_entry["_id"], "name": name}
+                push = {
+                    "steps": {"$each": metric["steps"]},
+                    "values": {"$each": metric["values"]},
+                    "timestamps": {"$each": metric["timestamps"]},
+                }
+                updates = [(query, {"$push": push})]
+            for query, update in updates:
+                if query.get("bucket", 0) == 0:
+                    first_writes[len(requests)] = name
+                requests.append(UpdateOne(query, update, upsert=True))
+        if not requests:
+            return
+
+        result = self.metrics.bulk_write(requests, ordered=False)
+        self._metric_buckets.update(buckets)
+        for index, upserted_id in sorted(result.upserted_ids.items()):
+            if index in first_writes:
                 # This is the first time we are storing this metric
                 info.setdefault("metrics", []).append(
-                    {"name": key, "id": str(result.upserted_id)}
+                    {"name": first_writes[index], "id": str(upserted_id)}
                 )
+                # the run might have detected the changes of the info already
+                # (e.g. with a queue), so make sure the metrics are stored
+                self.run_entry.setdefault("info", {})["metrics"] = flatten(
+                    info["metrics"]
+                )
+                self._info_metrics_changed = True
+
+    def _bucket_updates(self, name, metric):
+        run_id = self.run_entry["_id"]
+        if not self._metric_buckets_loaded:
+            self._load_metric_buckets()
+        bucket, count = self._metric_buckets.get(name, (0, 0))
+        steps, values = metric["steps"], metric["values"]
+        timestamps = metric["timestamps"]
+        updates = []
+        start = 0
+        while start < len(steps):
+            if count >= self.metrics_bucket_size:
+                bucket, count = bucket + 1, 0
+            end = min(len(steps), start + self.metrics_bucket_size - count)
+            query = {"run_id": run_id, "name": name, "bucket": bucket}
+            update = _bucket_update(
+                steps[start:end], values[start:end], timestamps[start:end]
+            )
+            updates.append((query, update))
+            count += end - start
+            start = end
+        # the new state is only stored once the write succeeded
+        return updates, (bucket, count)
+
+    def _load_metric_buckets(self):
+        """Continue in the last bucket of each metric of an overwritten run."""
+        documents = self.metrics.find(
+            {"run_id": self.run_entry["_id"], "bucket": {"$exists": True}},
+            {"name": 1, "bucket": 1, "count": 1},
+        )
+        for doc in documents:
+            last = self._metric_buckets.get(doc["name"])
+            if last is None or doc["bucket"] > last[0]:
+                self._metric_buckets[doc["name"]] = (doc["bucket"], doc["count"])
+        self._metric_buckets_loaded = True
 
     def insert(self):
         import pymongo.errors
@@ -369,6 +535,8 @@ class MongoObserver(RunObserver):
                 )
             try:
                 self.runs.insert_one(self.run_entry)
+                self._saved_captured_out = len(self.run_entry.get("captured_out", ""))
+                self._unchanged_captured_out = self._saved_captured_out
                 return
             except pymongo.errors.InvalidDocument as e:
                 raise ObserverError(
@@ -379,13 +547,11 @@ class MongoObserver(RunObserver):
                 if not autoinc_key:
                     raise
 
-    def save(self):
+    def save(self, fields=None, removed=()):
         import pymongo.errors
 
         try:
-            self.runs.update_one(
-                {"_id": self.run_entry["_id"]}, {"$set": self.run_entry}
-            )
+            self.update_run_entry(fields, removed)
         except pymongo.errors.AutoReconnect:
             pass  # just wait for the next save
         except pymongo.errors.InvalidDocument as e:
@@ -393,6 +559,80 @@ class MongoObserver(RunObserver):
                 "Run contained an unserializable entry." "(most likely in the info)"
             ) from e
 
+    def update_run_entry(self, fields=None, removed=()):
+        """Update the run in the database.
+
+        Of the captured output only the changes since the last successful
+        update are transferred. Appending to the stored output uses an
+        update with an aggregation pipeline, which requires MongoDB >= 4.2.
+        If the server rejects it, this and all following updates write the
+        whole captured output instead.
+
+        Parameters
+        ----------
+        fields : dict, optional
+            The (dotted) fields of the run entry that changed. If None, the
+            whole run entry is written.
+        removed : list of str
+            The (dotted) fields that were removed from the run entry.
+        """
+        import pymongo.errors
+
+        captured_out = self.run_entry.get("captured_out")
+        update = self._get_run_entry_update(fields, removed)
+        try:
+            try:
+                self.runs.update_one({"_id": self.run_entry["_id"]}, update)
+            except pymongo.errors.OperationFailure:
+                if not isinstance(update, list):
+                    raise
+                # the server does not support updates with a pipeline
+                self._pipeline_updates = False
+                self.runs.update_one(
+                    {"_id": self.run_entry["_id"]},
+                    self._get_run_entry_update(fields, removed),
+                )
+        except Exception:
+            # we cannot know whether the captured output has been stored
+            self._saved_captured_out = None
+            raise
+        if captured_out is not None:
+            self._saved_captured_out = len(captured_out)
+            self._unchanged_captured_out = len(captured_out)
+
+    def _get_run_entry_update(self, fields=None, removed=()):
+        captured_out = self.run_entry.get("captured_out")
+        saved = self._saved_captured_out
+        unchanged = self._unchanged_captured_out
+        if captured_out is None or saved is None:
+            # after a failed update we do not know what has been stored
+            return {"$set": self.run_entry}
+        if fields is None:
+            fields = {
+                k: v
+                for k, v in self.run_entry.items()
+                if k not in ("_id", "captured_out")
+            }
+        appended = len(captured_out) > unchanged == saved
+        if appended and unchanged > 0 and self._pipeline_updates:
+            # an aggregation pipeline update, so all values have to be literals
+            update = {k: {"$literal": v} for k, v in fields.items()}
+            update["captured_out"] = {
+                "$concat": ["$captured_out", captured_out[unchanged:]]
+            }
+            pipeline = [{"$set": update}]
+            if removed:
+                pipeline.append({"$unset": list(removed)})
+            return pipeline
+        if unchanged < max(saved, len(captured_out)):
+            # the output changed but cannot be appended, e.g. because a
+            # captured_out_filter rewrote output that was already stored
+            fields = dict(fields, captured_out=captured_out)
+        update = {"$set": fields}
+        if removed:
+            update["$unset"] = {k: "" for k in removed}
+        return update
+
     def final_save(self, attempts):
         import pymongo.errors
 
@@ -453,6 +693,71 @@ class MongoObserver(RunObserver):
         return False
 
 
+def _is_plain_key(key):
+    """Whether key can be used as part of a dotted MongoDB field path."""
+    return isinstance(key, str) and key and "." not in key and key[0] != "$"
+
+
+def _bucket_update(steps, values, timestamps):
+    update = {
+        "$push": {
+            "steps": {"$each": steps},
+            "values": {"$each": values},
+            "timestamps": {"$each": timestamps},
+        },
+        "$inc": {"count": len(steps)},
+        "$min": {"first_step": min(steps), "start_time": min(timestamps)},
+        "$max": {"last_step": max(steps), "end_time": max(timestamps)},
+    }
+    if all(isinstance(v, (int, float)) for v in values):
+        update["$min"]["min"] = min(values)
+        update["$max"]["max"] = max(values)
+    return update
+
+
+def read_metric_buckets(metrics_collection, run_id, name, min_step=None, max_step=None):
+    """Read a metric that was stored with the bucketed metrics layout.
+
+    Only the buckets that overlap with the requested range of steps are
+    fetched from the database.
+
+    Parameters
+    ----------
+    metrics_collection
+        The metrics collection the MongoObserver wrote to.
+    run_id
+        The _id of the run.
+    name
+        The name of the metric.
+    min_step
+        Optionally skip all measurements with a smaller step.
+    max_step
+        Optionally skip all measurements with a larger step.
+
+    Returns
+    -------
+    dict
+        A dictionary with the lists of steps, values and timestamps.
+    """
+    query = {"run_id": run_id, "name": name}
+    if min_step is not None:
+        query["last_step"] = {"$gte": min_step}
+    if max_step is not None:
+        query["first_step"] = {"$lte": max_step}
+    metric = {"steps": [], "values": [], "timestamps": []}
+    for bucket in metrics_collection.find(query, sort=[("bucket", 1)]):
+        for step, value, timestamp in zip(
+            bucket["steps"], bucket["values"], bucket["timestamps"]
+        ):
+            if (min_step is None or step >= min_step) and (
+                max_step is None or step <= max_step
+            ):
+                metric["steps"].append(step)
+                metric["values"].append(value)
+                metric["timestamps"].append(timestamp)
+    return metric
+
+
 @cli_option("-m", "--mongo_db")
 def mongo_db_option(args, run):
     """Add a MongoDB Observer to the experiment.
@@ -540,31 +845,13 @@ class QueueCompatibleMongoObserver(MongoObserver):
         Additionally, reference the metrics
         in the info["metrics"] dictionary.
         """
-        if self.metrics is None:
-            # If, for whatever reason, the metrics collection has not been set
-            # do not try to save anything there.
-            return
-        query = {"run_id": self.run_entry["_id"], "name": metric_name}
-        push = {
-            "steps": {"$each": metrics_values["steps"]},
-            "values": {"$each": metrics_values["values"]},
-            "timestamps": {"$each": metrics_values["timestamps"]},
-        }
-        update = {"$push": push}
-        result = self.metrics.update_one(query, update, upsert=True)
-        if result.upserted_id is not None:
-            # This is the first time we are storing this metric
-            info.setdefault("metrics", []).append(
-                {"name": metric_name, "id": str(result.upserted_id)}
-            )
+        self.save_metrics({metric_name: metrics_values}, info)
 
-    def save(self):
+    def save(self, fields=None, removed=()):
         import pymongo
 
         try:
-            self.runs.update_one(
-                {"_id": self.run_entry["_id"]}, {"$set": self.run_entry}
-            )
+            self.update_run_entry(fields, removed)
         except pymongo.errors.InvalidDocument as exc:
             raise ObserverError(
                 "Run contained an unserializable entry. (most likely in the info)"
@@ -663,3 +950,8 @@ class QueuedMongoObserver(QueueObserver):
             interval=interval,
             retry_interval=retry_interval,
         )
+
+    def log_metrics(self, metrics_by_name, info):
+        # Queue all metrics of a heartbeat as one event, such that they are
+        # stored with a single bulk write.
+        self._queue.put(WrappedEvent("save_metrics", [metrics_by_name, info], {}))
@@ -1,7 +1,8 @@
 from collections import namedtuple
 from queue import Queue
 from sacred.observers.base import RunObserver
-from sacred.utils import IntervalTimer
+from sacred.settings import SETTINGS
+from sacred.utils import get_scheduler
 import traceback
 import logging
 
@@ -41,6 +42,7 @@ class QueueObserver(RunObserver):
         self._interval = interval
         self._queue = None
         self._worker = None
+        self._failed_event = None
         self._stop_worker_event = None
         logger.debug("just testing")
 
@@ -49,18 +51,37 @@ class QueueObserver(RunObserver):
 
     def started_event(self, *args, **kwargs):
         self._queue = Queue()
-        self._stop_worker_event, self._worker = IntervalTimer.create(
-            self._run, interval=self._interval
+        self._failed_event = None
+        self._worker = get_scheduler().schedule(
+            self._run,
+            interval=self._interval,
+            jitter=SETTINGS.BEAT_JITTER,
+            stagger=SETTINGS.BEAT_STAGGER,
         )
-        self._worker.start()
+        self._stop_worker_event = self._worker.stopped
 
         # Putting the started event on the queue makes no sense
         # as it is required for initialization of the covered observer.
         return self._covered_observer.started_event(*args, **kwargs)
 
+    @property
+    def incremental_captured_out(self):
+        return getattr(self._covered_observer, "incremental_captured_out", False)
+
+    @property
+    def complete_captured_out_at_end(self):
+        return getattr(self._covered_observer, "complete_captured_out_at_end", False)
+
+    @property
+    def heartbeat_interval(self):
+        return getattr(self._covered_observer, "heartbeat_interval", None)
+
     def heartbeat_event(self, *args, **kwargs):
         self._queue.put(WrappedEvent("heartbeat_event", args, kwargs))
 
+    def heartbeat_delta_event(self, *args, **kwargs):
+        self._queue.put(WrappedEvent("heartbeat_delta_event", args, kwargs))
+
     def completed_event(self, *args, **kwargs):
         self._queue.put(WrappedEvent("completed_event", args, kwargs))
         self.join()
@@ -87,47 +108,39 @@ class QueueObserver(RunObserver):
 
     def _run(self):
         """Empty the queue every interval."""
-        while not self._queue.empty():
-            try:
+        while self._failed_event is not None or not self._queue.empty():
+            if self._failed_event is not None:
+                event, self._failed_event = self._failed_event, None
+            else:
                 event = self._queue.get()
-            except IndexError:
-                # Currently there is no event on the queue so
-                # just go back to sleep.
-                pass
+            try:
+                method = getattr(self._covered_observer, event.name)
+            except NameError:
+                # The covered observer does not implement an event handler
+                # for the event, so just discard the message.
+                self._queue.task_done()
+                continue
+            try:
+                method(*event.args, **event.kwargs)
+            except:
+                # Something went wrong during the processing of the event
+                # so try again later. The worker shares its thread with the
+                # heartbeats of other runs, so it must not wait here.
+                logger.debug(
+                    "Error while processing event. Trying again.\n{}".format(
+                        traceback.format_exc()
+                    )
+                )
+                self._failed_event = event
+                self._worker.reschedule(self._retry_interval)
+                return
             else:
-                try:
-                    method = getattr(self._covered_observer, event.name)
-                except NameError:
-                    # The covered observer does not implement an event handler
-                    # for the event, so just discard the message.
-                    self._queue.task_done()
-                else:
-                    while True:
-                        try:
-                            method(*event.args, **event.kwargs)
-                        except:
-                            # Something went wrong during the processing of
-                            # the event so wait for some time and
-                            # then try again.
-                            logger.debug(
-                                "Error while processing event. Trying again.\n{}".format(
-                                    traceback.format_exc()
-                                )
-                            )
-                            # logging.debug(f"""Error while processing event. Trying again.
-                            # {traceback.format_exc()}""")
-
-                            self._stop_worker_event.wait(self._retry_interval)
-                            continue
-                        else:
-                            self._queue.task_done()
-                            break
+                self._queue.task_done()
 
     def join(self):
         if self._queue is not None:
             self._queue.join()
-            self._stop_worker_event.set()
-            self._worker.join(timeout=10)
+            self._worker.stop()
 
     def __getattr__(self, item):
         return getattr(self._covered_observer, item)
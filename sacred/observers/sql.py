@@ -16,6 +16,8 @@ DEFAULT_SQL_PRIORITY = 40
 
 
 class SqlObserver(RunObserver):
+    incremental_captured_out = True
+
     @classmethod
     def create(cls, url, echo=False, priority=DEFAULT_SQL_PRIORITY):
         warnings.warn(
@@ -37,6 +39,7 @@ class SqlObserver(RunObserver):
         self.session = session
         self.priority = priority
         self.run = None
+        self.cout_length = 0
         self.lock = Lock()
 
     @classmethod
@@ -47,6 +50,7 @@ class SqlObserver(RunObserver):
         self.session = session
         self.priority = priority
         self.run = None
+        self.cout_length = 0
         self.lock = Lock()
         return self
 
@@ -95,6 +99,7 @@ class SqlObserver(RunObserver):
             **kwargs,
         )
         self.session.add(self.run)
+        self.cout_length = 0
         self.save()
         return _id or self.run.run_id
 
@@ -105,6 +110,37 @@ class SqlObserver(RunObserver):
         self.run.result = result
         self.save()
 
+    def heartbeat_delta_event(
+        self,
+        info,
+        captured_out,
+        offset,
+        beat_time,
+        result,
+        info_changed=None,
+        result_changed=True,
+    ):
+        import sqlalchemy as sa
+        from .sql_bases import Run
+
+        # only assigned columns are part of the UPDATE statement
+        if info_changed != []:
+            self.run.info = json.dumps(flatten(info))
+        if captured_out or offset != self.cout_length:
+            if offset:
+                # let the database append the new output
+                self.run.captured_out = (
+                    sa.func.substr(Run.captured_out, 1, offset, type_=sa.Text)
+                    + captured_out
+                )
+            else:
+                self.run.captured_out = captured_out
+            self.cout_length = offset + len(captured_out)
+        self.run.heartbeat = beat_time
+        if result_changed:
+            self.run.result = result
+        self.save()
+
     def completed_event(self, stop_time, result):
         self.run.stop_time = stop_time
         self.run.result = result
@@ -30,24 +30,46 @@ def get_tensorflow():
     return tf
 
 
-# Get libc in a cross-platform way and use it to also flush the c stdio buffers
-# credit to J.F. Sebastians SO answer from here:
-# http://stackoverflow.com/a/22434262/1388435
-try:
-    import ctypes
-    from ctypes.util import find_library
-except ImportError:
-    libc = None
-else:
+def _get_libc():
+    # Get libc in a cross-platform way and use it to also flush the c stdio
+    # buffers. credit to J.F. Sebastians SO answer from here:
+    # http://stackoverflow.com/a/22434262/1388435
     try:
-        libc = ctypes.cdll.msvcrt  # Windows
+        import ctypes
+        from ctypes.util import find_library
+    except ImportError:
+        return None
+    try:
+        return ctypes.cdll.msvcrt  # Windows
     except (OSError, AttributeError):
-        libc = ctypes.cdll.LoadLibrary(find_library("c"))
+        return ctypes.cdll.LoadLibrary(find_library("c"))
+
+
+# numpy, yaml and pandas are slow to import, so only check whether they are
+# installed here. They are imported on first access of np, yaml and pandas.
+has_numpy = modules_exist("numpy")
+has_yaml = modules_exist("yaml")
+has_pandas = modules_exist("pandas")
 
+_lazy_imports = {
+    "np": ("numpy", "has_numpy"),
+    "yaml": ("yaml", "has_yaml"),
+    "pandas": ("pandas", "has_pandas"),
+}
+
+
+def __getattr__(name):
+    if name == "libc":
+        value = _get_libc()
+    elif name in _lazy_imports:
+        package_name, has_name = _lazy_imports[name]
+        success, value = optional_import(package_name)
+        globals()[has_name] = success
+    else:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    globals()[name] = value
+    return value
 
-has_numpy, np = optional_import("numpy")
-has_yaml, yaml = optional_import("yaml")
-has_pandas, pandas = optional_import("pandas")
 
 has_sqlalchemy = modules_exist("sqlalchemy")
 has_mako = modules_exist("mako")
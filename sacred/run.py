@@ -3,13 +3,18 @@
 
 import datetime
 import os.path
+import shutil
 import sys
+import tempfile
+import threading
+import time
 import traceback as tb
+from concurrent.futures import Future, wait
 
 from sacred import metrics_logger, SETTINGS
-from sacred.metrics_logger import linearize_metrics
 from sacred.randomness import set_global_seed
-from sacred.utils import SacredInterrupt, join_paths, IntervalTimer
+from sacred import serializer
+from sacred.utils import SacredInterrupt, join_paths, OrderedExecutor, get_scheduler
 from sacred.stdout_capturing import get_stdcapturer
 
 
@@ -29,13 +34,15 @@ class Run:
         pre_run_hooks,
         post_run_hooks,
         captured_out_filter=None,
+        metric_policies=None,
     ):
 
         self._id = None
         """The ID of this run as assigned by the first observer"""
 
         self.captured_out = ""
-        """Captured stdout and stderr"""
+        """Captured stdout and stderr (only the most recent part if it
+        exceeds SETTINGS.CAPTURE_MAX_MEMORY)"""
 
         self.config = config
         """The final configuration used for this run"""
@@ -113,10 +120,31 @@ class Run:
         """Determines the way the stdout/stderr are captured"""
 
         self._heartbeat = None
+        # what each observer has not yet received, by id of the observer
+        self._observer_beats = {}
         self._failed_observers = []
+        self._dispatcher = None
+        self._file_events = []
+        # directory with copies of the artifacts that are stored in background
+        self._artifact_dir = None
         self._output_file = None
-
-        self._metrics = metrics_logger.MetricsLogger()
+        # position from which captured_out changed since the last heartbeat
+        self._captured_out_offset = 0
+        # temporary file and length of the output that no longer fits into
+        # captured_out
+        self._captured_out_spill = None
+        self._captured_out_spilled = 0
+        self._incremental_filter = None
+        # serialized info entries and result as of the last heartbeat
+        self._info_fingerprints = {}
+        self._result_fingerprint = None
+
+        self._metrics = metrics_logger.MetricsLogger(
+            defer_conversion=SETTINGS.METRICS.DEFER_TENSOR_CONVERSION,
+            policies=metric_policies,
+            max_buffered=SETTINGS.METRICS.MAX_BUFFERED,
+            max_buffered_bytes=SETTINGS.METRICS.MAX_BUFFERED_BYTES,
+        )
 
     def open_resource(self, filename, mode="r"):
         """Open a file and also save it as a resource.
@@ -145,7 +173,7 @@ class Run:
 
         """
         filename = os.path.abspath(filename)
-        self._emit_resource_added(filename)  # TODO: maybe non-blocking?
+        self._emit_resource_added(filename)
         return open(filename, mode)
 
     def add_resource(self, filename):
@@ -162,9 +190,17 @@ class Run:
         ----------
         filename : str
             name of the file to be stored as a resource
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Is done once all observers processed the resource. Only relevant
+            if SETTINGS.OBSERVERS.DISPATCH is 'parallel', because otherwise
+            this function blocks until then. The file must not be changed
+            before.
         """
         filename = os.path.abspath(filename)
-        self._emit_resource_added(filename)
+        return self._emit_resource_added(filename)
 
     def add_artifact(self, filename, name=None, metadata=None, content_type=None):
         """Add a file as an artifact.
@@ -188,10 +224,23 @@ class Run:
         content_type: str, optional
             optionally attach a content-type to the artifact.
             This only has an effect when using the MongoObserver.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Only needed to wait until all observers stored the artifact.
+            By default this function blocks until then. If
+            SETTINGS.OBSERVERS.DISPATCH is 'parallel' only the upload happens
+            in the background: the file is first copied to a temporary
+            directory (or cloned, if the filesystem supports copy-on-write),
+            which the observers read from. So the file may be changed or
+            removed as soon as this function returns.
         """
         filename = os.path.abspath(filename)
         name = os.path.basename(filename) if name is None else name
-        self._emit_artifact_added(name, filename, metadata, content_type)
+        if self._dispatcher is not None:
+            filename = self._copy_artifact(filename)
+        return self._emit_artifact_added(name, filename, metadata, content_type)
 
     def __call__(self, *args):
         r"""Start this run.
@@ -230,6 +279,7 @@ class Run:
         if self.queue_only:
             self._emit_queued()
             return
+        self._start_dispatcher()
         try:
             with capture_stdout() as self._output_file:
                 self._emit_started()
@@ -243,6 +293,7 @@ class Run:
                 self.run_logger.info("Completed after %s", elapsed_time)
                 self._get_captured_output()
             self._stop_heartbeat()
+            self._wait_for_file_events()
             self._emit_completed(self.result)
         except (SacredInterrupt, KeyboardInterrupt) as e:
             self._stop_heartbeat()
@@ -255,8 +306,8 @@ class Run:
             self._emit_failed(exc_type, exc_value, trace.tb_next)
             raise
         finally:
-            self._warn_about_failed_observers()
             self._wait_for_observers()
+            self._warn_about_failed_observers()
 
         return self.result
 
@@ -266,26 +317,78 @@ class Run:
         text = self._output_file.get()
         if isinstance(text, bytes):
             text = text.decode("utf-8", "replace")
-        if self.captured_out:
+        offset = len(self.captured_out)
+        if hasattr(self.captured_out_filter, "incremental"):
+            # only the new output has to be filtered
+            if self._incremental_filter is None:
+                self._incremental_filter = self.captured_out_filter.incremental()
+            remove, text = self._incremental_filter.update(text)
+            if remove > offset:
+                # output that was spilled to disk cannot be changed anymore
+                text = text[remove - offset :]
+                remove = offset
+            offset -= remove
+            text = self.captured_out[:offset] + text
+        elif self.captured_out_filter is not None:
+            text = self.captured_out_filter(self.captured_out + text)
+            # the filter may have changed some of the old output as well
+            offset = _common_prefix_length(self.captured_out, text)
+        elif self.captured_out:
             text = self.captured_out + text
-        if self.captured_out_filter is not None:
-            text = self.captured_out_filter(text)
+        offset += self._captured_out_spilled
+        self._captured_out_offset = min(self._captured_out_offset, offset)
         self.captured_out = text
 
+    def _spill_captured_output(self):
+        max_memory = SETTINGS.CAPTURE_MAX_MEMORY
+        if max_memory is None:
+            return
+        # only output that was already sent to the observers is spilled
+        sent = min(
+            [self._captured_out_offset]
+            + [beat.offset for beat in self._observer_beats.values()]
+        )
+        size = min(
+            len(self.captured_out) - max_memory, sent - self._captured_out_spilled
+        )
+        if size <= 0:
+            return
+        if self._captured_out_spill is None:
+            self._captured_out_spill = tempfile.TemporaryFile(
+                "w+", encoding="utf-8", newline=""
+            )
+        self._captured_out_spill.write(self.captured_out[:size])
+        self.captured_out = self.captured_out[size:]
+        self._captured_out_spilled += size
+
+    def _read_captured_output(self):
+        """Return the complete captured output, including the spilled part."""
+        if self._captured_out_spill is None:
+            return self.captured_out
+        self._captured_out_spill.seek(0)
+        text = self._captured_out_spill.read()
+        self._captured_out_spill.seek(0, os.SEEK_END)
+        return text + self.captured_out
+
     def _start_heartbeat(self):
         self.run_logger.debug("Starting Heartbeat")
         if self.beat_interval > 0:
-            self._stop_heartbeat_event, self._heartbeat = IntervalTimer.create(
-                self._emit_heartbeat, self.beat_interval
+            self._heartbeat = get_scheduler().schedule(
+                self._emit_heartbeat,
+                self.beat_interval,
+                self._emit_metrics,
+                jitter=SETTINGS.BEAT_JITTER,
+                stagger=SETTINGS.BEAT_STAGGER,
             )
-            self._heartbeat.start()
+            self._metrics.on_max_buffered = self._heartbeat.wake_up
 
     def _stop_heartbeat(self):
         self.run_logger.debug("Stopping Heartbeat")
         # only stop if heartbeat was started
         if self._heartbeat is not None:
-            self._stop_heartbeat_event.set()
-            self._heartbeat.join(timeout=2)
+            self._metrics.on_max_buffered = None
+            # sends the final heartbeat on this thread
+            self._heartbeat.stop()
 
     def _emit_queued(self):
         self.status = "QUEUED"
@@ -341,24 +444,125 @@ class Run:
         else:
             self.run_logger.info('Started run with ID "{}"'.format(self._id))
 
-    def _emit_heartbeat(self):
-        beat_time = datetime.datetime.utcnow()
-        self._get_captured_output()
-        # Read all measured metrics since last heartbeat
-        logged_metrics = self._metrics.get_last_metrics()
-        metrics_by_name = linearize_metrics(logged_metrics)
+    def _get_observer_beat(self, observer):
+        beat = self._observer_beats.get(id(observer))
+        if beat is None:
+            interval = getattr(observer, "heartbeat_interval", None)
+            if not isinstance(interval, (int, float)) or interval <= 0:
+                interval = None
+            beat = _ObserverBeat(interval)
+            self._observer_beats[id(observer)] = beat
+        return beat
+
+    def _emit_metrics(self):
+        # Read all measured metrics since last heartbeat or flush
+        metrics_by_name = self._metrics.get_last_metrics_by_name()
         for observer in self.observers:
+            beat = self._get_observer_beat(observer)
+            if beat.interval is not None:
+                # delivered together with the next heartbeat of the observer
+                beat.add_metrics(metrics_by_name)
+                continue
             self._safe_call(
                 observer, "log_metrics", metrics_by_name=metrics_by_name, info=self.info
             )
-            self._safe_call(
-                observer,
-                "heartbeat_event",
-                info=self.info,
-                captured_out=self.captured_out,
-                beat_time=beat_time,
-                result=self.result,
-            )
+
+    def _emit_heartbeat(self):
+        beat_time = datetime.datetime.utcnow()
+        now = time.monotonic()
+        # the last heartbeat is sent to every observer
+        final = self._heartbeat is not None and self._heartbeat.stopped.is_set()
+        self._get_captured_output()
+        self._emit_metrics()
+        offset = self._captured_out_offset
+        self._captured_out_offset = self._captured_out_spilled + len(self.captured_out)
+        due = []
+        for observer in self.observers:
+            beat = self._get_observer_beat(observer)
+            if beat.interval is not None:
+                if now < beat.next_beat and not final:
+                    due.append(False)
+                    continue
+                beat.next_beat = now + beat.interval
+                if beat.metrics:
+                    # before the changes are detected, because observers
+                    # can add to the info when they store the metrics
+                    self._safe_call(
+                        observer,
+                        "log_metrics",
+                        metrics_by_name=beat.metrics,
+                        info=self.info,
+                    )
+                    beat.metrics = {}
+            due.append(True)
+        info_changed, result_changed = self._detect_changes()
+        captured_out = None
+        for observer, is_due in zip(self.observers, due):
+            beat = self._get_observer_beat(observer)
+            beat.offset = min(beat.offset, offset)
+            beat.info_changed.update(dict.fromkeys(info_changed))
+            beat.result_changed = beat.result_changed or result_changed
+            if not is_due:
+                continue
+            # only observers that explicitly opt in receive just the changes
+            # observers that can only replace the stored output receive the
+            # complete output with the final heartbeat
+            incremental = getattr(observer, "incremental_captured_out", False)
+            complete_at_end = getattr(observer, "complete_captured_out_at_end", False)
+            if incremental is True and not (final and complete_at_end is True):
+                self._safe_call(
+                    observer,
+                    "heartbeat_delta_event",
+                    info=self.info,
+                    captured_out=self.captured_out[
+                        beat.offset - self._captured_out_spilled :
+                    ],
+                    offset=beat.offset,
+                    beat_time=beat_time,
+                    result=self.result,
+                    info_changed=list(beat.info_changed),
+                    result_changed=beat.result_changed,
+                )
+            else:
+                if captured_out is None:
+                    captured_out = self._read_captured_output()
+                self._safe_call(
+                    observer,
+                    "heartbeat_event",
+                    info=self.info,
+                    captured_out=captured_out,
+                    beat_time=beat_time,
+                    result=self.result,
+                )
+            beat.offset = self._captured_out_offset
+            beat.info_changed = {}
+            beat.result_changed = False
+        self._spill_captured_output()
+
+    def _detect_changes(self):
+        """Return the changed info keys and whether the result changed.
+
+        Changes are relative to the previous heartbeat. Removed keys are
+        reported as changed as well. Values that cannot be serialized are
+        always considered to be changed.
+        """
+        fingerprints = {
+            key: _fingerprint(value) for key, value in list(self.info.items())
+        }
+        info_changed = [
+            key
+            for key, fingerprint in fingerprints.items()
+            if fingerprint is None or self._info_fingerprints.get(key) != fingerprint
+        ]
+        info_changed += [
+            key for key in self._info_fingerprints if key not in fingerprints
+        ]
+        self._info_fingerprints = fingerprints
+
+        fingerprint = _fingerprint(self.result)
+        result_changed = fingerprint is None or fingerprint != self._result_fingerprint
+        self._result_fingerprint = fingerprint
+        return info_changed, result_changed
 
     def _stop_time(self):
         self.stop_time = datetime.datetime.utcnow()
@@ -400,21 +604,76 @@ class Run:
             )
 
     def _emit_resource_added(self, filename):
-        for observer in self.observers:
-            self._safe_call(observer, "resource_event", filename=filename)
+        return self._emit_file_event("resource_event", filename=filename)
 
     def _emit_artifact_added(self, name, filename, metadata, content_type):
+        return self._emit_file_event(
+            "artifact_event",
+            name=name,
+            filename=filename,
+            metadata=metadata,
+            content_type=content_type,
+        )
+
+    def _emit_file_event(self, method, **kwargs):
+        """Call method on all observers and return a future for the result."""
+        future = Future()
+        remaining = [len(self.observers)]
+        lock = threading.Lock()
+
+        def call_observer(observer):
+            self._call_observer(observer, method, kwargs)
+            with lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    future.set_result(None)
+
+        if not self.observers:
+            future.set_result(None)
         for observer in self.observers:
-            self._safe_call(
-                observer,
-                "artifact_event",
-                name=name,
-                filename=filename,
-                metadata=metadata,
-                content_type=content_type,
+            self._dispatch(observer, call_observer, observer)
+        if not future.done():
+            self._file_events.append(future)
+        return future
+
+    def _copy_artifact(self, filename):
+        """Copy a file that is stored in background and return the copy."""
+        if self._artifact_dir is None:
+            self._artifact_dir = tempfile.mkdtemp(prefix="sacred_artifacts_")
+        # keep the basename, observers might use it e.g. for the content type
+        directory = tempfile.mkdtemp(dir=self._artifact_dir)
+        copy = os.path.join(directory, os.path.basename(filename))
+        _clone_or_copy_file(filename, copy)
+        return copy
+
+    def _wait_for_file_events(self):
+        """Block until all artifacts and resources are processed."""
+        wait(self._file_events)
+        self._file_events = []
+
+    def _start_dispatcher(self):
+        dispatch = SETTINGS.OBSERVERS.DISPATCH
+        if dispatch not in ("sequential", "parallel"):
+            raise KeyError(
+                "Unknown observer dispatch '{}'. Available options are "
+                "['parallel', 'sequential']".format(dispatch)
             )
+        if dispatch == "parallel" and self.observers:
+            self._dispatcher = OrderedExecutor(
+                SETTINGS.OBSERVERS.MAX_WORKERS, thread_name_prefix="sacred-observer"
+            )
+
+    def _dispatch(self, observer, func, *args):
+        if self._dispatcher is None:
+            func(*args)
+        else:
+            # observers may not be hashable
+            self._dispatcher.submit(id(observer), func, *args)
 
     def _safe_call(self, obs, method, **kwargs):
+        self._dispatch(obs, self._call_observer, obs, method, kwargs)
+
+    def _call_observer(self, obs, method, kwargs):
         if obs not in self._failed_observers:
             try:
                 getattr(obs, method)(**kwargs)
@@ -425,6 +684,9 @@ class Run:
                 )
 
     def _final_call(self, observer, method, **kwargs):
+        self._dispatch(observer, self._final_call_observer, observer, method, kwargs)
+
+    def _final_call_observer(self, observer, method, kwargs):
         try:
             getattr(observer, method)(**kwargs)
         except Exception:
@@ -435,8 +697,14 @@ class Run:
 
     def _wait_for_observers(self):
         """Block until all observers finished processing."""
+        if self._dispatcher is not None:
+            self._dispatcher.shutdown()
+            self._dispatcher = None
         for observer in self.observers:
             self._safe_call(observer, "join")
+        if self._artifact_dir is not None:
+            shutil.rmtree(self._artifact_dir, ignore_errors=True)
+            self._artifact_dir = None
 
     def _warn_about_failed_observers(self):
         for observer in self._failed_observers:
@@ -476,3 +744,104 @@ class Run:
         # update the docstring too!)
 
         self._metrics.log_scalar_metric(metric_name, value, step)
+
+    def log_scalars(self, metrics, step=None):
+        """
+        Add new measurements of several metrics at once.
+
+        All measurements share the same step and timestamp.
+
+        :param metrics: A dictionary mapping metric names to measured values,
+                        e.g. {"training.loss": 0.3, "training.accuracy": 0.9}
+        :param step: The step number (integer), e.g. the iteration number
+                    If not specified, an internal counter for each metric
+                    is used, incremented by one.
+        """
+        # The same as Experiment.log_scalars (if something changes,
+        # update the docstring too!)
+        self._metrics.log_scalar_metrics(metrics, step)
+
+    def log_scalar_array(self, metric_name, values, steps=None):
+        """
+        Add a whole series of measurements of a single metric at once.
+
+        NumPy arrays are added in bulk, without converting each element.
+
+        :param metric_name: The name of the metric, e.g. training.loss
+        :param values: A one-dimensional array or list of measured values
+        :param steps: A one-dimensional array or list of step numbers with
+                    the same length as values. If not specified, an internal
+                    counter is used, incremented by one for each value.
+        """
+        # The same as Experiment.log_scalar_array (if something changes,
+        # update the docstring too!)
+        self._metrics.log_scalar_metric_array(metric_name, values, steps)
+
+
+# ioctl request of Linux to clone a file with copy-on-write (from linux/fs.h)
+_FICLONE = 0x40049409
+
+
+def _clone_or_copy_file(src, dst):
+    """Copy src to dst, but share the data if the filesystem supports it.
+
+    A copy-on-write clone (e.g. on btrfs or XFS) is nearly instant and does
+    not use additional disk space, otherwise the file is copied.
+    """
+    try:
+        import fcntl
+
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        return
+    except (ImportError, OSError):
+        pass
+    shutil.copyfile(src, dst)
+
+
+class _ObserverBeat:
+    """Changes of a run that were not yet sent to one of its observers."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.next_beat = 0.0
+        # position from which the observer has not received the output
+        self.offset = 0
+        self.info_changed = {}
+        self.result_changed = False
+        self.metrics = {}
+
+    def add_metrics(self, metrics_by_name):
+        for name, metric in metrics_by_name.items():
+            pending = self.metrics.get(name)
+            if pending is None:
+                # copy the lists, because they are shared with other observers
+                pending = self.metrics[name] = dict(metric)
+                for key in ("steps", "values", "timestamps"):
+                    pending[key] = list(metric[key])
+            else:
+                for key in ("steps", "values", "timestamps"):
+                    pending[key].extend(metric[key])
+
+
+def _fingerprint(value):
+    """Return a serialized form of value to detect changes, or None."""
+    try:
+        return serializer.json.encode(value, keys=True)
+    except Exception:
+        return None
+
+
+def _common_prefix_length(a, b):
+    """Return the length of the longest common prefix of two strings."""
+    n = min(len(a), len(b))
+    if a[:n] == b[:n]:
+        return n
+    lo, hi = 0, n
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
@@ -1,33 +1,48 @@
-import jsonpickle
 import json as _json
 from sacred import optional as opt
 
-json = jsonpickle
-
 
 __all__ = ("flatten", "restore")
 
 
-if opt.has_numpy:
-    import jsonpickle.ext.numpy as jsonpickle_numpy
+_jsonpickle = None
+
+
+def _get_jsonpickle():
+    """Import jsonpickle and register the numpy and pandas handlers.
+
+    This is done on first use, because jsonpickle and its extensions take a
+    while to import.
+    """
+    global _jsonpickle
+    if _jsonpickle is None:
+        import jsonpickle
+
+        if opt.has_numpy:
+            import jsonpickle.ext.numpy as jsonpickle_numpy
 
-    np = opt.np
+            jsonpickle_numpy.register_handlers()
 
-    jsonpickle_numpy.register_handlers()
+        if opt.has_pandas:
+            import jsonpickle.ext.pandas as jsonpickle_pandas
 
-if opt.has_pandas:
-    import jsonpickle.ext.pandas as jsonpickle_pandas
+            jsonpickle_pandas.register_handlers()
 
-    jsonpickle_pandas.register_handlers()
+        jsonpickle.set_encoder_options("simplejson", sort_keys=True, indent=4)
+        jsonpickle.set_encoder_options("demjson", compactly=False)
+        _jsonpickle = jsonpickle
+    return _jsonpickle
 
 
-jsonpickle.set_encoder_options("simplejson", sort_keys=True, indent=4)
-jsonpickle.set_encoder_options("demjson", compactly=False)
+def __getattr__(name):
+    if name == "json":
+        return _get_jsonpickle()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
 
 def flatten(obj):
-    return _json.loads(json.encode(obj, keys=True))
+    return _json.loads(_get_jsonpickle().encode(obj, keys=True))
 
 
 def restore(flat):
-    return json.decode(_json.dumps(flat), keys=True, on_missing="error")
+    return _get_jsonpickle().decode(_json.dumps(flat), keys=True, on_missing="error")
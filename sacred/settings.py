@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # coding=utf-8
 
+import os
 import platform
 from sacred.utils import SacredError
 import sacred.optional as opt
@@ -14,6 +15,16 @@ class SettingError(SacredError):
     """Error for invalid settings."""
 
 
+def _numpy_version():
+    # read the version from the package metadata to avoid importing numpy
+    from importlib import metadata
+
+    try:
+        return version.parse(metadata.version("numpy"))
+    except metadata.PackageNotFoundError:
+        return version.parse(opt.np.__version__)
+
+
 class FrozenKeyMunch(Munch):
     __frozen_keys = False
 
@@ -85,8 +96,7 @@ SETTINGS = FrozenKeyMunch.fromDict(
             # if true uses the numpy legacy API, i.e. _rnd in captured functions is
             # a numpy.random.RandomState rather than numpy.random.Generator.
             # numpy.random.RandomState became legacy with numpy v1.19.
-            "NUMPY_RANDOM_LEGACY_API": version.parse(opt.np.__version__)
-            < version.parse("1.19")
+            "NUMPY_RANDOM_LEGACY_API": _numpy_version() < version.parse("1.19")
             if opt.has_numpy
             else False,
         },
@@ -97,6 +107,16 @@ SETTINGS = FrozenKeyMunch.fromDict(
             "INCLUDE_CPU_INFO": True,
             # List of ENVIRONMENT variables to store in host-info
             "CAPTURED_ENV": [],
+            # seconds to wait for the host info gatherers, which run
+            # concurrently. Gatherers that take longer are left out.
+            "TIMEOUT": 10.0,
+        },
+        "GIT": {
+            # how to check whether a repository has uncommitted changes.
+            # [full, fast, none]
+            "DIRTY_CHECK": "full",
+            # seconds after which the 'fast' dirty check gives up
+            "DIRTY_CHECK_TIMEOUT": 5.0,
         },
         "COMMAND_LINE": {
             # disallow string fallback, if parsing a value from command-line
@@ -106,14 +126,79 @@ SETTINGS = FrozenKeyMunch.fromDict(
             # dependencies)
             "SHOW_DISABLED_OPTIONS": True,
         },
-        # configure how stdout/stderr are captured. ['no', 'sys', 'fd']
+        "METRICS": {
+            # keep references to tensor-like metric values (e.g. PyTorch
+            # tensors) and convert them in one batch during the heartbeat,
+            # instead of forcing a device synchronization on every log_scalar
+            "DEFER_TENSOR_CONVERSION": False,
+            # number of buffered measurements that triggers sending the
+            # metrics to the observers before the next heartbeat is due.
+            # None disables size-triggered flushing.
+            "MAX_BUFFERED": None,
+            # approximate size in bytes of the buffered measurements that
+            # triggers sending the metrics early. Deferred tensor-like values
+            # count with their nbytes. None disables this limit.
+            "MAX_BUFFERED_BYTES": None,
+        },
+        "OBSERVERS": {
+            # how events are sent to the observers. ['sequential', 'parallel']
+            # 'parallel' calls all observers concurrently on a thread pool,
+            # but keeps the order of events for each observer
+            "DISPATCH": "sequential",
+            # number of threads used by the parallel dispatch
+            "MAX_WORKERS": 4,
+        },
+        # configure how stdout/stderr are captured. ['no', 'sys', 'fd', 'pipe']
         "CAPTURE_MODE": "sys" if platform.system() == "Windows" else "fd",
+        # maximum number of characters of captured output to keep in memory.
+        # Older output is spilled to a temporary file. None means no limit.
+        "CAPTURE_MAX_MEMORY": None,
+        # store progress bars and other lines that are rewritten with carriage
+        # returns only in their final state (for the 'sys' and 'pipe' modes)
+        "CAPTURE_COLLAPSE_PROGRESS": False,
+        # with CAPTURE_COLLAPSE_PROGRESS, drop lines that only differ from the
+        # previous line in their numbers if they follow it within this number
+        # of seconds. None disables this.
+        "CAPTURE_RATE_LIMIT": None,
         # configure how dependencies are discovered. [none, imported, sys, pkg]
         "DISCOVER_DEPENDENCIES": "imported",
         # configure how source-files are discovered. [none, imported, sys, dir]
         "DISCOVER_SOURCES": "imported",
+        # patterns of files and directories that are skipped by the "dir"
+        # source discovery, in addition to the ones from .gitignore files.
+        # Uses the .gitignore syntax.
+        "DISCOVER_SOURCES_IGNORE": [
+            "__pycache__/",
+            ".git/",
+            ".hg/",
+            ".svn/",
+            ".tox/",
+            ".nox/",
+            "node_modules/",
+            "site-packages/",
+        ],
+        # file in which the MD5 digests of source files, resources and
+        # artifacts are cached across processes. None only caches them in
+        # memory.
+        "DIGEST_CACHE_FILE": None,
+        # directory in which the mapping from modules to installed packages
+        # and the static host info are cached. None disables these caches.
+        "CACHE_DIR": os.path.join(
+            os.environ.get("XDG_CACHE_HOME") or "~/.cache", "sacred"
+        ),
         # Configure the default beat interval, in seconds
         "DEFAULT_BEAT_INTERVAL": 10.0,
+        # randomly scale each heartbeat interval by up to this fraction, to
+        # spread the writes of many concurrent runs (also used for the
+        # worker interval of the QueueObserver). Must be in [0, 1)
+        "BEAT_JITTER": 0.0,
+        # send the first heartbeat after a random fraction of the interval,
+        # such that runs started at the same time beat at different phases
+        "BEAT_STAGGER": False,
+        # number of threads that run the heartbeats of all runs and the
+        # workers of all QueueObservers in this process. Read when the first
+        # run starts.
+        "SCHEDULER_MAX_WORKERS": 4,
     },
 )
 SETTINGS.freeze_keys()
@@ -1,16 +1,21 @@
 #!/usr/bin/env python
 # coding=utf-8
 
+import codecs
 import os
+import re
 import sys
 import subprocess
+import threading
+import time
 import warnings
-from io import StringIO
+from io import BytesIO, StringIO
 from contextlib import contextmanager
 import wrapt
-from sacred.optional import libc
-from tempfile import NamedTemporaryFile
+from sacred import optional as opt
+from tempfile import NamedTemporaryFile, SpooledTemporaryFile, TemporaryFile
 from sacred.settings import SETTINGS
+from sacred.utils import IncrementalTerminalFilter
 
 
 def flush():
@@ -21,14 +26,19 @@ def flush():
     except (AttributeError, ValueError, OSError):
         pass  # unsupported
     try:
-        libc.fflush(None)
+        opt.libc.fflush(None)
     except (AttributeError, ValueError, OSError):
         pass  # unsupported
 
 
 def get_stdcapturer(mode=None):
     mode = mode if mode is not None else SETTINGS.CAPTURE_MODE
-    capture_options = {"no": no_tee, "fd": tee_output_fd, "sys": tee_output_python}
+    capture_options = {
+        "no": no_tee,
+        "fd": tee_output_fd,
+        "pipe": tee_output_pipe,
+        "sys": tee_output_python,
+    }
     if mode not in capture_options:
         raise KeyError(
             "Unknown capture mode '{}'. Available options are {}".format(
@@ -38,15 +48,111 @@ def get_stdcapturer(mode=None):
     return mode, capture_options[mode]
 
 
+_NUMBERS = re.compile(r"\d+")
+
+
+class ProgressFilter:
+    """Collapses progress bars in the captured output as it arrives.
+
+    Lines that are rewritten using carriage returns or backspaces are only
+    stored in their final state. The current state of an unfinished line is
+    stored when the output is read, if the line was already unfinished at the
+    previous read. Later states of that line are prefixed with a carriage
+    return.
+
+    If min_interval is given, finished lines that only differ from the
+    previous line in their numbers are dropped if they follow it within
+    min_interval seconds. The last dropped line is stored when the output is
+    read or before the next line that is different.
+    """
+
+    def __init__(self, min_interval=None):
+        self.min_interval = min_interval
+        self._terminal = IncrementalTerminalFilter()
+        self._lock = threading.Lock()
+        self._reads = 0
+        # number of reads when the unfinished line was started
+        self._line_started = 0
+        # state of the unfinished line that was stored, if any
+        self._stored_line = None
+        self._last_key = None
+        self._last_time = None
+        self._dropped_line = None
+
+    def write(self, text):
+        """Process captured text and return the part that should be stored."""
+        with self._lock:
+            finished = self._terminal.feed(text)
+            if not finished:
+                return ""
+            self._line_started = self._reads
+            # an older state of the first line was already stored
+            prefix = "" if self._stored_line is None else "\r"
+            self._stored_line = None
+            return prefix + self._limit(finished, keep_first=bool(prefix))
+
+    def flush(self, final=False):
+        """Return the output that should be stored when the output is read."""
+        with self._lock:
+            out = ""
+            if self._dropped_line is not None:
+                out = self._dropped_line
+                self._dropped_line = None
+                self._last_time = time.monotonic()
+            line = self._terminal.line
+            if (final or self._line_started < self._reads) and line:
+                if line != self._stored_line:
+                    if self._stored_line is not None:
+                        out += "\r"
+                    out += line
+                    self._stored_line = line
+            self._reads += 1
+            return out
+
+    def _limit(self, finished, keep_first=False):
+        if self.min_interval is None:
+            return finished
+        now = time.monotonic()
+        out = []
+        for i, line in enumerate(finished[:-1].split("\n")):
+            key = _NUMBERS.sub("0", line)
+            if (
+                key == self._last_key
+                and now - self._last_time < self.min_interval
+                and not (keep_first and i == 0)
+            ):
+                self._dropped_line = line + "\n"
+                continue
+            if self._dropped_line is not None and key != self._last_key:
+                out.append(self._dropped_line)
+            self._dropped_line = None
+            self._last_key, self._last_time = key, now
+            out.append(line + "\n")
+        return "".join(out)
+
+
+def get_progress_filter():
+    """Return a new ProgressFilter if enabled in the settings, else None."""
+    if not SETTINGS.CAPTURE_COLLAPSE_PROGRESS:
+        return None
+    return ProgressFilter(SETTINGS.CAPTURE_RATE_LIMIT)
+
+
 class TeeingStreamProxy(wrapt.ObjectProxy):
-    """A wrapper around stdout or stderr that duplicates all output to out."""
+    """A wrapper around stdout or stderr that duplicates all output to out.
 
-    def __init__(self, wrapped, out):
+    If a ProgressFilter is given, it is applied to the duplicated output.
+    """
+
+    def __init__(self, wrapped, out, progress=None):
         super().__init__(wrapped)
         self._self_out = out
+        self._self_progress = progress
 
     def write(self, data):
         self.__wrapped__.write(data)
+        if self._self_progress is not None:
+            data = self._self_progress.write(data)
         self._self_out.write(data)
 
     def flush(self):
@@ -55,10 +161,11 @@ class TeeingStreamProxy(wrapt.ObjectProxy):
 
 
 class CapturedStdout:
-    def __init__(self, buffer):
+    def __init__(self, buffer, progress=None):
         self.buffer = buffer
         self.read_position = 0
         self.final = None
+        self.progress = progress
 
     @property
     def closed(self):
@@ -69,6 +176,8 @@ class CapturedStdout:
 
     def get(self):
         if self.final is None:
+            if self.progress is not None:
+                self._store_progress()
             self.buffer.seek(self.read_position)
             value = self.buffer.read()
             self.read_position = self.buffer.tell()
@@ -80,9 +189,94 @@ class CapturedStdout:
 
     def finalize(self):
         self.flush()
+        if self.progress is not None:
+            self._store_progress(final=True)
         self.final = self.get()
         self.buffer.close()
 
+    def _store_progress(self, final=False):
+        text = self.progress.flush(final)
+        if text:
+            self.buffer.seek(0, os.SEEK_END)
+            self.buffer.write(text)
+
+
+class PipedCapturedStdout(CapturedStdout):
+    """CapturedStdout that collects the output read from several streams.
+
+    The output of each stream is only added in complete lines, such that lines
+    written to stdout and stderr at the same time do not get mixed up. An
+    incomplete line is added if it is still incomplete when the output is
+    read a second time, or when the capturing ends.
+    """
+
+    def __init__(self, buffer, progress_factory=None):
+        super().__init__(buffer)
+        self.lock = threading.Lock()
+        # stream -> (incomplete line, number of reads when it was started)
+        self._partial_lines = {}
+        self._reads = 0
+        self._decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        # stream -> (decoder, ProgressFilter)
+        self._progress_factory = progress_factory
+        self._progress_filters = {}
+
+    def write(self, stream, data):
+        with self.lock:
+            if self.buffer.closed:
+                return
+            if self._progress_factory is not None:
+                # the progress filter keeps incomplete lines itself
+                if stream not in self._progress_filters:
+                    self._progress_filters[stream] = (
+                        codecs.getincrementaldecoder("utf-8")("replace"),
+                        self._progress_factory(),
+                    )
+                decoder, progress = self._progress_filters[stream]
+                self._append(progress.write(decoder.decode(data)).encode("utf-8"))
+                return
+            partial, reads = self._partial_lines.pop(stream, (b"", self._reads))
+            data = partial + data
+            end = data.rfind(b"\n") + 1
+            if end < len(data):
+                if end > 0:
+                    reads = self._reads
+                self._partial_lines[stream] = (data[end:], reads)
+            self._append(data[:end])
+
+    def _append(self, data):
+        if data:
+            self.buffer.seek(0, os.SEEK_END)
+            self.buffer.write(data)
+
+    def _flush_partial_lines(self, reads=None):
+        for stream, (data, started) in list(self._partial_lines.items()):
+            if reads is None or started < reads:
+                self._append(data)
+                del self._partial_lines[stream]
+        for decoder, progress in self._progress_filters.values():
+            final = reads is None
+            text = progress.write(decoder.decode(b"", final=final))
+            self._append((text + progress.flush(final)).encode("utf-8"))
+
+    def get(self):
+        with self.lock:
+            if self.final is None:
+                self._flush_partial_lines(self._reads)
+                self._reads += 1
+            value = super().get()
+        if isinstance(value, bytes):
+            # the output may end in the middle of a multi-byte character
+            value = self._decoder.decode(value)
+        return value
+
+    def finalize(self):
+        with self.lock:
+            self._flush_partial_lines()
+            self.buffer.seek(self.read_position)
+            self.final = self._decoder.decode(self.buffer.read(), final=True)
+            self.buffer.close()
+
 
 @contextmanager
 def no_tee():
@@ -95,13 +289,26 @@ def no_tee():
 
 @contextmanager
 def tee_output_python():
-    """Duplicate sys.stdout and sys.stderr to new StringIO."""
-    buffer = StringIO()
-    out = CapturedStdout(buffer)
+    """Duplicate sys.stdout and sys.stderr to new StringIO.
+
+    If SETTINGS.CAPTURE_MAX_MEMORY is set, the buffer is moved to a temporary
+    file once it exceeds that size.
+    """
+    if SETTINGS.CAPTURE_MAX_MEMORY is None:
+        buffer = StringIO()
+    else:
+        buffer = SpooledTemporaryFile(
+            max_size=SETTINGS.CAPTURE_MAX_MEMORY,
+            mode="w+",
+            encoding="utf-8",
+            newline="",
+        )
+    progress = get_progress_filter()
+    out = CapturedStdout(buffer, progress)
     orig_stdout, orig_stderr = sys.stdout, sys.stderr
     flush()
-    sys.stdout = TeeingStreamProxy(sys.stdout, buffer)
-    sys.stderr = TeeingStreamProxy(sys.stderr, buffer)
+    sys.stdout = TeeingStreamProxy(sys.stdout, buffer, progress)
+    sys.stderr = TeeingStreamProxy(sys.stderr, buffer, progress)
     try:
         yield out
     finally:
@@ -188,3 +395,84 @@ def tee_output_fd():
             os.close(saved_stdout_fd)
             os.close(saved_stderr_fd)
             out.finalize()
+
+
+# seconds between checks of the capture files for new output
+_POLL_INTERVAL = 0.02
+
+
+def _forward_file(fd, target_fd, out, stopped):
+    """Copy everything appended to the file fd to target_fd and to out.
+
+    The file is polled, since writes to it never wait for this thread, which
+    needs the GIL. Returns once stopped is set and all output was copied.
+    """
+    position = 0
+    while True:
+        done = stopped.is_set()
+        data = os.pread(fd, 65536, position)
+        if data:
+            position += len(data)
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(target_fd, view) :]
+            except OSError:
+                pass  # keep capturing even if the terminal went away
+            out.write(fd, data)
+        elif done:
+            break
+        else:
+            stopped.wait(_POLL_INTERVAL)
+
+
+@contextmanager
+def tee_output_pipe():
+    """Duplicate stdout and stderr on the file descriptor level in-process.
+
+    Like tee_output_fd this captures the output of C-extensions and child
+    processes, but no tee subprocesses are started. Instead stdout and stderr
+    are redirected to temporary files, which threads of this process copy to
+    the original file descriptors and to the buffer. Unlike with pipes, writes
+    never block, even if C code writes a lot of output while it holds the GIL.
+    If SETTINGS.CAPTURE_MAX_MEMORY is set, the buffer is moved to a temporary
+    file once it exceeds that size.
+    """
+    if SETTINGS.CAPTURE_MAX_MEMORY is None:
+        buffer = BytesIO()
+    else:
+        buffer = SpooledTemporaryFile(max_size=SETTINGS.CAPTURE_MAX_MEMORY)
+    progress_factory = (
+        get_progress_filter if SETTINGS.CAPTURE_COLLAPSE_PROGRESS else None
+    )
+    out = PipedCapturedStdout(buffer, progress_factory)
+    stopped = threading.Event()
+
+    flush()
+    redirected = []
+    for original_fd in (1, 2):
+        saved_fd = os.dup(original_fd)
+        capture_file = TemporaryFile()
+        os.dup2(capture_file.fileno(), original_fd)
+        reader = threading.Thread(
+            target=_forward_file,
+            args=(capture_file.fileno(), saved_fd, out, stopped),
+            name="sacred-capture-{}".format(original_fd),
+            daemon=True,
+        )
+        reader.start()
+        redirected.append((original_fd, saved_fd, capture_file, reader))
+
+    try:
+        yield out  # let the caller do their printing
+    finally:
+        flush()
+        for original_fd, saved_fd, _, _ in redirected:
+            os.dup2(saved_fd, original_fd)
+        # the readers copy the remaining output before they return
+        stopped.set()
+        for _, saved_fd, capture_file, reader in redirected:
+            reader.join()
+            capture_file.close()
+            os.close(saved_fd)
+        out.finalize()
@@ -3,13 +3,20 @@
 
 import collections
 import contextlib
+import heapq
 import importlib
+import itertools
+import json
 import logging
+import os
 import pkgutil
+import random
 import re
 import shlex
 import sys
+import tempfile
 import threading
+import time
 import traceback as tb
 from functools import partial
 from packaging import version
@@ -41,8 +48,13 @@ __all__ = [
     "optional_kwargs_decorator",
     "get_inheritors",
     "apply_backspaces_and_linefeeds",
+    "IncrementalTerminalFilter",
     "rel_path",
     "IntervalTimer",
+    "OrderedExecutor",
+    "Scheduler",
+    "get_scheduler",
+    "write_json_atomically",
     "PathType",
 ]
 
@@ -641,34 +653,81 @@ def apply_backspaces_and_linefeeds(text):
     If final line ends with a carriage it keeps it to be concatenable with next
     output chunk.
     """
-    orig_lines = text.split("\n")
-    orig_lines_len = len(orig_lines)
-    new_lines = []
-    for orig_line_idx, orig_line in enumerate(orig_lines):
-        chars, cursor = [], 0
-        orig_line_len = len(orig_line)
-        for orig_char_idx, orig_char in enumerate(orig_line):
-            if orig_char == "\r" and (
-                orig_char_idx != orig_line_len - 1
-                or orig_line_idx != orig_lines_len - 1
-            ):
-                cursor = 0
-            elif orig_char == "\b":
-                cursor = max(0, cursor - 1)
-            else:
-                if (
-                    orig_char == "\r"
-                    and orig_char_idx == orig_line_len - 1
-                    and orig_line_idx == orig_lines_len - 1
-                ):
-                    cursor = len(chars)
-                if cursor == len(chars):
-                    chars.append(orig_char)
-                else:
-                    chars[cursor] = orig_char
-                cursor += 1
-        new_lines.append("".join(chars))
-    return "\n".join(new_lines)
+    terminal = IncrementalTerminalFilter()
+    return terminal.feed(text) + terminal.render_line()
+
+
+_CURSOR_MOVES = re.compile("([\r\b])")
+
+
+class IncrementalTerminalFilter:
+    """Incremental version of :func:`apply_backspaces_and_linefeeds`.
+
+    Finished lines never change, so only the newly captured text has to be
+    processed, starting from the state of the last unfinished line.
+    """
+
+    def __init__(self):
+        self.line = ""
+        self.cursor = 0
+        self.ends_with_cr = False
+
+    def render_line(self):
+        """Return the filtered text of the unfinished line."""
+        return self.line + "\r" if self.ends_with_cr else self.line
+
+    def feed(self, text):
+        """Process text and return the lines it finished, including newlines."""
+        if not text:
+            return ""
+        self.ends_with_cr = text[-1] == "\r"
+        end = text.rfind("\n") + 1
+        if self.cursor == len(self.line) and "\r" not in text and "\b" not in text:
+            # nothing to overwrite, so the text can be used as it is
+            finished = self.line + text[:end] if end else ""
+            self.line = text[end:] if end else self.line + text
+            self.cursor = len(self.line)
+            return finished
+        *lines, rest = text.split("\n")
+        finished = []
+        for line in lines:
+            self._apply(line)
+            finished.append(self.line + "\n")
+            self.line, self.cursor = "", 0
+        self._apply(rest)
+        return "".join(finished)
+
+    def update(self, text):
+        """Process newly captured text and return how the output changes.
+
+        Returns
+        -------
+        tuple of int and str
+            The number of characters to remove from the end of the output
+            filtered so far, and the text to append to it.
+        """
+        old_line = self.render_line()
+        tail = self.feed(text) + self.render_line()
+        keep = len(os.path.commonprefix([old_line, tail]))
+        return len(old_line) - keep, tail[keep:]
+
+    def _apply(self, line):
+        """Apply a part of a line that does not contain a linefeed."""
+        for segment in _CURSOR_MOVES.split(line) if line else ():
+            if segment == "\r":
+                self.cursor = 0
+            elif segment == "\b":
+                self.cursor = max(0, self.cursor - 1)
+            elif segment:
+                cursor = self.cursor
+                self.line = (
+                    self.line[:cursor] + segment + self.line[cursor + len(segment) :]
+                )
+                self.cursor = cursor + len(segment)
+
+
+# captured_out_filters with an incremental attribute are applied incrementally
+apply_backspaces_and_linefeeds.incremental = IncrementalTerminalFilter
 
 
 def module_exists(modname):
@@ -701,6 +760,32 @@ def get_package_version(name):
     return parse_version(version_string)
 
 
+def write_json_atomically(filename, obj):
+    """Write obj to filename such that readers never see a partial file.
+
+    Returns False if that failed (e.g. because the directory is read-only),
+    which is fine for caches.
+    """
+    tmp_name = None
+    try:
+        directory = os.path.dirname(os.path.abspath(filename))
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=directory, delete=False, suffix=".tmp"
+        ) as f:
+            tmp_name = f.name
+            json.dump(obj, f)
+        os.replace(tmp_name, filename)
+        return True
+    except OSError:
+        if tmp_name is not None:
+            try:
+                os.remove(tmp_name)
+            except OSError:
+                pass
+        return False
+
+
 def ensure_wellformed_argv(argv):
     if argv is None:
         argv = sys.argv
@@ -735,3 +820,265 @@ class IntervalTimer(threading.Thread):
         while not self.stopped.wait(self.interval):
             self.func()
         self.func()
+
+
+class OrderedExecutor:
+    """Run functions on a thread pool, in order for the same key.
+
+    Functions submitted with different keys run concurrently on at most
+    max_workers threads, while those with the same key run one after another
+    in the order in which they were submitted.
+    """
+
+    def __init__(self, max_workers=4, thread_name_prefix="sacred"):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=thread_name_prefix
+        )
+        self._pending = {}
+        self._idle = threading.Condition()
+
+    def submit(self, key, func, *args, **kwargs):
+        with self._idle:
+            if key in self._pending:
+                self._pending[key].append(partial(func, *args, **kwargs))
+                return
+            self._pending[key] = collections.deque([partial(func, *args, **kwargs)])
+        self._executor.submit(self._run_pending, key)
+
+    def _run_pending(self, key):
+        while True:
+            with self._idle:
+                pending = self._pending[key]
+                if not pending:
+                    del self._pending[key]
+                    self._idle.notify_all()
+                    return
+                func = pending.popleft()
+            try:
+                func()
+            except Exception:
+                logging.getLogger(__name__).exception("Error in %s", func)
+
+    def join(self, timeout=None):
+        """Block until all submitted functions have finished."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def shutdown(self):
+        self.join()
+        self._executor.shutdown()
+
+
+def _interval_delays(interval, jitter, stagger, rnd):
+    """Yield the times to wait between the calls of a periodic task."""
+    if stagger:
+        yield rnd.uniform(0, interval)
+    while True:
+        if jitter:
+            yield interval * rnd.uniform(1 - jitter, 1 + jitter)
+        else:
+            yield interval
+
+
+class ScheduledTask:
+    """A periodic task that is executed by a :class:`Scheduler`.
+
+    func is called every interval seconds and once more by :meth:`stop`, and
+    wakeup_func is called as soon as possible after :meth:`wake_up`. The
+    calls of one task never overlap.
+
+    Each interval is randomly scaled by a factor between 1 - jitter and
+    1 + jitter, where 0 <= jitter < 1. If stagger is True, the first call
+    happens after a random fraction of the interval. Both spread out the calls
+    of many tasks that were started at the same time.
+    """
+
+    def __init__(
+        self, scheduler, func, interval, wakeup_func=None, jitter=0.0, stagger=False
+    ):
+        if not 0 <= jitter < 1:
+            raise ValueError(
+                "SETTINGS.BEAT_JITTER must be at least 0 and less than 1, "
+                "but was {}".format(jitter)
+            )
+        self.func = func
+        self.interval = interval
+        self.wakeup_func = wakeup_func
+        self.stopped = threading.Event()
+        self._scheduler = scheduler
+        self._delays = _interval_delays(interval, jitter, stagger, random.Random())
+        self._finished = threading.Event()
+        self._wakeup_pending = False
+        self._next_delay = None
+        self._lock = threading.Lock()
+        # held while func or wakeup_func is called
+        self._call_lock = threading.RLock()
+
+    def wake_up(self):
+        """Call wakeup_func without waiting for the interval."""
+        if self.wakeup_func is None:
+            return
+        with self._lock:
+            if self._wakeup_pending or self.stopped.is_set():
+                return
+            self._wakeup_pending = True
+        self._scheduler._submit(self, self._run_wakeup)
+
+    def reschedule(self, delay):
+        """Call func again after delay seconds instead of after the interval.
+
+        Meant to be called from func, e.g. to retry something that failed
+        without blocking the thread pool of the scheduler in the meantime.
+        """
+        self._next_delay = delay
+
+    def stop(self):
+        """Cancel the task after calling func one last time.
+
+        The last call happens on the calling thread, once a call that is
+        currently running on the thread pool has finished. Thus it is neither
+        delayed nor lost if all threads of the pool are busy.
+        """
+        with self._lock:
+            if self.stopped.is_set():
+                return
+            self.stopped.set()
+        self._scheduler._cancel(self)
+        with self._call_lock:
+            try:
+                self.func()
+            except Exception:
+                logging.getLogger(__name__).exception("Error in %s", self.func)
+            finally:
+                self._finished.set()
+
+    def join(self, timeout=None):
+        """Wait until the last call of func after :meth:`stop` has finished."""
+        self._finished.wait(timeout)
+
+    def is_alive(self):
+        return not self._finished.is_set()
+
+    def _run_wakeup(self):
+        with self._lock:
+            self._wakeup_pending = False
+        with self._call_lock:
+            if not self.stopped.is_set():
+                self.wakeup_func()
+
+    def _run_periodic(self):
+        with self._call_lock:
+            if self.stopped.is_set():
+                return
+            try:
+                self.func()
+            finally:
+                delay, self._next_delay = self._next_delay, None
+                if delay is None:
+                    delay = next(self._delays)
+                if not self.stopped.is_set():
+                    self._scheduler._push(self, time.monotonic() + delay)
+
+
+class Scheduler:
+    """Multiplexes periodic tasks, like heartbeats, on a single thread.
+
+    The thread keeps a priority queue of the deadlines of all tasks and hands
+    due tasks to a thread pool of max_workers threads, such that a slow task
+    does not delay the others. Use :func:`get_scheduler` to get the instance
+    that is shared by the whole process.
+    """
+
+    def __init__(self, max_workers=4):
+        self._deadlines = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._executor = OrderedExecutor(max_workers, "sacred-scheduler")
+
+    def schedule(self, func, interval, wakeup_func=None, jitter=0.0, stagger=False):
+        """Call func every interval seconds until the returned task is stopped.
+
+        Parameters
+        ----------
+        func : callable
+            Called periodically and once more when the task is stopped.
+        interval : float
+            The time between two calls in seconds.
+        wakeup_func : callable, optional
+            Called as soon as possible whenever the task is woken up.
+        jitter : float
+            Each interval is randomly scaled by a factor between 1 - jitter
+            and 1 + jitter. Must be at least 0 and less than 1.
+        stagger : bool
+            Whether the first call happens after a random fraction of the
+            interval.
+
+        Returns
+        -------
+        ScheduledTask
+            The task, which can be woken up and stopped.
+        """
+        task = ScheduledTask(self, func, interval, wakeup_func, jitter, stagger)
+        self._push(task, time.monotonic() + next(task._delays))
+        return task
+
+    def _push(self, task, deadline):
+        with self._condition:
+            heapq.heappush(self._deadlines, (deadline, next(self._counter), task))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="sacred-scheduler", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+
+    def _cancel(self, task):
+        with self._condition:
+            self._deadlines = [d for d in self._deadlines if d[2] is not task]
+            heapq.heapify(self._deadlines)
+
+    def _submit(self, task, func):
+        self._executor.submit(id(task), func)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    if not self._deadlines:
+                        self._condition.wait()
+                        continue
+                    timeout = self._deadlines[0][0] - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self._condition.wait(timeout)
+                _, _, task = heapq.heappop(self._deadlines)
+            self._submit(task, task._run_periodic)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the scheduler that is shared by the whole process."""
+    from sacred.settings import SETTINGS
+
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler(SETTINGS.SCHEDULER_MAX_WORKERS)
+        return _scheduler
+
+
+def _reset_scheduler():
+    # the thread of the scheduler does not survive a fork
+    global _scheduler, _scheduler_lock
+    _scheduler = None
+    _scheduler_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_scheduler)
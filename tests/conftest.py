@@ -6,6 +6,7 @@ import hashlib
 import os.path
 import re
 import shlex
+import shutil
 import sys
 import warnings
 from importlib import reload
@@ -84,6 +85,14 @@ def pytest_addoption(parser):
     )
 
 
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    # don't write the package index and host info into the real cache
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setitem(SETTINGS, "CACHE_DIR", str(cache_dir))
+    return cache_dir
+
+
 @pytest.fixture
 def tmpfile():
     # NOTE: instead of using a with block and delete=True we are creating and
@@ -108,3 +117,12 @@ def tmpfile():
 # Deactivate GPU and CPU info to speed up tests
 SETTINGS.HOST_INFO.INCLUDE_GPU_INFO = False
 SETTINGS.HOST_INFO.INCLUDE_CPU_INFO = False
+
+# Examples are imported while collecting the tests, which already fills the
+# caches, so keep them out of the real cache directory for the whole session
+SESSION_CACHE_DIR = tempfile.mkdtemp(prefix="sacred-cache-")
+SETTINGS.CACHE_DIR = SESSION_CACHE_DIR
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(SESSION_CACHE_DIR, ignore_errors=True)
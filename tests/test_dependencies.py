@@ -3,6 +3,7 @@
 
 import os.path
 import os
+import sys
 from pathlib import Path
 
 import mock
@@ -12,11 +13,16 @@ from sacred.dependencies import (
     PackageDependency,
     Source,
     gather_sources_and_dependencies,
+    get_commit_if_possible,
     get_digest,
+    get_package_index,
     get_py_file_if_possible,
     is_local_source,
+    iterate_all_python_files,
 )
+import sacred.dependencies
 import sacred.optional as opt
+from sacred.settings import SETTINGS
 
 TEST_DIRECTORY = os.path.dirname(__file__)
 EXAMPLE_SOURCE = os.path.join(TEST_DIRECTORY, "__init__.py")
@@ -69,6 +75,66 @@ def test_source_get_digest():
     assert get_digest(EXAMPLE_SOURCE) == EXAMPLE_DIGEST
 
 
+def test_get_digest_is_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(sacred.dependencies, "_digest_cache", {})
+    monkeypatch.setattr(sacred.dependencies, "_digest_cache_file", None)
+    cache_file = tmp_path / "digests.json"
+    monkeypatch.setitem(SETTINGS, "DIGEST_CACHE_FILE", str(cache_file))
+    filename = tmp_path / "data.txt"
+    filename.write_text("foo")
+    # recently modified files are not cached
+    os.utime(filename, (0, 0))
+    digest = get_digest(filename)
+
+    with mock.patch.object(sacred.dependencies, "_compute_digest") as compute:
+        assert get_digest(filename) == digest
+        assert not compute.called
+
+    sacred.dependencies._save_digest_cache()
+    monkeypatch.setattr(sacred.dependencies, "_digest_cache", {})
+    monkeypatch.setattr(sacred.dependencies, "_digest_cache_file", None)
+    with mock.patch.object(sacred.dependencies, "_compute_digest") as compute:
+        assert get_digest(filename) == digest
+        assert not compute.called
+
+    filename.write_text("foobar")
+    os.utime(filename, (0, 0))
+    assert get_digest(filename) != digest
+
+
+def test_get_commit_if_possible_rejects_unknown_dirty_check(monkeypatch):
+    monkeypatch.setitem(SETTINGS.GIT, "DIRTY_CHECK", "fsat")
+    with pytest.raises(ValueError, match="SETTINGS.GIT.DIRTY_CHECK must be one of"):
+        get_commit_if_possible(__file__, True)
+
+
+def test_get_commit_if_possible_queries_each_repository_once(tmp_path, monkeypatch):
+    git = pytest.importorskip("git")
+    monkeypatch.setattr(sacred.dependencies, "_git_root_cache", {})
+    monkeypatch.setattr(sacred.dependencies, "_git_info_cache", {})
+    monkeypatch.setitem(SETTINGS.GIT, "DIRTY_CHECK", "fast")
+    repo = git.Repo.init(tmp_path)
+    (tmp_path / "pkg").mkdir()
+    filenames = [tmp_path / "a.py", tmp_path / "pkg" / "b.py"]
+    for filename in filenames:
+        filename.write_text("")
+    repo.index.add([str(f) for f in filenames])
+    actor = git.Actor("sacred", "sacred@example.com")
+    repo.index.commit("initial", author=actor, committer=actor)
+
+    with mock.patch("git.Repo", wraps=git.Repo) as repo_cls:
+        infos = [get_commit_if_possible(str(f), True) for f in filenames]
+    assert repo_cls.call_count == 1
+    assert infos[0] == infos[1]
+    url, commit, is_dirty = infos[0]
+    assert url == "git:/" + str(tmp_path)
+    assert commit == repo.head.commit.hexsha
+    assert is_dirty is False
+
+    filenames[0].write_text("import os")
+    assert sacred.dependencies._is_dirty_fast(repo) is True
+
+
 def test_source_create_empty():
     with pytest.raises(ValueError):
         Source.create("")
@@ -134,6 +200,42 @@ def test_package_dependency_fill_missing_version():
     assert pd.version == pytest.__version__
 
 
+def test_package_index_is_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(sacred.dependencies, "_package_index", None)
+    monkeypatch.setitem(SETTINGS, "CACHE_DIR", str(tmp_path))
+    index = get_package_index()
+    assert index["modules"]["pytest"] == index["distributions"]["pytest"]
+    assert len(list(tmp_path.iterdir())) == 1
+
+    monkeypatch.setattr(sacred.dependencies, "_package_index", None)
+    with mock.patch.object(sacred.dependencies, "_scan_package_index") as scan:
+        assert get_package_index() == index
+        assert not scan.called
+
+    # installing a package changes the modification time of its directory
+    monkeypatch.setattr(sacred.dependencies, "_package_index", None)
+    monkeypatch.setattr(sys, "path", sys.path + [str(tmp_path)])
+    with mock.patch.object(sacred.dependencies, "_scan_package_index") as scan:
+        scan.return_value = {"distributions": {}, "modules": {}}
+        get_package_index()
+        assert scan.called
+
+
+def test_package_index_with_unwritable_cache_dir(tmp_path, monkeypatch):
+    not_a_dir = tmp_path / "file"
+    not_a_dir.write_text("")
+    monkeypatch.setattr(sacred.dependencies, "_package_index", None)
+    monkeypatch.setitem(SETTINGS, "CACHE_DIR", str(not_a_dir / "sacred"))
+    index = get_package_index()
+    assert index["modules"]["pytest"] == index["distributions"]["pytest"]
+
+    # e.g. a read-only home directory
+    monkeypatch.setattr(sacred.dependencies, "_package_index", None)
+    monkeypatch.setitem(SETTINGS, "CACHE_DIR", str(tmp_path / "sacred"))
+    with mock.patch("os.makedirs", side_effect=PermissionError):
+        assert get_package_index() == index
+
+
 def test_package_dependency_repr():
     pd = PackageDependency("pytest", "12.4")
     assert repr(pd) == "<PackageDependency: pytest=12.4>"
@@ -220,6 +322,32 @@ def test_custom_base_dir():
     assert sources == expected_sources
 
 
+def test_iterate_all_python_files_skips_ignored_files(tmp_path, monkeypatch):
+    monkeypatch.setitem(SETTINGS, "DISCOVER_SOURCES_IGNORE", ["vendor/"])
+    files = [
+        "main.py",
+        "pkg/__init__.py",
+        "pkg/generated.py",
+        "pkg/keep_generated.py",
+        "build/lib/main.py",
+        "vendor/lib.py",
+        "env/lib/python3.11/site-packages/six.py",
+        "README.md",
+    ]
+    for f in files:
+        (tmp_path / f).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / f).write_text("")
+    (tmp_path / "env" / "pyvenv.cfg").write_text("")
+    (tmp_path / ".gitignore").write_text("# build output\n/build/\n")
+    (tmp_path / "pkg" / ".gitignore").write_text("*generated.py\n!keep_*\n")
+
+    found = sorted(
+        Path(f).relative_to(tmp_path).as_posix()
+        for f in iterate_all_python_files(str(tmp_path))
+    )
+    assert found == ["main.py", "pkg/__init__.py", "pkg/keep_generated.py"]
+
+
 @pytest.mark.parametrize(
     "f_name, mod_name, ex_path, is_local",
     [
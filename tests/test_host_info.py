@@ -1,9 +1,22 @@
 #!/usr/bin/env python
 # coding=utf-8
 
+import json
+import os
+import signal
+import threading
+
 import pytest
 
-from sacred.host_info import get_host_info, host_info_getter, host_info_gatherers
+import sacred.host_info
+import sacred.settings
+from sacred.host_info import (
+    IgnoreHostInfo,
+    get_host_info,
+    host_info_gatherer,
+    host_info_getter,
+    host_info_gatherers,
+)
 
 
 def test_get_host_info(monkeypatch: pytest.MonkeyPatch):
@@ -60,3 +73,84 @@ def test_host_info_decorator_depreciation_warning():
 
     finally:
         del host_info_gatherers["foo"]
+
+
+def test_host_info_timeout(monkeypatch):
+    monkeypatch.setitem(sacred.settings.SETTINGS.HOST_INFO, "TIMEOUT", 0.1)
+    never = threading.Event()
+
+    @host_info_gatherer("slow")
+    def slow():
+        never.wait(10)
+
+    with pytest.warns(UserWarning, match="slow"):
+        host_info = get_host_info([slow])
+    never.set()
+    assert "slow" not in host_info
+    assert "hostname" in host_info
+
+
+def test_static_host_info_with_unwritable_cache_dir(tmp_path, monkeypatch):
+    not_a_dir = tmp_path / "file"
+    not_a_dir.write_text("")
+    monkeypatch.setattr(sacred.host_info, "_static_host_info", None)
+    monkeypatch.setattr(
+        sacred.host_info,
+        "_get_static_host_info_file",
+        lambda: str(not_a_dir / "sacred" / "host-info.json"),
+    )
+    assert sacred.host_info._get_static_info("answer", lambda: 42) == 42
+    # the value is still cached in memory
+    assert sacred.host_info._get_static_info("answer", lambda: 1 / 0) == 42
+
+
+def test_static_host_info_is_cached(tmp_path, monkeypatch):
+    cache_file = tmp_path / "host-info.json"
+    monkeypatch.setattr(sacred.host_info, "_static_host_info", None)
+    monkeypatch.setattr(
+        sacred.host_info, "_get_static_host_info_file", lambda: str(cache_file)
+    )
+
+    def ignore():
+        raise IgnoreHostInfo()
+
+    assert sacred.host_info._get_static_info("answer", lambda: 42) == 42
+    with pytest.raises(IgnoreHostInfo):
+        sacred.host_info._get_static_info("ignored", ignore)
+    assert json.loads(cache_file.read_text()) == {
+        "answer": {"value": 42},
+        "ignored": {"ignored": True},
+    }
+
+    # a new process reads the cached values
+    monkeypatch.setattr(sacred.host_info, "_static_host_info", None)
+    assert sacred.host_info._get_static_info("answer", lambda: 1 / 0) == 42
+    with pytest.raises(IgnoreHostInfo):
+        sacred.host_info._get_static_info("ignored", lambda: 1 / 0)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_static_host_info_after_fork_during_prefetch(monkeypatch):
+    monkeypatch.setattr(sacred.host_info, "_static_host_info", {})
+    monkeypatch.setattr(sacred.host_info, "_get_static_host_info_file", lambda: None)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait()
+        return 1
+
+    thread = threading.Thread(
+        target=sacred.host_info._get_static_info, args=("slow", slow)
+    )
+    thread.start()
+    started.wait()
+    pid = os.fork()
+    if pid == 0:  # child: the thread running slow() is gone
+        signal.alarm(5)
+        ok = sacred.host_info._get_static_info("slow", lambda: 2) == 2
+        os._exit(0 if ok else 1)
+    release.set()
+    thread.join()
+    _, status = os.waitpid(pid, 0)
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
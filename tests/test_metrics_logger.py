@@ -138,3 +138,367 @@ def test_linearize_metrics():
     assert linearized["training.accuracy"]["values"] == [50, 100, 150, 300]
     assert linearized["training.loss"]["steps"] == [10, 20]
     assert linearized["training.loss"]["values"] == [100, 200]
+
+
+def test_get_last_metrics_by_name():
+    from sacred.metrics_logger import MetricsLogger
+
+    logger = MetricsLogger()
+    for i in range(5):
+        logger.log_scalar_metric("training.loss", i * 0.5)
+        logger.log_scalar_metric("training.accuracy", i * 10, i * 2)
+    metrics = logger.get_last_metrics_by_name()
+    assert set(metrics.keys()) == {"training.loss", "training.accuracy"}
+    loss = metrics["training.loss"]
+    assert loss["name"] == "training.loss"
+    assert loss["steps"] == [0, 1, 2, 3, 4]
+    assert loss["values"] == [0.0, 0.5, 1.0, 1.5, 2.0]
+    assert all(isinstance(t, datetime.datetime) for t in loss["timestamps"])
+    assert loss["timestamps"] == sorted(loss["timestamps"])
+    accuracy = metrics["training.accuracy"]
+    assert accuracy["steps"] == [0, 2, 4, 6, 8]
+    assert accuracy["values"] == [0, 10, 20, 30, 40]
+    assert all(type(v) is int for v in accuracy["values"])
+
+    # the buffer is emptied on read, but the step counters are kept
+    assert logger.get_last_metrics_by_name() == {}
+    logger.log_scalar_metric("training.loss", 7.0)
+    assert logger.get_last_metrics_by_name()["training.loss"]["steps"] == [5]
+
+
+def test_metric_columns_fall_back_to_lists_for_mixed_types():
+    from sacred.metrics_logger import MetricsLogger
+
+    logger = MetricsLogger()
+    logger.log_scalar_metric("mixed", 1)
+    logger.log_scalar_metric("mixed", 2.5)
+    logger.log_scalar_metric("mixed", 2**70)
+    logger.log_scalar_metric("mixed", "nan")
+    logger.log_scalar_metric("mixed", 3, step=1.5)
+    metrics = logger.get_last_metrics_by_name()
+    assert metrics["mixed"]["values"] == [1, 2.5, 2**70, "nan", 3]
+    assert metrics["mixed"]["steps"] == [0, 1, 2, 3, 1.5]
+
+
+def test_metric_columns_keep_the_types_of_the_values():
+    np = pytest.importorskip("numpy")
+    from sacred.metrics_logger import MetricsLogger
+
+    logger = MetricsLogger()
+    logger.log_scalar_metric("floats", 0.5)
+    logger.log_scalar_metric("floats", 1)
+    logger.log_scalar_metric("floats", True)
+    logger.log_scalar_metric("ints", 1)
+    logger.log_scalar_metric("ints", False)
+    logger.log_scalar_metric("ints", 2.0)
+    logger.log_scalar_metric_array("array", [1.5, 2.5])
+    logger.log_scalar_metric_array("array", [3, True])
+    logger.log_scalar_metric_array("array", np.array([4], dtype=np.int32))
+    logger.log_scalar_metric_array("array", np.array([False]))
+    metrics = logger.get_last_metrics_by_name()
+    expected = {
+        "floats": [(0.5, float), (1, int), (True, bool)],
+        "ints": [(1, int), (False, bool), (2.0, float)],
+        "array": [
+            (1.5, float),
+            (2.5, float),
+            (3, int),
+            (True, bool),
+            (4, int),
+            (False, bool),
+        ],
+    }
+    for name, values in expected.items():
+        assert [(v, type(v)) for v in metrics[name]["values"]] == values
+
+
+def test_log_scalars_with_run(ex):
+    messages = {}
+
+    @ex.main
+    def main_function(_run):
+        for i in range(5):
+            _run.log_scalars({"training.loss": i * 0.5, "training.accuracy": i})
+        ex.log_scalars({"training.loss": 10.0}, step=20)
+        messages["metrics"] = ex.current_run._metrics.get_last_metrics_by_name()
+
+    ex.run()
+    metrics = messages["metrics"]
+    assert metrics["training.loss"]["steps"] == [0, 1, 2, 3, 4, 20]
+    assert metrics["training.loss"]["values"] == [0.0, 0.5, 1.0, 1.5, 2.0, 10.0]
+    assert metrics["training.accuracy"]["steps"] == [0, 1, 2, 3, 4]
+    assert metrics["training.accuracy"]["values"] == [0, 1, 2, 3, 4]
+
+
+def test_log_scalar_array_with_run(ex):
+    np = pytest.importorskip("numpy")
+    messages = {}
+
+    @ex.main
+    def main_function(_run):
+        _run.log_scalar("training.loss", 1.5)
+        _run.log_scalar_array("training.loss", np.array([0.5, 0.25]))
+        ex.log_scalar_array(
+            "training.loss", np.array([3, 4], dtype=np.int32), np.array([10, 20])
+        )
+        _run.log_scalar("training.loss", 0.125)
+        _run.log_scalar_array("labels", np.array(["a", "b"]))
+        messages["metrics"] = ex.current_run._metrics.get_last_metrics_by_name()
+
+    ex.run()
+    loss = messages["metrics"]["training.loss"]
+    assert loss["steps"] == [0, 1, 2, 10, 20, 21]
+    assert loss["values"] == [1.5, 0.5, 0.25, 3, 4, 0.125]
+    # the values keep the type they were logged with
+    types = [float, float, float, int, int, float]
+    assert [type(v) for v in loss["values"]] == types
+    assert len(loss["timestamps"]) == 6
+    labels = messages["metrics"]["labels"]
+    assert labels["steps"] == [0, 1]
+    assert labels["values"] == ["a", "b"]
+
+
+def test_log_scalar_metric_array_falls_back_to_lists():
+    np = pytest.importorskip("numpy")
+    from sacred.metrics_logger import MetricsLogger
+
+    logger = MetricsLogger()
+    logger.log_scalar_metric_array("m", [1, 2])
+    logger.log_scalar_metric_array("m", np.array([2.5, 3.5]))
+    logger.log_scalar_metric_array("m", [])
+    metrics = logger.get_last_metrics_by_name()
+    assert metrics["m"]["values"] == [1, 2, 2.5, 3.5]
+    assert metrics["m"]["steps"] == [0, 1, 2, 3]
+
+
+def test_log_scalar_metric_array_checks_shapes():
+    from sacred.metrics_logger import MetricsLogger
+
+    logger = MetricsLogger()
+    with pytest.raises(ValueError):
+        logger.log_scalar_metric_array("m", [1, 2], steps=[1])
+
+
+class FakeTensor:
+    def __init__(self, value):
+        self.value = value
+        self.synced = False
+        self.detached = False
+
+    def detach(self):
+        self.detached = True
+        return self
+
+    def clone(self):
+        return self
+
+    def item(self):
+        self.synced = True
+        return self.value
+
+
+def test_deferred_conversion_of_tensor_like_values():
+    from sacred.metrics_logger import MetricsLogger
+
+    logger = MetricsLogger(defer_conversion=True)
+    tensors = [FakeTensor(i * 0.5) for i in range(3)]
+    logger.log_scalar_metric("training.loss", 1.0)
+    for t in tensors:
+        logger.log_scalar_metric("training.loss", t)
+    logger.log_scalar_metrics({"training.loss": FakeTensor(7.0), "other": 3})
+    assert not any(t.synced for t in tensors)
+    assert all(t.detached for t in tensors)
+
+    metrics = logger.get_last_metrics_by_name()
+    assert all(t.synced for t in tensors)
+    assert metrics["training.loss"]["values"] == [1.0, 0.0, 0.5, 1.0, 7.0]
+    assert metrics["training.loss"]["steps"] == [0, 1, 2, 3, 4]
+    assert metrics["other"]["values"] == [3]
+
+
+def test_deferred_conversion_stacks_arrays():
+    np = pytest.importorskip("numpy")
+    from sacred.metrics_logger import MetricsLogger
+
+    logger = MetricsLogger(defer_conversion=True)
+    for i in range(4):
+        logger.log_scalar_metric("training.loss", np.array(i * 2.0))
+    metrics = logger.get_last_metrics_by_name()
+    assert metrics["training.loss"]["values"] == [0.0, 2.0, 4.0, 6.0]
+    assert all(type(v) is float for v in metrics["training.loss"]["values"])
+
+
+def test_deferred_conversion_copies_arrays():
+    np = pytest.importorskip("numpy")
+    from sacred.metrics_logger import MetricsLogger
+
+    logger = MetricsLogger(defer_conversion=True)
+    total = np.array(0.0)
+    for _ in range(3):
+        total += 1.0
+        logger.log_scalar_metric("training.loss", total)
+    metrics = logger.get_last_metrics_by_name()
+    assert metrics["training.loss"]["values"] == [1.0, 2.0, 3.0]
+
+
+def test_max_buffered_bytes_counts_deferred_tensors():
+    from sacred.metrics_logger import MetricsLogger
+
+    class LargeTensor(FakeTensor):
+        nbytes = 900
+
+    logger = MetricsLogger(defer_conversion=True, max_buffered_bytes=4096)
+    flushes = []
+    logger.on_max_buffered = lambda: flushes.append(True)
+    # only a few measurements, but each of them holds a large tensor
+    for i in range(4):
+        logger.log_scalar_metric("training.loss", LargeTensor(i))
+    assert not flushes
+    logger.log_scalar_metrics({"training.loss": LargeTensor(4), "other": 1.0})
+    assert len(flushes) == 1
+
+    logger.get_last_metrics_by_name()
+    logger.log_scalar_metric("training.loss", LargeTensor(5))
+    assert len(flushes) == 1
+
+
+def test_no_deferred_conversion_by_default():
+    from sacred.metrics_logger import MetricsLogger
+
+    logger = MetricsLogger()
+    tensor = FakeTensor(1.0)
+    logger.log_scalar_metric("training.loss", tensor)
+    assert not tensor.detached
+    assert logger.get_last_metrics_by_name()["training.loss"]["values"] == [tensor]
+
+
+def test_keep_every_nth_policy_counts_over_reads():
+    from sacred.metrics_logger import MetricsLogger, KeepEveryNth
+
+    logger = MetricsLogger(policies={"training": KeepEveryNth(3)})
+    for i in range(5):
+        logger.log_scalar_metric("training.loss", float(i))
+        logger.log_scalar_metric("validation.loss", float(i))
+    metrics = logger.get_last_metrics_by_name()
+    assert metrics["training.loss"]["steps"] == [0, 3]
+    assert metrics["training.loss"]["values"] == [0.0, 3.0]
+    assert len(metrics["training.loss"]["timestamps"]) == 2
+    assert metrics["validation.loss"]["steps"] == [0, 1, 2, 3, 4]
+
+    for i in range(5, 10):
+        logger.log_scalar_metric("training.loss", float(i))
+    metrics = logger.get_last_metrics_by_name()
+    assert metrics["training.loss"]["steps"] == [6, 9]
+
+
+def test_window_aggregate_policy():
+    from sacred.metrics_logger import MetricsLogger, WindowAggregate
+
+    logger = MetricsLogger(
+        policies={
+            "training": WindowAggregate(),
+            "training.acc": WindowAggregate("last", "count"),
+        }
+    )
+    logger.log_scalar_metric_array("training.loss", [4.0, 1.0, 2.0, 5.0])
+    logger.log_scalar_metric_array("training.acc", [0.1, 0.2, 0.3])
+    metrics = logger.get_last_metrics_by_name()
+    assert set(metrics) == {
+        "training.loss.min",
+        "training.loss.max",
+        "training.loss.mean",
+        "training.acc.last",
+        "training.acc.count",
+    }
+    assert metrics["training.loss.min"]["values"] == [1.0]
+    assert metrics["training.loss.max"]["values"] == [5.0]
+    assert metrics["training.loss.mean"]["values"] == [3.0]
+    assert metrics["training.loss.mean"]["steps"] == [3]
+    assert metrics["training.acc.last"]["values"] == [0.3]
+    assert metrics["training.acc.count"]["values"] == [3]
+
+    with pytest.raises(KeyError):
+        WindowAggregate("median")
+
+
+def test_aggregate_policies_reject_non_numeric_values():
+    from sacred.metrics_logger import MetricsLogger, WindowAggregate, Downsample
+
+    logger = MetricsLogger(
+        policies={
+            "training": WindowAggregate(),
+            "training.label": WindowAggregate("last"),
+            "validation": Downsample(10),
+        }
+    )
+    logger.log_scalar_metric("training.loss", 1.0)
+    with pytest.raises(TypeError, match="training.loss"):
+        logger.log_scalar_metric("training.loss", "nan")
+    with pytest.raises(TypeError):
+        logger.log_scalar_metrics({"training.acc": 0.5, "validation.loss": None})
+    with pytest.raises(TypeError):
+        logger.log_scalar_metric_array("validation.loss", [1.0, "a"])
+    logger.log_scalar_metric("training.label", "a")
+
+    # the rejected values are not buffered and nothing else is lost
+    metrics = logger.get_last_metrics_by_name()
+    assert set(metrics) == {
+        "training.loss.min",
+        "training.loss.max",
+        "training.loss.mean",
+        "training.label.last",
+    }
+    assert metrics["training.loss.mean"]["values"] == [1.0]
+    assert metrics["training.label.last"]["values"] == ["a"]
+
+
+def test_downsample_policy():
+    from sacred.metrics_logger import MetricsLogger, Downsample
+
+    logger = MetricsLogger(policies={"loss": Downsample(10)})
+    values = [0.0] * 1000
+    values[500] = 100.0
+    logger.log_scalar_metric_array("loss", values)
+    loss = logger.get_last_metrics_by_name()["loss"]
+    assert len(loss["steps"]) == 10
+    assert loss["steps"][0] == 0
+    assert loss["steps"][-1] == 999
+    # the peak survives downsampling
+    assert 500 in loss["steps"]
+    assert 100.0 in loss["values"]
+
+    logger.log_scalar_metric_array("loss", [1.0, 2.0])
+    assert logger.get_last_metrics_by_name()["loss"]["values"] == [1.0, 2.0]
+
+
+def test_metric_policies_with_experiment(ex):
+    from sacred.metrics_logger import KeepEveryNth
+
+    ex.metric_policies["training.loss"] = KeepEveryNth(2)
+    messages = {}
+
+    @ex.main
+    def main_function(_run):
+        for i in range(6):
+            _run.log_scalar("training.loss", i)
+        messages["metrics"] = ex.current_run._metrics.get_last_metrics_by_name()
+
+    ex.run()
+    assert messages["metrics"]["training.loss"]["values"] == [0, 2, 4]
+
+
+def test_metric_policies_are_not_shared_between_runs(ex):
+    from sacred.metrics_logger import KeepEveryNth
+
+    ex.metric_policies["training.loss"] = KeepEveryNth(3)
+    messages = []
+
+    @ex.main
+    def main_function(_run):
+        for i in range(5):
+            _run.log_scalar("training.loss", i)
+        messages.append(ex.current_run._metrics.get_last_metrics_by_name())
+
+    ex.run()
+    ex.run()
+    assert [m["training.loss"]["steps"] for m in messages] == [[0, 3], [0, 3]]
@@ -8,7 +8,7 @@ import pytest
 import json
 from pathlib import Path
 
-from sacred.observers.file_storage import FileStorageObserver
+from sacred.observers.file_storage import FileStorageObserver, read_metrics
 from sacred.metrics_logger import ScalarMetricLogEntry, linearize_metrics
 
 
@@ -173,6 +173,73 @@ def test_fs_observer_heartbeat_event_updates_run(dir_obs, sample_run):
     assert info == i
 
 
+def test_fs_observer_heartbeat_delta_event_appends_output(dir_obs, sample_run):
+    basedir, obs = dir_obs
+    _id = obs.started_event(**sample_run)
+    run_dir = basedir.join(_id)
+    info = {"my_info": [1, 2, 3], "nr": 7}
+    obs.heartbeat_delta_event(
+        info=info, captured_out="some öutput", offset=0, beat_time=T1, result=1
+    )
+    obs.heartbeat_delta_event(
+        info=info, captured_out="\nmore", offset=11, beat_time=T2, result=2
+    )
+    assert run_dir.join("cout.txt").read_text("utf-8") == "some öutput\nmore"
+
+    # the output after offset is replaced
+    obs.heartbeat_delta_event(
+        info=info, captured_out="input", offset=6, beat_time=T2, result=3
+    )
+    assert run_dir.join("cout.txt").read_text("utf-8") == "some öinput"
+    run = json.loads(run_dir.join("run.json").read())
+    assert run["heartbeat"] == T2.isoformat()
+    assert run["result"] == 3
+
+
+def test_fs_observer_heartbeat_delta_event_skips_unchanged_info(dir_obs, sample_run):
+    basedir, obs = dir_obs
+    _id = obs.started_event(**sample_run)
+    run_dir = basedir.join(_id)
+    obs.heartbeat_delta_event(
+        info={"nr": 7}, captured_out="", offset=0, beat_time=T1, result=1
+    )
+    run_dir.join("info.json").remove()
+    obs.heartbeat_delta_event(
+        info={"nr": 7},
+        captured_out="",
+        offset=0,
+        beat_time=T2,
+        result=1,
+        info_changed=[],
+        result_changed=False,
+    )
+    assert not run_dir.join("info.json").exists()
+    run = json.loads(run_dir.join("run.json").read())
+    assert run["heartbeat"] == T2.isoformat()
+
+
+def test_fs_observer_keeps_only_end_of_cout_in_memory(dir_obs, sample_run, monkeypatch):
+    monkeypatch.setattr("sacred.settings.SETTINGS.CAPTURE_MAX_MEMORY", 4)
+    basedir, obs = dir_obs
+    _id = obs.started_event(**sample_run)
+    run_dir = basedir.join(_id)
+    obs.heartbeat_delta_event(
+        info={}, captured_out="some öutput", offset=0, beat_time=T1, result=1
+    )
+    assert obs.cout == "tput"
+    # changes before the output kept in memory are read from disk
+    obs.heartbeat_delta_event(
+        info={}, captured_out="input", offset=6, beat_time=T2, result=2
+    )
+    assert run_dir.join("cout.txt").read_text("utf-8") == "some öinput"
+    obs.heartbeat_delta_event(
+        info={}, captured_out="s", offset=11, beat_time=T2, result=2
+    )
+    assert run_dir.join("cout.txt").read_text("utf-8") == "some öinputs"
+    assert obs.cout == "puts"
+    assert obs.read_cout() == "some öinputs"
+
+
 def test_fs_observer_heartbeat_event_multiple_updates_run(dir_obs, sample_run):
     basedir, obs = dir_obs
     _id = obs.started_event(**sample_run)
@@ -298,6 +365,54 @@ def test_fs_observer_resource_event_does_not_duplicate(dir_obs, sample_run, tmpf
     assert run["resources"][0] == [tmpfile.name, res_dir.listdir()[0].strpath]
 
 
+def test_log_metrics_jsonl(tmpdir, sample_run, logged_metrics):
+    basedir = tmpdir.join("file_storage")
+    obs = FileStorageObserver(basedir.strpath, metrics_format="jsonl")
+    sample_run["_id"] = None
+    _id = obs.started_event(**sample_run)
+    run_dir = basedir.join(str(_id))
+    info = {"my_info": [1, 2, 3], "nr": 7}
+
+    obs.log_metrics(linearize_metrics(logged_metrics[:6]), info)
+    obs.log_metrics({}, info)
+    assert not run_dir.join("metrics.json").exists()
+    assert len(run_dir.join("metrics.jsonl").readlines()) == 2
+    obs.log_metrics(linearize_metrics(logged_metrics[6:]), info)
+    assert len(run_dir.join("metrics.jsonl").readlines()) == 3
+
+    metrics = read_metrics(run_dir.strpath)
+    assert set(metrics) == {"training.loss", "training.accuracy"}
+    loss = metrics["training.loss"]
+    assert loss["steps"] == [10, 20, 30, 40, 50, 60]
+    assert loss["values"] == [1, 2, 3, 10, 20, 30]
+    assert loss["timestamps"] == [
+        m.timestamp.isoformat() for m in logged_metrics if m.name == "training.loss"
+    ]
+    assert metrics["training.accuracy"]["values"] == [100, 200, 300]
+
+    # a truncated last line (e.g. from a crash) is ignored
+    with open(run_dir.join("metrics.jsonl").strpath, "a") as f:
+        f.write('{"name": "training.loss", "steps": [70')
+    assert read_metrics(run_dir.strpath) == metrics
+
+
+def test_read_metrics_json(dir_obs, sample_run, logged_metrics):
+    basedir, obs = dir_obs
+    sample_run["_id"] = None
+    _id = obs.started_event(**sample_run)
+    run_dir = basedir.join(str(_id))
+    assert read_metrics(run_dir.strpath) == {}
+    obs.log_metrics(linearize_metrics(logged_metrics), {})
+    metrics = read_metrics(run_dir.strpath)
+    assert metrics == json.loads(run_dir.join("metrics.json").read())
+    assert metrics["training.loss"]["steps"] == [10, 20, 30, 40, 50, 60]
+
+
+def test_fs_observer_rejects_unknown_metrics_format(tmpdir):
+    with pytest.raises(ValueError):
+        FileStorageObserver(tmpdir.strpath, metrics_format="csv")
+
+
 def test_fs_observer_equality(dir_obs):
     basedir, obs = dir_obs
     obs2 = FileStorageObserver(obs.basedir)
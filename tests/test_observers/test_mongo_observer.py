@@ -25,7 +25,11 @@ enable_gridfs_integration()
 from .failing_mongo_mock import FailingMongoClient
 
 from sacred.dependencies import get_digest
-from sacred.observers.mongo import MongoObserver, force_bson_encodeable
+from sacred.observers.mongo import (
+    MongoObserver,
+    force_bson_encodeable,
+    read_metric_buckets,
+)
 
 T1 = datetime.datetime(1999, 5, 4, 3, 2, 1)
 T2 = datetime.datetime(1999, 5, 5, 5, 5, 5)
@@ -177,6 +181,133 @@ def test_mongo_observer_heartbeat_event_updates_run(mongo_obs, sample_run):
     assert db_run["captured_out"] == outp
 
 
+def test_mongo_observer_heartbeat_delta_event_appends_output(mongo_obs, sample_run):
+    mongo_obs.started_event(**sample_run)
+
+    info = {"my_info": [1, 2, 3], "$nr": 7}
+    mongo_obs.heartbeat_delta_event(
+        info=info, captured_out="some output", offset=0, beat_time=T1, result=1
+    )
+    with mock.patch.object(
+        mongo_obs.runs, "update_one", wraps=mongo_obs.runs.update_one
+    ) as update_one:
+        mongo_obs.heartbeat_delta_event(
+            info=info, captured_out=" and more", offset=11, beat_time=T2, result=2
+        )
+    # only the new output is sent to the database
+    assert "some output" not in str(update_one.call_args)
+
+    db_run = mongo_obs.runs.find_one()
+    assert db_run["captured_out"] == "some output and more"
+    assert db_run["heartbeat"] == T2
+    assert db_run["result"] == 2
+    assert db_run["info"] == info
+
+
+def test_mongo_observer_heartbeat_delta_event_rewrites_output(mongo_obs, sample_run):
+    mongo_obs.started_event(**sample_run)
+
+    info = {"my_info": [1, 2, 3], "$nr": 7}
+    mongo_obs.heartbeat_delta_event(
+        info=info, captured_out="some output", offset=0, beat_time=T1, result=1
+    )
+    # the output after offset is replaced
+    with mock.patch.object(
+        mongo_obs.runs, "update_one", wraps=mongo_obs.runs.update_one
+    ) as update_one:
+        mongo_obs.heartbeat_delta_event(
+            info=info, captured_out="less", offset=5, beat_time=T2, result=2
+        )
+    # written with a plain $set, which every server supports
+    assert "$set" in update_one.call_args[0][1]
+
+    db_run = mongo_obs.runs.find_one()
+    assert db_run["captured_out"] == "some less"
+    assert db_run["heartbeat"] == T2
+    assert db_run["result"] == 2
+
+
+def test_mongo_observer_appends_output_without_pipeline_updates(mongo_obs, sample_run):
+    mongo_obs.started_event(**sample_run)
+    mongo_obs.heartbeat_delta_event(
+        info={}, captured_out="some output", offset=0, beat_time=T1, result=1
+    )
+    update_one = mongo_obs.runs.update_one
+
+    def reject_pipelines(filter, update, *args, **kwargs):
+        if isinstance(update, list):
+            raise pymongo.errors.OperationFailure("pipelines are not supported")
+        return update_one(filter, update, *args, **kwargs)
+
+    with mock.patch.object(mongo_obs.runs, "update_one", reject_pipelines):
+        mongo_obs.heartbeat_delta_event(
+            info={}, captured_out=" and more", offset=11, beat_time=T2, result=2
+        )
+        mongo_obs.heartbeat_delta_event(
+            info={}, captured_out="!", offset=20, beat_time=T3, result=3
+        )
+
+    db_run = mongo_obs.runs.find_one()
+    assert db_run["captured_out"] == "some output and more!"
+    assert db_run["heartbeat"] == T3
+    assert db_run["result"] == 3
+
+
+def test_mongo_observer_stores_filtered_progress_output(mongo_obs):
+    from sacred import Experiment
+    from sacred.utils import apply_backspaces_and_linefeeds
+
+    ex = Experiment("progress")
+    ex.captured_out_filter = apply_backspaces_and_linefeeds
+    ex.observers = [mongo_obs]
+
+    @ex.main
+    def print_progress(_run):
+        for i in range(30):
+            print("step {}".format(i), end="\r" if i % 10 else "\n")
+            _run._emit_heartbeat()
+
+    run = ex.run(options={"--loglevel": "CRITICAL", "--capture": "sys"})
+    assert mongo_obs not in run._failed_observers
+    db_run = mongo_obs.runs.find_one()
+    assert db_run["captured_out"] == run.captured_out
+    assert db_run["status"] == "COMPLETED"
+
+
+def test_mongo_observer_heartbeat_delta_event_updates_changed_fields(
+    mongo_obs, sample_run
+):
+    mongo_obs.started_event(**sample_run)
+    info = {"a": [1, 2, 3], "b": 7}
+    mongo_obs.heartbeat_delta_event(
+        info=info, captured_out="", offset=0, beat_time=T1, result=1
+    )
+    del info["b"]
+    info["c"] = "new"
+    with mock.patch.object(
+        mongo_obs.runs, "update_one", wraps=mongo_obs.runs.update_one
+    ) as update_one:
+        mongo_obs.heartbeat_delta_event(
+            info=info,
+            captured_out="",
+            offset=0,
+            beat_time=T2,
+            result=1,
+            info_changed=["c", "b"],
+            result_changed=False,
+        )
+    update = update_one.call_args[0][1]
+    assert update == {
+        "$set": {"heartbeat": T2, "info.c": "new"},
+        "$unset": {"info.b": ""},
+    }
+
+    db_run = mongo_obs.runs.find_one()
+    assert db_run["heartbeat"] == T2
+    assert db_run["result"] == 1
+    assert db_run["info"] == info
+
+
 def test_mongo_observer_fails(failing_mongo_observer, sample_run):
     failing_mongo_observer.started_event(**sample_run)
 
@@ -431,6 +562,124 @@ def test_log_metrics(mongo_obs, sample_run, logged_metrics):
     assert mongo_obs.metrics.count_documents({}) == 4
 
 
+def test_log_metrics_uses_single_bulk_write(mongo_obs, sample_run, logged_metrics):
+    mongo_obs.started_event(**sample_run)
+    metrics = mongo_obs.metrics
+    with mock.patch.object(metrics, "bulk_write", wraps=metrics.bulk_write) as bulk:
+        with mock.patch.object(metrics, "update_one") as update_one:
+            mongo_obs.log_metrics(linearize_metrics(logged_metrics), {})
+    assert bulk.call_count == 1
+    assert len(bulk.call_args[0][0]) == 2
+    assert bulk.call_args[1] == {"ordered": False}
+    assert update_one.call_count == 0
+
+
+def test_log_metrics_bucketed(sample_run, logged_metrics):
+    db = mongomock.MongoClient().db
+    mongo_obs = MongoObserver.create_from(
+        db.runs,
+        gridfs.GridFS(db),
+        metrics_collection=db.metrics,
+        metrics_layout="bucketed",
+        metrics_bucket_size=2,
+    )
+    mongo_obs.started_event(**sample_run)
+    info = {}
+    mongo_obs.log_metrics(linearize_metrics(logged_metrics[:6]), info)
+    mongo_obs.log_metrics(linearize_metrics(logged_metrics[6:]), info)
+
+    # 6 measurements of training.loss and 3 of training.accuracy
+    assert mongo_obs.metrics.count_documents({"name": "training.loss"}) == 3
+    assert mongo_obs.metrics.count_documents({"name": "training.accuracy"}) == 2
+    buckets = list(
+        mongo_obs.metrics.find({"name": "training.loss"}, sort=[("bucket", 1)])
+    )
+    assert [b["bucket"] for b in buckets] == [0, 1, 2]
+    assert [b["count"] for b in buckets] == [2, 2, 2]
+    assert [b["steps"] for b in buckets] == [[10, 20], [30, 40], [50, 60]]
+    assert [(b["min"], b["max"]) for b in buckets] == [(1, 2), (3, 10), (20, 30)]
+    assert [(b["first_step"], b["last_step"]) for b in buckets] == [
+        (10, 20),
+        (30, 40),
+        (50, 60),
+    ]
+    # only the first bucket of each metric is referenced in the info dict
+    assert {m["name"] for m in info["metrics"]} == {
+        "training.loss",
+        "training.accuracy",
+    }
+    assert {"name": "training.loss", "id": str(buckets[0]["_id"])} in info["metrics"]
+
+    loss = read_metric_buckets(mongo_obs.metrics, sample_run["_id"], "training.loss")
+    assert loss["steps"] == [10, 20, 30, 40, 50, 60]
+    assert loss["values"] == [1, 2, 3, 10, 20, 30]
+    loss = read_metric_buckets(
+        mongo_obs.metrics, sample_run["_id"], "training.loss", min_step=25, max_step=50
+    )
+    assert loss["steps"] == [30, 40, 50]
+    assert loss["values"] == [3, 10, 20]
+
+
+def test_log_metrics_bucketed_without_queries_for_new_runs(sample_run, logged_metrics):
+    db = mongomock.MongoClient().db
+    mongo_obs = MongoObserver.create_from(
+        db.runs,
+        gridfs.GridFS(db),
+        metrics_collection=db.metrics,
+        metrics_layout="bucketed",
+    )
+    mongo_obs.started_event(**sample_run)
+    metrics = mongo_obs.metrics
+    with mock.patch.object(metrics, "find", wraps=metrics.find) as find:
+        with mock.patch.object(metrics, "find_one", wraps=metrics.find_one) as find_one:
+            mongo_obs.log_metrics(linearize_metrics(logged_metrics), {})
+    assert not find.called
+    assert not find_one.called
+
+
+def test_log_metrics_bucketed_continues_overwritten_run(sample_run):
+    db = mongomock.MongoClient().db
+
+    def log_loss(mongo_obs, steps):
+        mongo_obs.log_metrics(
+            {
+                "loss": {
+                    "steps": steps,
+                    "values": [float(s) for s in steps],
+                    "timestamps": [T1] * len(steps),
+                }
+            },
+            {},
+        )
+
+    sample_run["_id"] = 1
+    kwargs = dict(metrics_collection=db.metrics, metrics_layout="bucketed")
+    mongo_obs = MongoObserver.create_from(
+        db.runs, gridfs.GridFS(db), metrics_bucket_size=2, **kwargs
+    )
+    mongo_obs.started_event(**sample_run)
+    log_loss(mongo_obs, [0, 1, 2])
+
+    mongo_obs = MongoObserver.create_from(
+        db.runs, gridfs.GridFS(db), overwrite=1, metrics_bucket_size=2, **kwargs
+    )
+    mongo_obs.started_event(**sample_run)
+    log_loss(mongo_obs, [3, 4])
+    buckets = list(db.metrics.find({"name": "loss"}, sort=[("bucket", 1)]))
+    assert [b["steps"] for b in buckets] == [[0, 1], [2, 3], [4]]
+
+
+def test_mongo_observer_rejects_unknown_metrics_layout():
+    db = mongomock.MongoClient().db
+    with pytest.raises(ValueError):
+        MongoObserver.create_from(
+            db.runs,
+            gridfs.GridFS(db),
+            metrics_collection=db.metrics,
+            metrics_layout="x",
+        )
+
+
 def test_mongo_observer_artifact_event_content_type_added(mongo_obs, sample_run):
     """Test that the detected content_type is added to other metadata."""
     mongo_obs.started_event(**sample_run)
@@ -503,3 +752,10 @@ def test_mongo_observer_created_with_collection(mongo_obs_with_collection):
     metrics_collection = mongo_obs_with_collection.metrics
     assert runs_collection.name == "my_collection"
     assert metrics_collection.name == "metrics"
+
+
+def test_mimetype_detector_is_loaded_lazily():
+    import sacred.observers.mongo as mongo
+
+    assert mongo.mimetype_detector is mongo.get_mimetype_detector()
+    assert mongo.mimetype_detector.guess_type("image.png")[0] == "image/png"
@@ -277,6 +277,24 @@ def test_log_metrics(mongo_obs, sample_run, logged_metrics):
     assert mongo_obs.metrics.count_documents({}) == 4
 
 
+def test_log_metrics_uses_one_bulk_write_per_heartbeat(
+    mongo_obs, sample_run, logged_metrics
+):
+    mongo_obs.started_event(**sample_run)
+    metrics = mongo_obs.metrics
+    info = {}
+    with mock.patch.object(metrics, "bulk_write", wraps=metrics.bulk_write) as bulk:
+        mongo_obs.log_metrics(linearize_metrics(logged_metrics), info)
+        mongo_obs.join()
+    # the ReconnectingMongoClient fails some calls, which are then retried
+    assert all(len(c[0][0]) == 2 for c in bulk.call_args_list)
+    assert metrics.count_documents({}) == 2
+    assert {m["name"] for m in info["metrics"]} == {
+        "training.loss",
+        "training.accuracy",
+    }
+
+
 def test_mongo_observer_artifact_event_content_type_added(mongo_obs, sample_run):
     """Test that the detected content_type is added to other metadata."""
     mongo_obs.started_event(**sample_run)
@@ -328,3 +346,25 @@ def test_mongo_observer_artifact_event_metadata(mongo_obs, sample_run):
 
     db_run = mongo_obs.runs.find_one()
     assert db_run["artifacts"]
+
+
+def test_queued_mongo_observer_stores_metrics_info_of_short_run(monkeypatch):
+    from sacred import Experiment
+
+    client = mongomock.MongoClient()
+    fs = gridfs.GridFS(client.sacred)
+    monkeypatch.setattr(pymongo, "MongoClient", lambda *args, **kwargs: client)
+    monkeypatch.setattr(gridfs, "GridFS", lambda _: fs)
+    mongo_obs = QueuedMongoObserver(interval=0.01, retry_interval=0.01)
+
+    ex = Experiment("short", save_git_info=False)
+    ex.observers.append(mongo_obs)
+
+    @ex.main
+    def main(_run):
+        _run.log_scalar("loss", 1.0)
+
+    ex.run()
+    db_run = mongo_obs.runs.find_one()
+    metric = mongo_obs.metrics.find_one()
+    assert db_run["info"] == {"metrics": [{"name": "loss", "id": str(metric["_id"])}]}
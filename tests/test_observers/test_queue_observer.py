@@ -108,3 +108,18 @@ def test_run_waits_for_running_queue_observer_after_failure():
         queue_observer_with_long_interval._covered_observer.method_calls[-1][0]
         == "failed_event"
     )
+
+
+def test_failed_events_are_retried(queue_observer):
+    queue_observer.started_event()
+    covered = queue_observer._covered_observer
+    covered.heartbeat_event.side_effect = [Exception("no connection"), None]
+    queue_observer.heartbeat_event("args")
+    queue_observer.resource_event("args")
+    queue_observer.join()
+    assert [c[0] for c in covered.method_calls] == [
+        "started_event",
+        "heartbeat_event",
+        "heartbeat_event",
+        "resource_event",
+    ]
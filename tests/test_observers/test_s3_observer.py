@@ -145,6 +145,17 @@ def test_completed_event_updates_run_json(observer, sample_run):
     assert run["status"] == "COMPLETED"
 
 
+@moto.mock_aws
+def test_final_heartbeat_uploads_complete_cout(observer, sample_run):
+    observer.started_event(**sample_run)
+    key = s3_join(observer.dir, "cout.txt")
+    observer.heartbeat_delta_event({}, "line 0\n", 0, T1, None)
+    observer.heartbeat_delta_event({}, "line 1\n", 7, T1, None)
+    assert _get_file_data(bucket_name=BUCKET, key=key) == b"line 1\n"
+    observer.heartbeat_event({}, "line 0\nline 1\n", T2, None)
+    assert _get_file_data(bucket_name=BUCKET, key=key) == b"line 0\nline 1\n"
+
+
 @moto.mock_aws
 def test_interrupted_event_updates_run_json(observer, sample_run):
     observer.started_event(**sample_run)
@@ -143,6 +143,31 @@ def test_sql_observer_heartbeat_event_updates_run(sql_obs, sample_run, session):
     assert db_run.captured_out == outp
 
 
+def test_sql_observer_heartbeat_delta_event_appends_output(
+    sql_obs, sample_run, session
+):
+    sql_obs.started_event(**sample_run)
+
+    info = {"my_info": [1, 2, 3], "nr": 7}
+    sql_obs.heartbeat_delta_event(
+        info=info, captured_out="some output", offset=0, beat_time=T1, result=1
+    )
+    sql_obs.heartbeat_delta_event(
+        info=info, captured_out=" and more", offset=11, beat_time=T2, result=2
+    )
+    db_run = session.query(Run).first()
+    assert db_run.captured_out == "some output and more"
+
+    # the output after offset is replaced
+    sql_obs.heartbeat_delta_event(
+        info=info, captured_out="less", offset=5, beat_time=T2, result=2
+    )
+    db_run = session.query(Run).first()
+    assert db_run.captured_out == "some less"
+    assert db_run.heartbeat == T2
+    assert db_run.result == 2
+
+
 def test_sql_observer_queued_event(sql_obs, sample_run, session):
     sample_run["queue_time"] = sample_run.pop("start_time")
     sql_obs.queued_event(**sample_run)
@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 # coding=utf-8
 
+import subprocess
+import sys
+
 import pytest
 from sacred.optional import optional_import, get_tensorflow, modules_exist
 
@@ -27,3 +30,39 @@ def test_module_exists_for_tensorflow():
     """Check that module_exist returns true if tf is there."""
     pytest.importorskip("tensorflow")
     assert modules_exist("tensorflow")
+
+
+def test_lazy_optional_imports():
+    import sacred.optional as opt
+
+    if not opt.has_numpy:
+        pytest.skip("numpy is not installed")
+    import numpy
+
+    assert opt.np is numpy
+
+
+def test_import_sacred_does_not_import_heavy_modules():
+    """Regression test for the time it takes to import sacred."""
+    heavy_modules = [
+        "numpy",
+        "pandas",
+        "jsonpickle",
+        "pkg_resources",
+        "docopt",
+        "cpuinfo",
+        "ctypes.util",
+        "git",
+        "pymongo",
+        "sqlalchemy",
+        "tinydb",
+    ]
+    code = "import sys, sacred; print(' '.join(sorted(sys.modules)))"
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        stdout=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    ).stdout
+    imported = set(output.split())
+    assert [m for m in heavy_modules if m in imported] == []
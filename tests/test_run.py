@@ -6,6 +6,8 @@ import mock
 import os
 import pytest
 import tempfile
+import threading
+import time
 import sys
 
 from sacred.run import Run
@@ -137,7 +139,10 @@ def test_run_artifact_event(run):
     name = "foobar"
     metadata = {"testkey": 42}
     content_type = "text/plain"
-    run.add_artifact(f_name, name=name, metadata=metadata, content_type=content_type)
+    future = run.add_artifact(
+        f_name, name=name, metadata=metadata, content_type=content_type
+    )
+    assert future.done()
     observer.artifact_event.assert_called_with(
         filename=f_name, name=name, metadata=metadata, content_type=content_type
     )
@@ -145,6 +150,79 @@ def test_run_artifact_event(run):
     os.remove(f_name)
 
 
+def test_run_artifact_event_in_background(run, monkeypatch):
+    monkeypatch.setattr("sacred.settings.SETTINGS.OBSERVERS.DISPATCH", "parallel")
+    observer = run.observers[0]
+    upload_started = threading.Event()
+    finish_upload = threading.Event()
+
+    def upload(**kwargs):
+        upload_started.set()
+        finish_upload.wait(5)
+
+    observer.artifact_event.side_effect = upload
+    handle, f_name = tempfile.mkstemp()
+
+    def main():
+        future = run.add_artifact(f_name, name="foobar")
+        assert upload_started.wait(5)
+        # the upload is still running in the background
+        assert not future.done()
+        finish_upload.set()
+        future.result(timeout=5)
+
+    run.main_function.side_effect = main
+    run()
+    names = [c[0] for c in observer.method_calls]
+    assert names.index("artifact_event") < names.index("completed_event")
+    os.close(handle)
+    os.remove(f_name)
+
+
+def test_run_artifact_event_in_background_stores_copy(run, monkeypatch):
+    monkeypatch.setattr("sacred.settings.SETTINGS.OBSERVERS.DISPATCH", "parallel")
+    observer = run.observers[0]
+    finish_upload = threading.Event()
+    uploaded = []
+
+    def upload(filename, **kwargs):
+        finish_upload.wait(5)
+        with open(filename) as f:
+            uploaded.append((os.path.basename(filename), f.read()))
+
+    observer.artifact_event.side_effect = upload
+    tmpdir = tempfile.mkdtemp()
+    f_name = os.path.join(tmpdir, "model.pt")
+
+    def main():
+        for epoch in range(2):
+            with open(f_name, "w") as f:
+                f.write("epoch {}".format(epoch))
+            run.add_artifact(f_name)
+        os.remove(f_name)
+        finish_upload.set()
+
+    run.main_function.side_effect = main
+    run()
+    assert uploaded == [("model.pt", "epoch 0"), ("model.pt", "epoch 1")]
+    # the copies are removed at the end of the run
+    stored = observer.artifact_event.call_args[1]["filename"]
+    assert not os.path.exists(stored)
+    os.rmdir(tmpdir)
+
+
+def test_clone_or_copy_file_falls_back_to_copy(tmp_path):
+    from sacred.run import _clone_or_copy_file
+
+    src, dst = tmp_path / "model.pt", tmp_path / "copy.pt"
+    src.write_text("weights")
+    with mock.patch("fcntl.ioctl", side_effect=OSError):
+        _clone_or_copy_file(str(src), str(dst))
+    assert dst.read_text() == "weights"
+    _clone_or_copy_file(str(src), str(tmp_path / "clone.pt"))
+    assert (tmp_path / "clone.pt").read_text() == "weights"
+
+
 def test_run_resource_event(run):
     observer = run.observers[0]
     handle, f_name = tempfile.mkstemp()
@@ -280,3 +358,236 @@ def test_captured_out_filter(run, capsys):
         run()
         sys.stdout.flush()
     assert run.captured_out == "progress 9"
+
+
+def test_heartbeat_sends_captured_out_delta(run, capsys):
+    observer = mock.Mock(priority=10, incremental_captured_out=True)
+    run.observers = [observer]
+
+    def print_mock_progress():
+        sys.stdout.write("progress 0")
+        sys.stdout.flush()
+        run._emit_heartbeat()
+        sys.stdout.write("\b1 done")
+        sys.stdout.flush()
+
+    run.captured_out_filter = apply_backspaces_and_linefeeds
+    run.main_function.side_effect = print_mock_progress
+    run.capture_mode = "sys"
+    with capsys.disabled():
+        run()
+    assert not observer.heartbeat_event.called
+    deltas = [
+        (kwargs["offset"], kwargs["captured_out"])
+        for _, kwargs in observer.heartbeat_delta_event.call_args_list
+    ]
+    assert deltas == [(0, "progress 0"), (9, "1 done")]
+
+
+def test_heartbeat_reports_changes(run):
+    observer = mock.Mock(priority=10, incremental_captured_out=True)
+    run.observers = [observer]
+
+    def update_info():
+        run.info["a"] = 1
+        run.info["b"] = [1]
+        run._emit_heartbeat()
+        run._emit_heartbeat()
+        run.info["b"].append(2)
+        del run.info["a"]
+        run.result = 3
+        run._emit_heartbeat()
+
+    run.main_function.side_effect = update_info
+    run()
+    changes = [
+        (kwargs["info_changed"], kwargs["result_changed"])
+        for _, kwargs in observer.heartbeat_delta_event.call_args_list
+    ]
+    assert changes[:3] == [(["a", "b"], True), ([], False), (["b", "a"], True)]
+
+
+def test_captured_out_is_spilled_to_disk(run, capsys, monkeypatch):
+    monkeypatch.setattr("sacred.settings.SETTINGS.CAPTURE_MAX_MEMORY", 5)
+    observer = mock.Mock(priority=10, incremental_captured_out=True)
+    legacy_observer = mock.Mock(priority=5)
+    run.observers = [observer, legacy_observer]
+
+    def print_mock_progress():
+        for i in range(3):
+            sys.stdout.write("line {}\n".format(i))
+            sys.stdout.flush()
+            run._emit_heartbeat()
+            assert len(run.captured_out) <= 5
+
+    run.main_function.side_effect = print_mock_progress
+    run.capture_mode = "sys"
+    with capsys.disabled():
+        run()
+    assert run.captured_out == "ne 2\n"
+    assert run._read_captured_output() == "line 0\nline 1\nline 2\n"
+    deltas = [
+        (kwargs["offset"], kwargs["captured_out"])
+        for _, kwargs in observer.heartbeat_delta_event.call_args_list
+    ]
+    assert deltas == [(0, "line 0\n"), (7, "line 1\n"), (14, "line 2\n"), (21, "")]
+    _, kwargs = legacy_observer.heartbeat_event.call_args
+    assert kwargs["captured_out"] == "line 0\nline 1\nline 2\n"
+
+
+def test_final_heartbeat_sends_complete_captured_out(run, capsys, monkeypatch):
+    monkeypatch.setattr("sacred.settings.SETTINGS.CAPTURE_MAX_MEMORY", 5)
+    observer = mock.Mock(
+        priority=10, incremental_captured_out=True, complete_captured_out_at_end=True
+    )
+    run.observers = [observer]
+
+    def print_mock_progress():
+        for i in range(3):
+            sys.stdout.write("line {}\n".format(i))
+            sys.stdout.flush()
+            run._emit_heartbeat()
+
+    run.main_function.side_effect = print_mock_progress
+    run.capture_mode = "sys"
+    with capsys.disabled():
+        run()
+    deltas = [
+        kwargs["captured_out"]
+        for _, kwargs in observer.heartbeat_delta_event.call_args_list
+    ]
+    assert deltas == ["line 0\n", "line 1\n", "line 2\n"]
+    _, kwargs = observer.heartbeat_event.call_args
+    assert kwargs["captured_out"] == "line 0\nline 1\nline 2\n"
+
+
+def test_parallel_observer_dispatch(run, monkeypatch):
+    monkeypatch.setattr("sacred.settings.SETTINGS.OBSERVERS.DISPATCH", "parallel")
+    fast_observer_done = threading.Event()
+    slow_observer = mock.Mock(priority=10)
+    slow_observer.heartbeat_event.side_effect = lambda **kwargs: (
+        fast_observer_done.wait(5)
+    )
+    fast_observer = mock.Mock(priority=5)
+    fast_observer.completed_event.side_effect = lambda **kwargs: (
+        fast_observer_done.set()
+    )
+    failing_observer = mock.Mock(priority=1)
+    failing_observer.heartbeat_event.side_effect = TypeError
+    run.observers = [slow_observer, fast_observer, failing_observer]
+
+    run()
+
+    # the fast observer did not have to wait for the slow one
+    assert fast_observer_done.is_set()
+    for observer in [slow_observer, fast_observer]:
+        names = [c[0] for c in observer.method_calls]
+        assert names[0] == "started_event"
+        assert names[-1] == "join"
+    assert [c[0] for c in slow_observer.method_calls][-3:] == [
+        "heartbeat_event",
+        "completed_event",
+        "join",
+    ]
+    assert run._failed_observers == [failing_observer]
+    assert not failing_observer.join.called
+
+
+def test_observer_heartbeat_interval(run):
+    observer = mock.Mock(priority=10, heartbeat_interval=None)
+    slow_observer = mock.Mock(priority=5, heartbeat_interval=3600)
+    run.observers = [observer, slow_observer]
+
+    def log_and_beat():
+        for i in range(3):
+            run.log_scalar("loss", i)
+            run._emit_heartbeat()
+
+    run.main_function.side_effect = log_and_beat
+    run()
+    assert observer.heartbeat_event.call_count == 4
+    # the first heartbeat and the final one when the run stops
+    assert slow_observer.heartbeat_event.call_count == 2
+    slow_steps = [
+        kwargs["metrics_by_name"]["loss"]["steps"]
+        for _, kwargs in slow_observer.log_metrics.call_args_list
+    ]
+    assert slow_steps == [[0], [1, 2]]
+    steps = [
+        kwargs["metrics_by_name"]["loss"]["steps"]
+        for _, kwargs in observer.log_metrics.call_args_list
+        if kwargs["metrics_by_name"]
+    ]
+    assert steps == [[0], [1], [2]]
+
+
+def test_observer_beat_accumulates_metrics_in_place():
+    from sacred.run import _ObserverBeat
+
+    beat = _ObserverBeat(3600)
+    shared = [
+        {"loss": {"name": "loss", "steps": [i], "values": [i], "timestamps": [i]}}
+        for i in range(3)
+    ]
+    beat.add_metrics(shared[0])
+    steps = beat.metrics["loss"]["steps"]
+    for metrics_by_name in shared[1:]:
+        beat.add_metrics(metrics_by_name)
+    # the lists of the beat are extended instead of being rebuilt
+    assert beat.metrics["loss"]["steps"] is steps
+    assert steps == [0, 1, 2]
+    # and the metrics shared with other observers stay unchanged
+    assert [m["loss"]["steps"] for m in shared] == [[0], [1], [2]]
+
+
+def test_delayed_metrics_are_delivered_before_info_changes(run):
+    observer = mock.Mock(
+        priority=10, heartbeat_interval=3600, incremental_captured_out=True
+    )
+
+    def log_metrics(metrics_by_name, info):
+        info["metrics"] = list(metrics_by_name)
+
+    observer.log_metrics.side_effect = log_metrics
+    run.observers = [observer]
+    run.main_function.side_effect = lambda: run.log_scalar("loss", 1.0)
+    run()
+    _, kwargs = observer.heartbeat_delta_event.call_args
+    assert kwargs["info"] == {"metrics": ["loss"]}
+    assert "metrics" in kwargs["info_changed"]
+
+
+def test_run_flushes_metrics_when_buffer_is_full(run):
+    observer = run.observers[0]
+    run.beat_interval = 60.0
+    run._metrics.max_buffered = 10
+
+    def wait_for_flushes(count):
+        for _ in range(500):
+            if observer.log_metrics.call_count >= count:
+                return
+            time.sleep(0.01)
+
+    def log_many_scalars():
+        for i in range(10):
+            run.log_scalar("training.loss", i)
+        wait_for_flushes(1)
+        for i in range(10, 20):
+            run.log_scalar("training.loss", i)
+        wait_for_flushes(2)
+        for i in range(20, 25):
+            run.log_scalar("training.loss", i)
+
+    run.main_function.side_effect = log_many_scalars
+    run()
+    metrics_calls = observer.log_metrics.call_args_list
+    # two early flushes and a final one, but only the final heartbeat
+    assert len(metrics_calls) == 3
+    assert observer.heartbeat_event.call_count == 1
+    steps = [
+        step
+        for _, kwargs in metrics_calls
+        for metric in kwargs["metrics_by_name"].values()
+        for step in metric["steps"]
+    ]
+    assert steps == list(range(25))
@@ -26,3 +26,19 @@ def test_access_valid_setting():
     SETTINGS = copy.deepcopy(DEFAULT_SETTINGS)
     SETTINGS.CONFIG.READ_ONLY_CONFIG = True
     assert SETTINGS.CONFIG.READ_ONLY_CONFIG
+
+
+def test_cache_dir_respects_xdg_cache_home(tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    env = dict(os.environ, XDG_CACHE_HOME=str(tmp_path))
+    output = subprocess.run(
+        [sys.executable, "-c", "import sacred; print(sacred.SETTINGS.CACHE_DIR)"],
+        stdout=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+        env=env,
+    ).stdout
+    assert output.strip() == str(tmp_path / "sacred")
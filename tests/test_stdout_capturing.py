@@ -2,9 +2,11 @@
 # coding=utf-8
 
 import os
+import subprocess
 import sys
+import textwrap
 import pytest
-from sacred.stdout_capturing import get_stdcapturer
+from sacred.stdout_capturing import get_stdcapturer, ProgressFilter
 from sacred.optional import libc
 
 
@@ -26,8 +28,63 @@ def test_python_tee_output(capsys):
         assert set(output.strip().split("\n")) == expected_lines
 
 
+def test_python_tee_output_spills_to_disk(capsys, monkeypatch):
+    monkeypatch.setattr("sacred.settings.SETTINGS.CAPTURE_MAX_MEMORY", 10)
+
+    capture_mode, capture_stdout = get_stdcapturer("sys")
+    with capsys.disabled():
+        with capture_stdout() as out:
+            print("captured ä")
+            first = out.get()
+            print("captured stdout")
+            assert out.buffer._rolled
+        output = first + out.get()
+
+    assert output == "captured ä\ncaptured stdout\n"
+
+
+def test_python_tee_output_collapses_progress(capsys, monkeypatch):
+    monkeypatch.setattr("sacred.settings.SETTINGS.CAPTURE_COLLAPSE_PROGRESS", True)
+
+    capture_mode, capture_stdout = get_stdcapturer("sys")
+    with capsys.disabled():
+        with capture_stdout() as out:
+            for i in range(100):
+                sys.stdout.write("\r{}%".format(i))
+            print()
+            print("done")
+        output = out.get()
+
+    assert output == "99%\ndone\n"
+
+
+def test_progress_filter():
+    progress = ProgressFilter()
+    assert progress.write("a\n10%\r") == "a\n"
+    # the unfinished line is only stored at the second read
+    assert progress.flush() == ""
+    assert progress.write("20%\r") == ""
+    assert progress.flush() == "20%"
+    assert progress.write("30%\r40%") == ""
+    assert progress.flush() == "\r40%"
+    assert progress.flush() == ""
+    assert progress.write("\n") == "\r40%\n"
+    assert progress.flush(final=True) == ""
+
+
+def test_progress_filter_rate_limit():
+    progress = ProgressFilter(min_interval=60)
+    text = "".join("step {} loss {}\n".format(i, i / 10) for i in range(100))
+    assert progress.write(text) == "step 0 loss 0.0\n"
+    assert progress.write("done\n") == "step 99 loss 9.9\ndone\n"
+    assert progress.write("step 100 loss 10.0\n") == "step 100 loss 10.0\n"
+    assert progress.write("step 101 loss 10.1\n") == ""
+    assert progress.flush() == "step 101 loss 10.1\n"
+
+
 @pytest.mark.skipif(sys.platform.startswith("win"), reason="does not run on windows")
-def test_fd_tee_output(capsys):
+@pytest.mark.parametrize("mode", ["fd", "pipe"])
+def test_fd_tee_output(capsys, mode):
     expected_lines = {
         "captured stdout",
         "captured stderr",
@@ -36,7 +93,7 @@ def test_fd_tee_output(capsys):
         "keep\rcarriage\rreturns",
     }
 
-    capture_mode, capture_stdout = get_stdcapturer("fd")
+    capture_mode, capture_stdout = get_stdcapturer(mode)
     output = ""
     with capsys.disabled():
         print("before (stdout)")
@@ -57,3 +114,42 @@ def test_fd_tee_output(capsys):
         print("after (stderr)")
 
         assert set(output.strip().split("\n")) == expected_lines
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="does not run on windows")
+def test_pipe_tee_output_splits_multibyte_characters(capsys):
+    capture_mode, capture_stdout = get_stdcapturer("pipe")
+    with capsys.disabled():
+        with capture_stdout() as out:
+            data = "ä".encode("utf-8")
+            os.write(1, data[:1])
+            first = out.get()
+            os.write(1, data[1:] + b"\n")
+        output = first + out.get()
+    assert output == "ä\n"
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="does not run on windows")
+def test_pipe_tee_output_with_large_output_from_c_holding_the_gil():
+    # a pipe would fill up while the readers wait for the GIL
+    script = textwrap.dedent(
+        """
+        import ctypes, ctypes.util, sys
+        from sacred.stdout_capturing import get_stdcapturer
+
+        libc = ctypes.PyDLL(ctypes.util.find_library("c"))
+        data = b"x" * 199999 + b"\\n"
+        with get_stdcapturer("pipe")[1]() as out:
+            libc.write(1, data, len(data))
+        print(len(out.get()), file=sys.stderr)
+        """
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        timeout=30,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    assert result.returncode == 0, result.stderr
+    assert len(result.stdout) == 200000
+    assert result.stderr == b"200000\n"
@@ -1,6 +1,11 @@
 #!/usr/bin/env python
 # coding=utf-8
 
+import os
+import threading
+import time
+
+import mock
 import pytest
 
 from sacred.utils import (
@@ -17,11 +22,17 @@ from sacred.utils import (
     get_inheritors,
     convert_camel_case_to_snake_case,
     apply_backspaces_and_linefeeds,
+    IncrementalTerminalFilter,
     module_exists,
     module_is_in_cache,
     get_package_version,
     parse_version,
     rel_path,
+    OrderedExecutor,
+    Scheduler,
+    ScheduledTask,
+    get_scheduler,
+    write_json_atomically,
 )
 
 
@@ -173,6 +184,24 @@ def test_apply_backspaces_and_linefeeds(text, expected):
     assert apply_backspaces_and_linefeeds(text) == expected
 
 
+@pytest.mark.parametrize(
+    "chunks,expected",
+    [
+        (["abc", "def\n", "g"], [(0, "abc"), (0, "def\n"), (0, "g")]),
+        (["progress 1\r", "progress 2\r"], [(0, "progress 1\r"), (2, "2\r")]),
+        (["ab\b", "c\n"], [(0, "ab"), (1, "c\n")]),
+        (["abc\r", "d", "\n"], [(0, "abc\r"), (4, "dbc"), (0, "\n")]),
+    ],
+)
+def test_incremental_terminal_filter(chunks, expected):
+    terminal = IncrementalTerminalFilter()
+    output = ""
+    for chunk, (remove, text) in zip(chunks, expected):
+        assert terminal.update(chunk) == (remove, text)
+        output = output[: len(output) - remove] + text
+    assert output == apply_backspaces_and_linefeeds("".join(chunks))
+
+
 def test_module_exists_base_level_modules():
     assert module_exists("pytest")
     assert not module_exists("clearly_non_existing_module_name")
@@ -216,3 +245,197 @@ def test_rel_path():
     assert rel_path("foo.bar", "foo.bar.baz") == "baz"
     assert rel_path("foo.bar.baz", "foo.bar.baz") == ""
     assert rel_path("", "") == ""
+
+
+def test_ordered_executor():
+    calls = []
+    barrier = threading.Barrier(2, timeout=5)
+
+    def call(key, i):
+        if i == 0:
+            # only passes if both keys are processed concurrently
+            barrier.wait()
+        calls.append((key, i))
+
+    executor = OrderedExecutor(max_workers=2)
+    for i in range(5):
+        executor.submit("a", call, "a", i)
+        executor.submit("b", call, "b", i)
+    executor.shutdown()
+    assert [i for key, i in calls if key == "a"] == list(range(5))
+    assert [i for key, i in calls if key == "b"] == list(range(5))
+
+
+def test_write_json_atomically(tmp_path):
+    filename = tmp_path / "cache" / "data.json"
+    assert write_json_atomically(str(filename), {"a": 1})
+    assert filename.read_text() == '{"a": 1}'
+
+
+def test_write_json_atomically_fails_gracefully(tmp_path):
+    not_a_dir = tmp_path / "file"
+    not_a_dir.write_text("")
+    assert not write_json_atomically(str(not_a_dir / "data.json"), {"a": 1})
+
+    with mock.patch("os.replace", side_effect=PermissionError):
+        assert not write_json_atomically(str(tmp_path / "data.json"), {"a": 1})
+    # the temporary file is removed again
+    assert os.listdir(tmp_path) == ["file"]
+
+
+def test_scheduled_task_jitter_and_stagger():
+    task = ScheduledTask(Scheduler(), lambda: None, 10, jitter=0.2, stagger=True)
+    delays = task._delays
+    assert 0 <= next(delays) <= 10
+    for _ in range(100):
+        assert 8 <= next(delays) <= 12
+    assert len({next(delays) for _ in range(10)}) > 1
+
+
+@pytest.mark.parametrize("jitter", [-0.1, 1.0, 1.5])
+def test_scheduler_rejects_invalid_jitter(jitter):
+    with pytest.raises(ValueError, match="SETTINGS.BEAT_JITTER"):
+        Scheduler().schedule(lambda: None, 10, jitter=jitter)
+
+
+def test_scheduler():
+    calls = []
+    called = threading.Event()
+
+    def beat(name):
+        calls.append(name)
+        called.set()
+
+    scheduler = Scheduler()
+    fast = scheduler.schedule(lambda: beat("fast"), interval=0.01)
+    slow = scheduler.schedule(lambda: beat("slow"), interval=60)
+    assert called.wait(5)
+    fast.stop()
+    fast.join(timeout=5)
+    assert not fast.is_alive()
+    assert slow.is_alive()
+    # the stopped task is removed from the queue of deadlines
+    assert [task for _, _, task in scheduler._deadlines] == [slow]
+    slow.stop()
+    slow.join(timeout=5)
+    assert calls.count("slow") == 1
+    assert not scheduler._deadlines
+
+
+def test_blocked_task_does_not_stall_other_tasks():
+    unblock = threading.Event()
+    blocked = threading.Event()
+    beats = []
+    enough_beats = threading.Event()
+
+    def block():
+        blocked.set()
+        unblock.wait(5)
+
+    def beat():
+        beats.append(time.monotonic())
+        if len(beats) >= 5:
+            enough_beats.set()
+
+    scheduler = Scheduler(max_workers=2)
+    slow = scheduler.schedule(block, interval=0.01)
+    fast = scheduler.schedule(beat, interval=0.01)
+    assert blocked.wait(5)
+    # the other task keeps its schedule while the first one is blocked
+    assert enough_beats.wait(5)
+    assert not unblock.is_set()
+    unblock.set()
+    for task in (slow, fast):
+        task.stop()
+        task.join(timeout=5)
+        assert not task.is_alive()
+
+
+def test_final_call_runs_on_stopping_thread_when_pool_is_busy():
+    unblock = threading.Event()
+    blocked = threading.Event()
+    calls = []
+
+    def block():
+        blocked.set()
+        unblock.wait(5)
+
+    scheduler = Scheduler(max_workers=1)
+    busy = scheduler.schedule(block, interval=0.01)
+    assert blocked.wait(5)
+    task = scheduler.schedule(lambda: calls.append(threading.current_thread()), 60)
+    # the only worker is blocked, but the final call is not delayed
+    task.stop()
+    assert calls == [threading.current_thread()]
+    assert not task.is_alive()
+    unblock.set()
+    busy.stop()
+
+
+def test_final_call_waits_for_running_call():
+    running = threading.Event()
+    finish = threading.Event()
+    calls = []
+
+    def beat():
+        if not calls:
+            running.set()
+            finish.wait(5)
+        calls.append(len(calls))
+
+    task = Scheduler().schedule(beat, interval=0.01)
+    assert running.wait(5)
+    stopper = threading.Thread(target=task.stop)
+    stopper.start()
+    time.sleep(0.05)
+    # the final call does not overlap with the running one
+    assert calls == []
+    finish.set()
+    stopper.join(5)
+    assert calls == [0, 1]
+
+
+def test_get_scheduler_uses_max_workers_setting(monkeypatch):
+    monkeypatch.setattr("sacred.settings.SETTINGS.SCHEDULER_MAX_WORKERS", 7)
+    monkeypatch.setattr("sacred.utils._scheduler", None)
+    scheduler = get_scheduler()
+    assert scheduler._executor._executor._max_workers == 7
+
+
+def test_scheduler_wake_up():
+    calls = []
+    woken_up = threading.Event()
+
+    def wakeup_func():
+        calls.append("wakeup")
+        woken_up.set()
+
+    task = get_scheduler().schedule(
+        lambda: calls.append("beat"), interval=60, wakeup_func=wakeup_func
+    )
+    task.wake_up()
+    assert woken_up.wait(5)
+    task.stop()
+    task.join(timeout=5)
+    assert not task.is_alive()
+    assert task.stopped.is_set()
+    assert calls == ["wakeup", "beat"]
+    assert get_scheduler() is get_scheduler()
+
+
+def test_scheduled_task_reschedule():
+    calls = []
+    called = threading.Event()
+
+    def beat():
+        calls.append("beat")
+        task.reschedule(60)
+        called.set()
+
+    task = get_scheduler().schedule(beat, interval=0.01)
+    assert called.wait(5)
+    time.sleep(0.1)
+    assert calls == ["beat"]
+    task.stop()
+    task.join(timeout=5)
+    assert calls == ["beat", "beat"]